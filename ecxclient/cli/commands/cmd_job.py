@@ -25,39 +25,10 @@ def print_job_log(log_entries):
 def monitor(jobapi, job, interval_sec=10):
     status = job['status']
     logging.info("job status: %s" % status)
-    
-    active = False
-    counter = 0
 
     jobsession_id = int(job['lastrun']['sessionId'])
-    log_entries_index = 0
-    while True:
-        if active and (status == "PENDING"):
-            # Job moved from active state(s) to PENDING so
-            # it should be treated as done.
-            break
 
-        if status == "IDLE":
-            break
-
-        if (not active) and (status != "PENDING"):
-            # Job moved from PENDING to other active states.
-            active = True
-
-        log_entries = jobapi.get_log_entries(jobsession_id, page_start_index=log_entries_index)
-        log_entries_index += len(log_entries)
-        print_job_log(log_entries)
-
-        time.sleep(interval_sec)
-        counter = counter + 1
-
-        status = jobapi.status(job['id'])['currentStatus']
-        logging.info("job status: %s" % status)
-
-    logging.info("Job is done, getting last batch of log entries...")
-    print_job_log(jobapi.get_log_entries(jobsession_id, page_start_index=log_entries_index))
-
-    return status
+    return jobapi.watch(job['id'], on_log=print_job_log, jobsession_id=jobsession_id, max_interval=interval_sec)
 
     # Job is done so it is now guaranteed to have "lastrun" field.
     # jobStatus = JobsessionAPI.monitor(JobAPI.get(job.id).lastrun.sessionId).status
@@ -1,6 +1,7 @@
 
 import json
 import logging
+import sqlite3
 import sys
 import time
 
@@ -8,7 +9,24 @@ import click
 from tabulate import tabulate
 
 from ecxclient.cli import util
+from ecxclient.sdk.client import JobAPI
 from ecxclient.sdk.client import LogAPI
+from ecxclient.sdk.diagarchive import DiagnosticsArchive
+from ecxclient.sdk.diagarchive import open_diagnostics
+from ecxclient.sdk.logstore import LogStore
+
+def parse_time(value):
+    """Converts "YYYY-MM-DD[ HH:MM[:SS]]" local time to logTime (ms)."""
+    if value is None:
+        return None
+
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return int(time.mktime(time.strptime(value, fmt)) * 1000)
+        except ValueError:
+            pass
+
+    raise click.BadParameter("Expected YYYY-MM-DD[ HH:MM[:SS]]: %s" % value)
 
 @click.group()
 @util.pass_context
@@ -18,10 +36,140 @@ def cli(ctx, **kwargs):
 
     pass
 
+def print_progress(done, total):
+    if total:
+        click.echo("\r%d of %d MiB (%d%%)" % (done >> 20, total >> 20, done * 100 // total), nl=False, err=True)
+    else:
+        click.echo("\r%d MiB" % (done >> 20), nl=False, err=True)
+
 @cli.command()
-@click.option('--ofile', type=click.STRING, help='Output file name for logs archive.')
+@click.option('--ofile', type=click.STRING, help='Output file name for logs archive, "-" for stdout. '
+              'An interrupted download to the same file is resumed.')
+@click.option('--workers', type=click.INT, default=4, help='Number of parts downloaded in parallel.')
+@click.option('--chunk-size', type=click.INT, default=64, help='Read size in KiB.')
 @util.pass_context
 def download(ctx, **kwargs):
     logapi = LogAPI(ecx_session=ctx.ecx_session)
-    outfile = logapi.download_logs(kwargs['ofile'])
+
+    if kwargs['ofile'] == '-':
+        stdout = click.get_binary_stream('stdout')
+        logapi.download_logs(stdout, chunk_size=kwargs['chunk_size']*1024)
+        stdout.flush()
+        return
+
+    outfile = logapi.download_logs(kwargs['ofile'], workers=kwargs['workers'], progress=print_progress,
+                                   chunk_size=kwargs['chunk_size']*1024)
+    click.echo("", err=True)
     click.echo("Log archive: %s" % outfile)
+
+def open_archive(ctx, archive_file):
+    if archive_file:
+        return DiagnosticsArchive(archive_file)
+
+    return open_diagnostics(ctx.ecx_session)
+
+@cli.command()
+@click.argument('members', nargs=-1)
+@click.option('--file', 'archive_file', type=click.STRING, help='Downloaded logs archive, the appliance\'s if not given.')
+@util.pass_context
+def inspect(ctx, members, **kwargs):
+    """Lists the files in the logs archive, optionally only the ones
+    matching MEMBERS glob patterns.
+    """
+    with open_archive(ctx, kwargs['archive_file']) as archive:
+        infos = archive.members(members)
+
+    if ctx.json:
+        ctx.print_response([{'name': x.filename, 'size': x.file_size, 'compressedSize': x.compress_size,
+                             'modified': '%04d-%02d-%02d %02d:%02d:%02d' % x.date_time} for x in infos])
+        return
+
+    table_info = [(x.filename, x.file_size, x.compress_size, '%04d-%02d-%02d %02d:%02d:%02d' % x.date_time)
+                  for x in infos]
+    if not table_info:
+        return
+
+    click.echo_via_pager(tabulate(table_info, headers=["Name", "Size", "Compressed", "Modified"]))
+
+@cli.command()
+@click.argument('pattern')
+@click.argument('members', nargs=-1)
+@click.option('--file', 'archive_file', type=click.STRING, help='Downloaded logs archive, the appliance\'s if not given.')
+@click.option('-i', '--ignore-case', is_flag=True, help='Ignore case.')
+@util.pass_context
+def grep(ctx, pattern, members, **kwargs):
+    """Prints the lines matching the regular expression PATTERN in the
+    files of the logs archive, optionally only the ones matching MEMBERS
+    glob patterns.
+    """
+    with open_archive(ctx, kwargs['archive_file']) as archive:
+        for member, lineno, line in archive.grep(pattern, members, ignore_case=kwargs['ignore_case']):
+            click.echo('%s:%d: %s' % (member, lineno, line))
+
+@cli.command()
+@click.argument('members', nargs=-1, required=True)
+@click.option('--file', 'archive_file', type=click.STRING, help='Downloaded logs archive, the appliance\'s if not given.')
+@click.option('--dest', type=click.STRING, default='.', help='Directory to extract to.')
+@util.pass_context
+def extract(ctx, members, **kwargs):
+    """Extracts the files matching MEMBERS glob patterns from the logs
+    archive.
+    """
+    with open_archive(ctx, kwargs['archive_file']) as archive:
+        for path in archive.extract(members, kwargs['dest']):
+            click.echo(path)
+
+@cli.command()
+@click.option('--job', 'jobids', type=click.STRING, multiple=True, help='Job ID, all jobs if not given.')
+@click.option('--session', 'sessionids', type=click.STRING, multiple=True, help='Job session ID.')
+@click.option('--all-sessions', is_flag=True, help='Ingest all sessions of the jobs, not only the last run.')
+@click.option('--db', type=click.STRING, help='Log store database file.')
+@util.pass_context
+def ingest(ctx, **kwargs):
+    """Copies new job log entries into the local log store.
+    """
+    store = LogStore(ctx.ecx_session, path=kwargs['db'])
+
+    added = store.ingest_sessions([(sessionid, None, None, False) for sessionid in kwargs['sessionids']])
+    if kwargs['jobids'] or not kwargs['sessionids']:
+        jobs = kwargs['jobids'] or JobAPI(ecx_session=ctx.ecx_session).list()
+        for job in jobs:
+            added += store.ingest_job(job, all_sessions=kwargs['all_sessions'])
+
+    click.echo("Added %d log entries." % added)
+
+@cli.command()
+@click.argument('text', required=False)
+@click.option('--job', type=click.STRING, help='Job ID.')
+@click.option('--session', type=click.STRING, help='Job session ID.')
+@click.option('--type', 'logtype', type=click.STRING, help='Log entry type (e.g. ERROR).')
+@click.option('--since', type=click.STRING, help='Entries logged at or after YYYY-MM-DD[ HH:MM[:SS]].')
+@click.option('--until', type=click.STRING, help='Entries logged before YYYY-MM-DD[ HH:MM[:SS]].')
+@click.option('--limit', type=click.INT, default=100, help='Maximum number of entries, 0 for all.')
+@click.option('--query', is_flag=True, help='TEXT is a full-text query, e.g. \'snapshot AND "timed out"\'.')
+@click.option('--db', type=click.STRING, help='Log store database file.')
+@util.pass_context
+def search(ctx, text, **kwargs):
+    """Searches the job log entries in the local log store for the
+    messages containing the words of TEXT, e.g. "vm-123 failed:".
+    """
+    store = LogStore(ctx.ecx_session, path=kwargs['db'])
+    try:
+        entries = store.search(text, jobsession_id=kwargs['session'], job_id=kwargs['job'], type=kwargs['logtype'],
+                               since=parse_time(kwargs['since']), until=parse_time(kwargs['until']),
+                               limit=kwargs['limit'], query=kwargs['query'])
+    except sqlite3.OperationalError as e:
+        raise click.BadParameter("Invalid full-text query: %s" % e, param_hint='TEXT')
+    if ctx.json:
+        ctx.print_response(entries)
+        return
+
+    for entry in entries:
+        line = '%s %s %s' % (entry.get('jobsessionId'), time.ctime(entry['logTime']/1000).strip(), entry['message'])
+
+        if entry.get('type') == 'ERROR':
+            click.secho(line, fg='red')
+        elif entry.get('type') == 'WARN':
+            click.secho(line, fg='magenta')
+        else:
+            click.echo(line)
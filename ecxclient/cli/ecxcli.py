@@ -11,6 +11,7 @@ import traceback
 
 import click
 from requests.exceptions import HTTPError
+from tabulate import tabulate
 
 from ecxclient.sdk import client
 import util
@@ -59,9 +60,10 @@ def save_config(username, sessionid):
 @click.option('--passwd', envvar='ECX_PASSWD', default=None, metavar='PASSWORD', help='ECX password.')
 @click.option('--json', is_flag=True, help='Show raw json.')
 @click.option('--links', is_flag=True, help='Include links in output. Implies --json option.')
+@click.option('--timing', is_flag=True, help='Print time spent per ECX endpoint on exit.')
 @click.version_option('0.43')
 @util.pass_context
-def cli(ctx, url, user, passwd, json, links):
+def cli(ctx, url, user, passwd, json, links, timing):
     """ecx is a command line tool with which ECX operations
     can be carried out.
     """
@@ -72,6 +74,11 @@ def cli(ctx, url, user, passwd, json, links):
     else:
         ctx.ecx_session = client.EcxSession(url, sessionid=get_existing_session(user))
 
+    ctx.ecx_session.add_request_hook(client.log_request)
+    if timing:
+        ctx.ecx_session.enable_metrics()
+        click.get_current_context().call_on_close(lambda: print_timing(ctx.ecx_session))
+
     ctx.json = json
     ctx.links = links
     if ctx.links:
@@ -79,6 +86,16 @@ def cli(ctx, url, user, passwd, json, links):
 
 # cli = MyCLI(help='Script to perform ECX operations. ')
 
+def print_timing(ecx_session):
+    rows = [(x['method'], x['endpoint'], x['count'], x['errors'], '%.3f' % x['total_time'],
+             '%.3f' % x['p50'], '%.3f' % x['p90'], '%.3f' % x['p99'], x['response_bytes'])
+            for x in ecx_session.metrics_summary()]
+    if not rows:
+        return
+
+    click.echo(tabulate(rows, headers=["Method", "Endpoint", "Count", "Errors", "Total (s)",
+                                       "p50", "p90", "p99", "Received"]), err=True)
+
 def init_logging():
     fd, logfile = tempfile.mkstemp(suffix='.txt', prefix='ecxclient')
     os.close(fd)
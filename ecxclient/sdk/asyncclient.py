@@ -0,0 +1,247 @@
+"""asyncio versions of the ECX session and API classes.
+
+The classes mirror the ones in ecxclient.sdk.client but every call is a
+coroutine. All calls made through one AsyncEcxSession share a single
+aiohttp connection pool so one process can drive many concurrent ECX
+operations without a thread per request.
+
+This module needs Python 3.6+ (iter_list() is an async generator) and
+aiohttp ("pip install ecxclient[async]").
+"""
+
+import base64
+import json
+import logging
+import os
+import re
+import tempfile
+
+import aiohttp
+
+from ecxclient.sdk.client import build_list_params
+from ecxclient.sdk.client import build_url
+from ecxclient.sdk.client import resource_to_listfield
+
+class AsyncEcxSession(object):
+    def __init__(self, url, username=None, password=None, sessionid=None, limit=100, limit_per_host=0):
+        self.url = url
+        self.api_url = url + '/api'
+        self.username = username
+        self.password = password
+        self.sessionid = sessionid
+
+        # Connection pool is created lazily because aiohttp wants it to be
+        # created inside the running event loop.
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.conn = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def __repr__(self):
+        return 'AsyncEcxSession: user: %s' % self.username
+
+    async def open(self):
+        if not self.sessionid and not (self.username and self.password):
+            raise Exception('Please provide login credentials.')
+
+        if self.conn is None:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, ssl=False)
+            self.conn = aiohttp.ClientSession(connector=connector, raise_for_status=True,
+                                              headers={'Content-Type': 'application/json',
+                                                       'Accept': 'application/json'})
+
+        if not self.sessionid:
+            try:
+                await self.login()
+            except BaseException:
+                # __aexit__ isn't called when __aenter__ fails.
+                await self.close()
+                raise
+
+        return self
+
+    async def close(self):
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+    async def login(self):
+        credentials = base64.b64encode(('%s:%s' % (self.username, self.password)).encode('utf-8'))
+        async with self.conn.post("%s/endeavour/session" % self.api_url,
+                                  headers={'Authorization': 'Basic ' + credentials.decode('ascii')}) as r:
+            self.sessionid = json.loads(await r.read())['sessionid']
+
+    def _headers(self):
+        return {'X-Endeavour-Sessionid': self.sessionid}
+
+    async def get(self, restype=None, resid=None, path=None, params={}, endpoint=None, url=None):
+        if url is None:
+            url = build_url(self.api_url, restype, resid, path, endpoint)
+
+        async with self.conn.get(url, params=params, headers=self._headers()) as r:
+            return json.loads(await r.read())
+
+    async def stream_get(self, restype=None, resid=None, path=None, params={}, endpoint=None, url=None, outfile=None):
+        if url is None:
+            url = build_url(self.api_url, restype, resid, path, endpoint)
+
+        async with self.conn.get(url, params=params, headers=self._headers()) as r:
+            logging.info("headers: %s" % r.headers)
+
+            # The response header Content-Disposition contains default file name
+            #   Content-Disposition: attachment; filename=log_1490030341274.zip
+            default_filename = re.findall('filename=(.+)', r.headers['Content-Disposition'])[0]
+
+            if not outfile:
+                if not default_filename:
+                    raise Exception("Couldn't get the file name to save the contents.")
+
+                outfile = os.path.join(tempfile.mkdtemp(), default_filename)
+
+            with open(outfile, 'wb') as fd:
+                async for chunk in r.content.iter_chunked(64*1024):
+                    fd.write(chunk)
+
+        return outfile
+
+    async def delete(self, restype=None, resid=None, path=None, params={}, endpoint=None, url=None):
+        if url is None:
+            url = build_url(self.api_url, restype, resid, path, endpoint)
+
+        async with self.conn.delete(url, params=params, headers=self._headers()) as r:
+            content = await r.read()
+
+        return json.loads(content) if content else None
+
+    async def post(self, restype=None, resid=None, path=None, data={}, params={}, endpoint=None, url=None):
+        if url is None:
+            url = build_url(self.api_url, restype, resid, path, endpoint)
+
+        logging.info(json.dumps(data, indent=4))
+        async with self.conn.post(url, json=data, params=params, headers=self._headers()) as r:
+            content = await r.read()
+
+        return json.loads(content) if content else {}
+
+    async def put(self, restype=None, resid=None, path=None, data={}, params={}, endpoint=None, url=None):
+        if url is None:
+            url = build_url(self.api_url, restype, resid, path, endpoint)
+
+        logging.info(json.dumps(data, indent=4))
+        async with self.conn.put(url, json=data, params=params, headers=self._headers()) as r:
+            content = await r.read()
+
+        return json.loads(content) if content else {}
+
+class AsyncEcxAPI(object):
+    def __init__(self, ecx_session, restype=None, endpoint=None):
+        self.ecx_session = ecx_session
+        self.restype = restype
+        self.endpoint = endpoint
+        self.list_field = resource_to_listfield.get(restype, self.restype + 's')
+
+    async def get(self, resid=None, path=None, params={}, url=None, filter=None, sort=None):
+        params = build_list_params(params, filter=filter, sort=sort)
+        return await self.ecx_session.get(restype=self.restype, resid=resid, path=path, params=params, url=url)
+
+    async def stream_get(self, resid=None, path=None, params={}, url=None, outfile=None):
+        return await self.ecx_session.stream_get(restype=self.restype, resid=resid, path=path,
+                                                 params=params, url=url, outfile=outfile)
+
+    async def delete(self, resid):
+        return await self.ecx_session.delete(restype=self.restype, resid=resid)
+
+    async def list(self, filter=None, sort=None):
+        params = build_list_params(filter=filter, sort=sort)
+        return (await self.ecx_session.get(restype=self.restype, params=params))[self.list_field]
+
+    async def get_page(self, page_size, page_start_index=0, filter=None, sort=None, params={}):
+        params = build_list_params(params, page_size, page_start_index, filter, sort)
+        return (await self.ecx_session.get(restype=self.restype, params=params)).get(self.list_field, [])
+
+    async def iter_list(self, page_size=100, filter=None, sort=None, params={}):
+        page_start_index = 0
+        while True:
+            page = await self.get_page(page_size, page_start_index, filter=filter, sort=sort, params=params)
+            for item in page:
+                yield item
+
+            if len(page) != page_size:
+                return
+
+            page_start_index += len(page)
+
+    async def post(self, resid=None, path=None, data={}, params={}, url=None):
+        return await self.ecx_session.post(restype=self.restype, resid=resid, path=path, data=data,
+                                           params=params, url=url)
+
+    async def put(self, resid=None, path=None, data={}, params={}, url=None):
+        return await self.ecx_session.put(restype=self.restype, resid=resid, path=path, data=data,
+                                          params=params, url=url)
+
+class AsyncJobAPI(AsyncEcxAPI):
+    def __init__(self, ecx_session):
+        super(AsyncJobAPI, self).__init__(ecx_session, 'job')
+
+    async def status(self, jobid):
+        return await self.ecx_session.get(restype=self.restype, resid=jobid, path='status')
+
+    async def run(self, jobid, workflowid=None):
+        job = await self.ecx_session.get(restype=self.restype, resid=jobid)
+
+        links = job['links']
+        if 'start' not in links:
+            raise Exception("'start' link not found for job: %d" % jobid)
+
+        start_link = links['start']
+        reqdata = {}
+
+        if 'schema' in start_link:
+            # The job has storage profiles.
+            schema_data = await self.ecx_session.get(url=start_link['schema'])
+            workflows = schema_data['parameter']['actionname']['values']
+            if not workflows:
+                raise Exception("No workflows for job: %d" % jobid)
+            if len(workflows) > 1:
+                if workflowid is None:
+                    raise Exception("Workflow ID not provided")
+                else:
+                    reqdata["actionname"] = workflowid
+            else:
+                reqdata["actionname"] = workflows[0]['value']
+
+        return await self.ecx_session.post(url=start_link['href'], data=reqdata)
+
+    async def get_log_entries(self, jobsession_id, page_size=1000, page_start_index=0):
+        resp = await self.ecx_session.get(restype='log', path='job',
+                                          params=build_list_params(page_size=page_size, page_start_index=page_start_index,
+                                                                   sort='[{"property":"logTime","direction":"ASC"}]',
+                                                                   filter='[{"property":"jobsessionId","value":"%s"}]'%jobsession_id))
+
+        return resp['logs']
+
+class AsyncLogAPI(AsyncEcxAPI):
+    def __init__(self, ecx_session):
+        super(AsyncLogAPI, self).__init__(ecx_session, 'log')
+
+    async def download_logs(self, outfile=None):
+        return await self.stream_get(path="download/diagnostics", outfile=outfile)
+
+class AsyncOracleAPI(AsyncEcxAPI):
+    def __init__(self, ecx_session):
+        super(AsyncOracleAPI, self).__init__(ecx_session, 'oracle')
+
+    async def get_instances(self):
+        return await self.get(path="oraclehome")
+
+    async def get_databases_in_instance(self, instanceid):
+        return await self.get(path="oraclehome/%s/database" % instanceid)
+
+    async def get_database_copy_versions(self, instanceid, databaseid):
+        return await self.get(path="oraclehome/%s/database/%s" % (instanceid, databaseid) + "/version")
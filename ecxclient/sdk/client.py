@@ -1,13 +1,22 @@
 
+import base64
+import collections
 import configparser
+import hashlib
 import json
 import logging
 import os
+import random
 import re
 import tempfile
+import threading
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
 try:
@@ -16,16 +25,26 @@ except ImportError:
     from requests.packages import urllib3
 
 try:
-    import http.client as http_client
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+try:
+    from urllib.parse import parse_qsl, urlsplit, urlunsplit
 except ImportError:
     # Python 2
-    import httplib as http_client
+    from urlparse import parse_qsl, urlsplit, urlunsplit
 
-# http://stackoverflow.com/questions/10588644/how-can-i-see-the-entire-http-request-thats-being-sent-by-my-python-application
-# Uncomment this to see requests and responses.
-# TODO: We need better way and we should log requests and responses in
-# log file.
-# http_client.HTTPConnection.debuglevel = 1
+try:
+    string_types = basestring
+except NameError:
+    # Python 3
+    string_types = str
+
+# To see requests in the log file, add log_request as request hook:
+#   session.add_request_hook(log_request)
+# See also EcxSession.enable_metrics().
 urllib3.disable_warnings()
 
 resource_to_endpoint = {
@@ -78,9 +97,535 @@ def build_url(baseurl, restype=None, resid=None, path=None, endpoint=None):
 
     return url
 
+class Filter(list):
+    """List of filter conditions, all of which must hold. Combine with "&"."""
+    def __and__(self, other):
+        return Filter(list(self) + list(other))
+
+class Sort(list):
+    """List of sort orders, applied in turn. Combine with "+"."""
+    def __add__(self, other):
+        return Sort(list(self) + list(other))
+
+class F(object):
+    """Names a resource property to build "filter" and "sort" values that
+    ECX evaluates on the server.
+
+        (F('name') == 'x') & (F('logTime') > t)
+        F('logTime').asc() + F('id').asc()
+    """
+    def __init__(self, property):
+        self.property = property
+
+    def cond(self, op, value):
+        return Filter([{'property': self.property, 'op': op, 'value': value}])
+
+    def __eq__(self, value):
+        return self.cond('=', value)
+
+    def __ne__(self, value):
+        return self.cond('!=', value)
+
+    def __gt__(self, value):
+        return self.cond('>', value)
+
+    def __ge__(self, value):
+        return self.cond('>=', value)
+
+    def __lt__(self, value):
+        return self.cond('<', value)
+
+    def __le__(self, value):
+        return self.cond('<=', value)
+
+    __hash__ = None
+
+    def in_(self, values):
+        return self.cond('IN', list(values))
+
+    def asc(self):
+        return Sort([{'property': self.property, 'direction': 'ASC'}])
+
+    def desc(self):
+        return Sort([{'property': self.property, 'direction': 'DESC'}])
+
+def encode_list_param(value):
+    """Encodes a "filter" or "sort" value the way ECX list APIs expect it.
+
+    Strings are assumed to be JSON already and are passed through as is.
+    Lists may mix plain conditions with Filter or Sort values.
+    """
+    if value is None or isinstance(value, string_types):
+        return value
+
+    items = []
+    for item in value:
+        if isinstance(item, list):
+            items.extend(item)
+        else:
+            items.append(item)
+
+    return json.dumps(items)
+
+def build_list_params(params=None, page_size=None, page_start_index=None, filter=None, sort=None):
+    list_params = dict(params or {})
+
+    if page_size is not None:
+        list_params['pageSize'] = page_size
+
+    if page_start_index is not None:
+        list_params['pageStartIndex'] = page_start_index
+
+    if filter is not None:
+        list_params['filter'] = encode_list_param(filter)
+
+    if sort is not None:
+        list_params['sort'] = encode_list_param(sort)
+
+    return list_params
+
+def iter_pages(fetch_page, page_size, page_start_index=0):
+    """Yields pages returned by fetch_page(page_size, page_start_index).
+
+    Iteration stops at the first page that is not full. A page that is
+    larger than page_size means the server ignored the paging parameters
+    and returned everything in one go so that ends the iteration too.
+    """
+    while True:
+        page = fetch_page(page_size, page_start_index)
+        if page:
+            yield page
+
+        if len(page) != page_size:
+            return
+
+        page_start_index += len(page)
+
+def prefetch(iterable, depth=1):
+    """Consumes iterable on a worker thread and yields its items.
+
+    The worker keeps fetching while the caller is busy with the current
+    item but never buffers more than depth items. This is meant for paged
+    reads where producing the next item is a round trip to ECX. An
+    exception raised by the iterable is re-raised in the caller.
+    """
+    if depth < 1:
+        for item in iterable:
+            yield item
+        return
+
+    entries = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                entries.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(('item', item)):
+                    return
+        except Exception as e:
+            logging.info("prefetch: worker failed: %s" % e)
+            put(('error', e))
+            return
+
+        put(('done', None))
+
+    worker = threading.Thread(target=produce, name='ecx-prefetch')
+    worker.daemon = True
+    worker.start()
+
+    try:
+        while True:
+            kind, value = entries.get()
+            if kind == 'done':
+                return
+
+            if kind == 'error':
+                raise value
+
+            yield value
+    finally:
+        # Also reached when the caller stops iterating early.
+        stop.set()
+
+def restype_for_url(api_url, url):
+    """Best guess of the resource type an ECX url belongs to. Endpoints in
+    resource_to_endpoint map back to their resource type, anything else is
+    named by the first path component after "api".
+    """
+    path = urlsplit(url).path.strip('/')
+    api_path = urlsplit(api_url).path.strip('/')
+    if api_path and path.startswith(api_path):
+        path = path[len(api_path):].strip('/')
+
+    best = None
+    for restype, endpoint in resource_to_endpoint.items():
+        if path == endpoint or path.startswith(endpoint + '/'):
+            if best is None or len(endpoint) > len(resource_to_endpoint[best]):
+                best = restype
+
+    return best or path.split('/')[0]
+
+def normalize_url(url, params=None):
+    """Returns (url, params) with the query string of url merged into the
+    params, the path stripped of a trailing "/" and the params sorted so
+    equivalent requests compare equal.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query.extend((k, v) for k, v in (params or {}).items())
+    path = parts.path.rstrip('/') or '/'
+
+    return (urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, '', '')),
+            tuple(sorted((str(k), str(v)) for k, v in query)))
+
+class ResponseCache(object):
+    """Size bounded LRU cache of GET responses keyed by normalized url and
+    params.
+
+    Entries expire after ttl seconds, ttl_by_restype overrides that per
+    resource type (see restype_for_url()). A ttl of None never expires and
+    0 disables caching for that type. invalidate() drops everything cached
+    for an url, its parent collections and its children.
+    """
+    def __init__(self, maxsize=1024, ttl=300, ttl_by_restype=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.ttl_by_restype = dict(ttl_by_restype or {})
+
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, restype):
+        return self.ttl_by_restype.get(restype, self.ttl)
+
+    def lookup(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                expires, content = entry
+                if expires is None or expires > time.time():
+                    self.entries[key] = entry
+                    self.hits += 1
+                    return content
+
+            self.misses += 1
+            return None
+
+    def store(self, key, restype, content, generation):
+        ttl = self.ttl_for(restype)
+        if ttl == 0:
+            return
+
+        expires = None if ttl is None else time.time() + ttl
+
+        with self.lock:
+            # Something was invalidated while this response was in flight.
+            if generation != self.generation:
+                return
+
+            self.entries.pop(key, None)
+            self.entries[key] = (expires, content)
+
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, url):
+        path = normalize_url(url)[0]
+        parents = set()
+        parent = path
+        while '/' in parent.split('://', 1)[-1]:
+            parents.add(parent)
+            parent = parent.rsplit('/', 1)[0]
+
+        with self.lock:
+            self.generation += 1
+            for key in list(self.entries):
+                if key[0] in parents or key[0].startswith(path + '/'):
+                    del self.entries[key]
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+class SingleFlight(object):
+    """Runs at most one call per key at a time. Callers asking for a key
+    that is already in flight wait for that call and share its result (or
+    its exception) instead of making their own.
+    """
+    class Call(object):
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = SingleFlight.Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                if self.calls.get(key) is call:
+                    del self.calls[key]
+
+            call.done.set()
+
+    def forget(self):
+        """Makes calls started from now on run on their own rather than join
+        the ones in flight, e.g. because the resources may have changed.
+        """
+        with self.lock:
+            self.calls.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'in_flight': len(self.calls), 'shared': self.shared}
+
+def iter_completed(fn, items, max_workers=8):
+    """Calls fn(item) for all items using at most max_workers threads and
+    yields (item, result) pairs in the order the calls complete.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = dict((executor.submit(fn, item), item) for item in items)
+
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # Caller may stop early or a call may fail, don't run the rest.
+        for future in futures:
+            future.cancel()
+
+        executor.shutdown(wait=False)
+
+class ResourceIndex(object):
+    """Hash index of all resources of one type by the value of key.
+
+    The index is built with one paged listing and rebuilt when it is older
+    than ttl seconds (None means never) or after invalidate(). In between,
+    EcxSession keeps it up to date with its own writes: the object returned
+    by a POST to the type or a PUT to one of its objects replaces the
+    indexed one, and a DELETE removes it. Writes to sub-resources and
+    actions (e.g. "?action=start") don't change the index; failed writes,
+    or ones whose effect can't be told from the response, invalidate it.
+    """
+    def __init__(self, ecx_session, restype, key='name', case_insensitive=True, ttl=300, page_size=500):
+        self.ecx_session = ecx_session
+        self.restype = restype
+        self.key = key
+        self.case_insensitive = case_insensitive
+        self.ttl = ttl
+        self.page_size = page_size
+        self.url = normalize_url(build_url(ecx_session.api_url, restype))[0]
+
+        self.lock = threading.Lock()
+        self.entries = None
+        self.loaded_at = None
+        self.generation = 0
+
+    def normalize(self, value):
+        if self.case_insensitive and isinstance(value, string_types):
+            return value.lower()
+
+        return value
+
+    def refresh(self):
+        with self.lock:
+            generation = self.generation
+
+        entries = {}
+        for item in EcxAPI(self.ecx_session, self.restype).iter_list(page_size=self.page_size):
+            value = item.get(self.key)
+            if value is not None:
+                entries.setdefault(self.normalize(value), item)
+
+        with self.lock:
+            # A write during the listing may be missing from it.
+            if generation == self.generation:
+                self.entries = entries
+                self.loaded_at = time.time()
+
+        return entries
+
+    def invalidate(self):
+        with self.lock:
+            self.entries = None
+            self.generation += 1
+
+    def remove_id(self, resid):
+        for value, item in list(self.entries.items()):
+            if str(item.get('id')) == str(resid):
+                del self.entries[value]
+
+    def on_write(self, method, path, query, r):
+        """Updates the index after a PUT, POST or DELETE to path, a url
+        below the type's. r is None if the request failed.
+        """
+        if path == self.url:
+            resid = None
+        elif '/' not in path[len(self.url) + 1:]:
+            resid = path[len(self.url) + 1:]
+        else:
+            return
+
+        if any(name == 'action' for name, value in query):
+            return
+
+        if r is None:
+            self.invalidate()
+            return
+
+        item = None
+        if method != 'DELETE' and r.content:
+            try:
+                item = r.json()
+            except ValueError:
+                pass
+
+        with self.lock:
+            self.generation += 1
+            if self.entries is None:
+                return
+
+            if method == 'DELETE' and resid is not None:
+                self.remove_id(resid)
+            elif ((method == 'POST' and resid is None) or (method == 'PUT' and resid is not None)) and \
+                    isinstance(item, dict) and item.get(self.key) is not None:
+                # A PUT may have changed the key, drop the old entry.
+                self.remove_id(resid if resid is not None else item.get('id'))
+                self.entries[self.normalize(item[self.key])] = item
+            else:
+                self.entries = None
+
+    def current(self):
+        with self.lock:
+            entries = self.entries
+            if entries is not None and (self.ttl is None or time.time() - self.loaded_at < self.ttl):
+                return entries
+
+        return self.refresh()
+
+    def get(self, value, default=None):
+        return self.current().get(self.normalize(value), default)
+
+    def __getitem__(self, value):
+        return self.current()[self.normalize(value)]
+
+    def __contains__(self, value):
+        return self.normalize(value) in self.current()
+
+    def __len__(self):
+        return len(self.current())
+
+def resource_key(resource):
+    href = resource.get('links', {}).get('self', {}).get('href')
+    return href if href is not None else resource.get('id')
+
+def resource_hash(resource):
+    return hashlib.sha1(json.dumps(resource, sort_keys=True).encode('utf-8')).hexdigest()
+
+class ChangeSet(object):
+    """Result of EcxAPI.changes_since().
+
+    added and changed are lists of resources, removed is a set of resource
+    keys (self hrefs), or None when it isn't known: only the resources
+    updated since were listed, or there was no complete snapshot to compare
+    with. timestamp, snapshot and snapshot_complete (whether snapshot has
+    every resource, not just the ones that changed) are meant to be passed
+    to the next changes_since() call.
+    """
+    def __init__(self, added, changed, removed, timestamp, snapshot, server_filtered, snapshot_complete=True):
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.timestamp = timestamp
+        self.snapshot = snapshot
+        self.server_filtered = server_filtered
+        self.snapshot_complete = snapshot_complete
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return 'ChangeSet: added: %d, changed: %d, removed: %s' % (
+            len(self.added), len(self.changed), 'unknown' if self.removed is None else len(self.removed))
+
 def raise_response_error(r, *args, **kwargs):
     r.raise_for_status()
 
+def replace_file(src, dst):
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        # Python 2
+        if os.path.exists(dst):
+            os.remove(dst)
+
+        os.rename(src, dst)
+
+def save_json(path, data):
+    """Writes data to path atomically, so a crash never leaves a partly
+    written file behind.
+    """
+    tmpfile = path + '.tmp'
+    with open(tmpfile, 'w') as f:
+        json.dump(data, f)
+
+    replace_file(tmpfile, path)
+
 def pretty_print(data):
     return logging.info(json.dumps(data, sort_keys=True,indent=4, separators=(',', ': ')))
   
@@ -95,17 +640,529 @@ def change_password(url, username, password, newpassword):
     return conn.post("%s/api/endeavour/session?changePassword=true&screenInfo=1" % url, json=data,
                          auth=HTTPBasicAuth(username, password))  
 
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that keeps track of how many requests were sent and how
+    many of them needed a new connection. Everything else is reuse of a
+    pooled connection.
+    """
+    def __init__(self, *args, **kwargs):
+        self.stats_lock = threading.Lock()
+        self.num_requests = 0
+        self.num_new_connections = 0
+        self.timing = threading.local()
+        super(CountingHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def count_new_connection(self):
+        with self.stats_lock:
+            self.num_new_connections += 1
+
+    def add_connect_time(self, seconds):
+        self.timing.connect = getattr(self.timing, 'connect', 0) + seconds
+
+    def take_connect_time(self):
+        """Returns the time this thread spent connecting (TCP and TLS)
+        since the last call.
+        """
+        seconds = getattr(self.timing, 'connect', 0)
+        self.timing.connect = 0
+        return seconds
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(CountingHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+
+        adapter = self
+
+        class TimedHTTPConnection(urllib3.HTTPConnectionPool.ConnectionCls):
+            def connect(self):
+                start = time.time()
+                try:
+                    return super(TimedHTTPConnection, self).connect()
+                finally:
+                    adapter.add_connect_time(time.time() - start)
+
+        class TimedHTTPSConnection(urllib3.HTTPSConnectionPool.ConnectionCls):
+            def connect(self):
+                start = time.time()
+                try:
+                    return super(TimedHTTPSConnection, self).connect()
+                finally:
+                    adapter.add_connect_time(time.time() - start)
+
+        class CountingHTTPConnectionPool(urllib3.HTTPConnectionPool):
+            ConnectionCls = TimedHTTPConnection
+
+            def _new_conn(self):
+                adapter.count_new_connection()
+                return super(CountingHTTPConnectionPool, self)._new_conn()
+
+        class CountingHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+            ConnectionCls = TimedHTTPSConnection
+
+            def _new_conn(self):
+                adapter.count_new_connection()
+                return super(CountingHTTPSConnectionPool, self)._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        with self.stats_lock:
+            self.num_requests += 1
+
+        return super(CountingHTTPAdapter, self).send(request, **kwargs)
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                'requests': self.num_requests,
+                'new_connections': self.num_new_connections,
+                'reused_connections': self.num_requests - self.num_new_connections,
+            }
+
+RequestRecord = collections.namedtuple('RequestRecord', ['method', 'endpoint', 'url', 'status', 'connect', 'ttfb',
+                                                         'total', 'request_bytes', 'response_bytes', 'error'])
+
+id_segment_re = re.compile(r'^(\d+|[0-9a-fA-F-]{16,})$')
+
+def endpoint_template(api_url, url):
+    """Returns the path of url below api_url with the ids in it replaced by
+    "{id}", e.g. "endeavour/job/{id}/status", to group requests by endpoint.
+    """
+    path = urlsplit(url).path
+    base = urlsplit(api_url).path.rstrip('/') + '/'
+    if path.startswith(base):
+        path = path[len(base):]
+
+    return '/'.join('{id}' if id_segment_re.match(segment) else segment for segment in path.split('/'))
+
+def log_request(record):
+    """Request hook that logs every request at DEBUG level."""
+    logging.debug("%s %s: %s, connect %.3fs, ttfb %.3fs, total %.3fs, sent %s, received %s bytes%s" % (
+        record.method, record.url, record.status, record.connect, record.ttfb or 0, record.total,
+        record.request_bytes, record.response_bytes, ", %s" % record.error if record.error else ""))
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100.0))]
+
+class EndpointStats(object):
+    def __init__(self, max_samples):
+        self.max_samples = max_samples
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0
+        self.connect_time = 0
+        self.connects = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.statuses = collections.Counter()
+        self.totals = []
+        self.ttfbs = []
+
+    def sample(self, samples, value):
+        # Reservoir sampling keeps percentiles of long runs in bounded memory.
+        if len(samples) < self.max_samples:
+            samples.append(value)
+        else:
+            i = random.randint(0, self.count - 1)
+            if i < self.max_samples:
+                samples[i] = value
+
+    def add(self, record):
+        self.count += 1
+        self.statuses[record.status] += 1
+        if record.error or record.status is None or record.status >= 400:
+            self.errors += 1
+
+        self.total_time += record.total
+        if record.connect:
+            self.connect_time += record.connect
+            self.connects += 1
+
+        self.request_bytes += record.request_bytes or 0
+        self.response_bytes += record.response_bytes or 0
+
+        self.sample(self.totals, record.total)
+        if record.ttfb is not None:
+            self.sample(self.ttfbs, record.ttfb)
+
+class RequestStats(object):
+    """Aggregates RequestRecords by method and endpoint template. Use as
+    request hook of an EcxSession, see EcxSession.enable_metrics().
+    """
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def __call__(self, record):
+        with self.lock:
+            key = (record.method, record.endpoint)
+            if key not in self.endpoints:
+                self.endpoints[key] = EndpointStats(self.max_samples)
+
+            self.endpoints[key].add(record)
+
+    def clear(self):
+        with self.lock:
+            self.endpoints = {}
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """Returns a dict per endpoint, the ones that took the most time
+        first. Times are in seconds.
+        """
+        rows = []
+        with self.lock:
+            for (method, endpoint), stats in self.endpoints.items():
+                totals = sorted(stats.totals)
+                ttfbs = sorted(stats.ttfbs)
+                row = collections.OrderedDict([
+                    ('method', method),
+                    ('endpoint', endpoint),
+                    ('count', stats.count),
+                    ('errors', stats.errors),
+                    ('total_time', stats.total_time),
+                    ('mean', stats.total_time / stats.count),
+                ])
+                for pct in percentiles:
+                    row['p%s' % pct] = percentile(totals, pct)
+
+                for pct in percentiles:
+                    row['ttfb_p%s' % pct] = percentile(ttfbs, pct)
+
+                row['connects'] = stats.connects
+                row['connect_time'] = stats.connect_time
+                row['request_bytes'] = stats.request_bytes
+                row['response_bytes'] = stats.response_bytes
+                row['statuses'] = dict(stats.statuses)
+                rows.append(row)
+
+        rows.sort(key=lambda row: row['total_time'], reverse=True)
+        return rows
+
+class RangeDownload(object):
+    """Downloads a url to a file or as a stream of chunks, with HTTP Range
+    requests when the server supports them.
+
+    The content is written to outfile + ".part" and the progress of every
+    part to outfile + ".part.json". Downloading the same url to the same
+    outfile again resumes an interrupted download, as long as the server
+    still has the same content (same size, and same ETag or Last-Modified
+    when it sends one). Content larger than 2 * min_part_size is downloaded
+    in up to workers parts in parallel. Broken connections are retried
+    from where they stopped. All of this needs an ETag or Last-Modified to
+    send as If-Range; without one, the content is read in a single request
+    since parts could come from different versions of it. The result is
+    checked against the size the server advertised before it is renamed to
+    outfile.
+
+    iter_chunks() yields the content in order instead, for writing it to
+    anything else than a file. It also retries broken connections with
+    Range requests, from the last byte yielded, when the server allows.
+
+    progress, if given, is called with (bytes done, total bytes or None).
+    """
+    save_interval = 8*1024*1024
+
+    def __init__(self, ecx_session, url, params={}, workers=4, timeout=(30, 300), retries=3,
+                 chunk_size=64*1024, min_part_size=16*1024*1024, progress=None):
+        self.ecx_session = ecx_session
+        self.url = url
+        self.params = params
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.chunk_size = chunk_size
+        self.min_part_size = min_part_size
+        self.progress = progress
+
+        self.lock = threading.Lock()
+        self.total = None
+        self.validator = None
+        self.parts = []
+        self.done = 0
+        self.state_file = None
+        self.failed = False
+        self.filename = None
+
+    def get(self, headers):
+        # Byte ranges are offsets into the content as stored, not as decoded.
+        headers = dict(headers, **{'Accept-Encoding': 'identity'})
+        return self.ecx_session.request('GET', self.url, params=self.params, headers=headers,
+                                        stream=True, timeout=self.timeout)
+
+    def open(self):
+        """Sends the first request. Its response tells whether the server
+        supports ranges (206) or not (200, with the whole content).
+        """
+        try:
+            r = self.get({'Range': 'bytes=0-0'})
+        except requests.exceptions.HTTPError as e:
+            # 416: empty content.
+            if e.response is None or e.response.status_code != 416:
+                raise
+
+            r = self.get({})
+
+        # The response header Content-Disposition contains default file name
+        #   Content-Disposition: attachment; filename=log_1490030341274.zip
+        self.filename = (re.findall('filename=(.+)', r.headers.get('Content-Disposition', '')) or [None])[0]
+
+        return r
+
+    def use_range_response(self, r):
+        """Takes the total size and validator from a 206 response."""
+        self.total = int(r.headers['Content-Range'].rsplit('/', 1)[1])
+        self.validator = r.headers.get('ETag') or r.headers.get('Last-Modified')
+
+    def save(self, r, outfile):
+        partfile = outfile + '.part'
+        self.state_file = partfile + '.json'
+
+        if r.status_code == 206:
+            self.use_range_response(r)
+
+        if r.status_code == 206 and self.validator:
+            r.close()
+            self.save_ranges(r, partfile)
+        else:
+            self.save_whole(r, partfile)
+
+        replace_file(partfile, outfile)
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+
+        return outfile
+
+    def save_whole(self, r, partfile):
+        with open(partfile, 'wb') as fd:
+            for chunk in self.iter_chunks(r):
+                fd.write(chunk)
+
+    def iter_chunks(self, r):
+        """Yields the content of the response to open() chunk by chunk."""
+        ranged = r.status_code == 206
+        md5 = expected_md5 = None
+        if ranged:
+            self.use_range_response(r)
+            r.close()
+            r = None
+
+            if not self.validator:
+                # Retrying from an offset could splice two versions together.
+                ranged = False
+                r = self.get({})
+
+        if not ranged:
+            length = r.headers.get('Content-Length')
+            self.total = int(length) if length is not None else None
+            md5 = hashlib.md5() if 'Content-MD5' in r.headers else None
+            expected_md5 = r.headers.get('Content-MD5')
+
+        failures = 0
+        while True:
+            written = 0
+            try:
+                if r is None:
+                    headers = {'Range': 'bytes=%d-' % self.done}
+                    if self.validator:
+                        headers['If-Range'] = self.validator
+
+                    r = self.get(headers)
+                    if r.status_code != 206:
+                        raise Exception("%s changed during the download" % self.url)
+
+                for chunk in r.iter_content(chunk_size=self.chunk_size):
+                    if md5 is not None:
+                        md5.update(chunk)
+
+                    written += len(chunk)
+                    self.advance(len(chunk))
+                    yield chunk
+
+                break
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                failures = 0 if written else failures + 1
+                if not ranged or failures > self.retries:
+                    raise
+
+                logging.warning("RangeDownload: %s at %d: %s, retrying" % (self.url, self.done, e))
+                time.sleep(min(2 ** failures, 30))
+            finally:
+                if r is not None:
+                    r.close()
+                    r = None
+
+        if self.total is not None and self.done != self.total:
+            raise Exception("Downloaded %d of %d bytes of %s" % (self.done, self.total, self.url))
+
+        if md5 is not None and base64.b64encode(md5.digest()).decode('ascii') != expected_md5:
+            raise Exception("Checksum mismatch for %s" % self.url)
+
+    def save_ranges(self, r, partfile):
+        self.use_range_response(r)
+
+        if not (os.path.exists(partfile) and self.load_state()):
+            count = max(1, min(self.workers, self.total // self.min_part_size))
+            bounds = [self.total * i // count for i in range(count + 1)]
+            self.parts = [{'start': bounds[i], 'end': bounds[i + 1], 'done': 0} for i in range(count)]
+
+            with open(partfile, 'wb') as fd:
+                fd.truncate(self.total)
+
+            self.save_state()
+
+        self.done = sum(part['done'] for part in self.parts)
+        pending = [part for part in self.parts if part['start'] + part['done'] < part['end']]
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for future in as_completed([executor.submit(self.fetch_part, part, partfile) for part in pending]):
+                future.result()
+        except BaseException:
+            # Stops the parts still being downloaded.
+            self.failed = True
+            raise
+        finally:
+            # They write to partfile and the state, which a new download of
+            # the same outfile resumes from.
+            executor.shutdown(wait=True)
+
+        if os.path.getsize(partfile) != self.total or self.done != self.total:
+            raise Exception("Downloaded %d of %d bytes of %s" % (self.done, self.total, self.url))
+
+    def load_state(self):
+        if not os.path.exists(self.state_file):
+            return False
+
+        with open(self.state_file) as f:
+            state = json.load(f)
+
+        if state.get('url') != self.url or state.get('total') != self.total or \
+                state.get('validator') != self.validator:
+            logging.info("RangeDownload: %s changed, starting over" % self.url)
+            return False
+
+        self.parts = state['parts']
+        logging.info("RangeDownload: resuming %s at %d of %d bytes" %
+                     (self.url, sum(part['done'] for part in self.parts), self.total))
+        return True
+
+    def save_state(self):
+        with self.lock:
+            save_json(self.state_file, {'url': self.url, 'total': self.total, 'validator': self.validator,
+                                        'parts': self.parts})
+
+    def advance(self, size):
+        with self.lock:
+            self.done += size
+            done = self.done
+
+        if self.progress is not None:
+            self.progress(done, self.total)
+
+    def commit(self, part, size):
+        """Marks size more bytes of part as done. They must be on disk."""
+        with self.lock:
+            part['done'] += size
+
+        self.save_state()
+
+    def fetch_part(self, part, partfile):
+        failures = 0
+        while part['start'] + part['done'] < part['end'] and not self.failed:
+            offset = part['start'] + part['done']
+            headers = {'Range': 'bytes=%d-%d' % (offset, part['end'] - 1)}
+            if self.validator:
+                headers['If-Range'] = self.validator
+
+            written = 0
+            try:
+                r = self.get(headers)
+                if r.status_code != 206:
+                    r.close()
+                    raise Exception("%s changed during the download" % self.url)
+
+                unsaved = 0
+                try:
+                    with open(partfile, 'r+b') as fd:
+                        fd.seek(offset)
+                        for chunk in r.iter_content(chunk_size=self.chunk_size):
+                            chunk = chunk[:part['end'] - offset - written]
+                            fd.write(chunk)
+                            written += len(chunk)
+                            unsaved += len(chunk)
+                            self.advance(len(chunk))
+
+                            if unsaved >= self.save_interval:
+                                fd.flush()
+                                self.commit(part, unsaved)
+                                unsaved = 0
+
+                            if offset + written >= part['end'] or self.failed:
+                                break
+                finally:
+                    # The file is closed so all that was written is on disk.
+                    self.commit(part, unsaved)
+                    r.close()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                failures = 0 if written else failures + 1
+                if failures > self.retries:
+                    raise
+
+                logging.warning("RangeDownload: %s at %d: %s, retrying" % (self.url, offset + written, e))
+                time.sleep(min(2 ** failures, 30))
+
 class EcxSession(object):
-    def __init__(self, url, username=None, password=None, sessionid=None):
+    """Session with an ECX server.
+
+    An EcxSession can be shared by any number of threads. Every thread gets
+    its own requests.Session (cookies, hooks and other per-session state of
+    requests are not thread-safe) but all of them are mounted on a single
+    HTTPAdapter whose urllib3 connection pool is thread-safe. So connections
+    opened by one thread are reused by the others.
+
+    pool_connections is the number of hosts to keep pools for, pool_maxsize
+    the number of connections kept per host and pool_block whether a thread
+    waits for a free connection instead of opening an extra, unpooled one
+    when all pooled connections are busy. When fanning out with a thread
+    pool, pool_maxsize should be at least the number of workers.
+
+    With a ResponseCache (see enable_cache()), responses of get(url=...)
+    calls, the ones used to follow "links" of other objects, are cached.
+    Any PUT, POST or DELETE invalidates what is cached for that url.
+
+    With coalesce (the default), identical GETs issued concurrently from
+    several threads are sent only once and share the response, whether or
+    not caching is enabled.
+
+    Request hooks (see add_request_hook()) are called with a RequestRecord
+    after every request sent: method, endpoint template, status, time to
+    connect (0 on a reused connection), to the response headers (ttfb) and
+    in total (up to the headers for streamed responses), and body sizes.
+    """
+    def __init__(self, url, username=None, password=None, sessionid=None,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, cache=None, coalesce=True):
         self.url = url
         self.api_url = url + '/api'
         self.username = username
         self.password = password
         self.sessionid = sessionid
 
-        self.conn = requests.Session()
-        self.conn.verify = False
-        self.conn.hooks.update({'response': raise_response_error})
+        self.adapter = CountingHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                           pool_block=pool_block)
+        self.local = threading.local()
+        self.cache = cache
+        self.inflight = SingleFlight() if coalesce else None
+        self.indexes = {}
+        self.indexes_lock = threading.Lock()
+        self.request_hooks = []
+        self.request_stats = None
 
         if not self.sessionid:
             if self.username and self.password:
@@ -113,51 +1170,300 @@ class EcxSession(object):
             else:
                 raise Exception('Please provide login credentials.')
 
-        self.conn.headers.update({'X-Endeavour-Sessionid': self.sessionid})
-        self.conn.headers.update({'Content-Type': 'application/json'})
-        self.conn.headers.update({'Accept': 'application/json'})
+    @property
+    def conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = requests.Session()
+            conn.verify = False
+            conn.hooks.update({'response': raise_response_error})
+            conn.mount('http://', self.adapter)
+            conn.mount('https://', self.adapter)
+            self.local.conn = conn
+
+        return conn
+
+    @property
+    def headers(self):
+        return {'X-Endeavour-Sessionid': self.sessionid,
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'}
 
     def login(self):
         r = self.conn.post("%s/endeavour/session" % self.api_url, auth=HTTPBasicAuth(self.username, self.password))
         self.sessionid = r.json()['sessionid']
 
+    def close(self):
+        self.adapter.close()
+
+    def connection_stats(self):
+        """Returns counts of requests sent, connections opened and requests
+        that were served over an already open connection.
+        """
+        return self.adapter.stats()
+
+    def enable_cache(self, maxsize=1024, ttl=300, ttl_by_restype=None):
+        self.cache = ResponseCache(maxsize=maxsize, ttl=ttl, ttl_by_restype=ttl_by_restype)
+        return self.cache
+
+    def disable_cache(self):
+        self.cache = None
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
+    def add_request_hook(self, hook):
+        self.request_hooks.append(hook)
+
+    def remove_request_hook(self, hook):
+        self.request_hooks.remove(hook)
+
+    def enable_metrics(self, max_samples=10000):
+        """Starts aggregating request timings and sizes by endpoint and
+        returns the RequestStats.
+        """
+        self.disable_metrics()
+        self.request_stats = RequestStats(max_samples=max_samples)
+        self.add_request_hook(self.request_stats)
+        return self.request_stats
+
+    def disable_metrics(self):
+        if self.request_stats is not None:
+            self.remove_request_hook(self.request_stats)
+            self.request_stats = None
+
+    def metrics_summary(self, percentiles=(50, 90, 99)):
+        return self.request_stats.summary(percentiles) if self.request_stats is not None else None
+
+    def index(self, restype, key='name', case_insensitive=True, ttl=300):
+        """Returns the ResourceIndex of restype by key, shared by all callers
+        asking for the same index on this session.
+        """
+        with self.indexes_lock:
+            index_key = (restype, key, case_insensitive)
+            if index_key not in self.indexes:
+                self.indexes[index_key] = ResourceIndex(self, restype, key=key,
+                                                        case_insensitive=case_insensitive, ttl=ttl)
+
+            return self.indexes[index_key]
+
+    def invalidate_indexes(self, url):
+        path = normalize_url(url)[0]
+
+        with self.indexes_lock:
+            indexes = list(self.indexes.values())
+
+        for index in indexes:
+            if path == index.url or path.startswith(index.url + '/'):
+                index.invalidate()
+
+    def update_indexes(self, method, url, params, r):
+        path, query = normalize_url(url, params)
+
+        with self.indexes_lock:
+            indexes = list(self.indexes.values())
+
+        for index in indexes:
+            if path == index.url or path.startswith(index.url + '/'):
+                index.on_write(method, path, query, r)
+
     def __repr__(self):
         return 'EcxSession: user: %s' % self.username
 
+    def request(self, method, url, headers={}, **kwargs):
+        start = time.time()
+        self.adapter.take_connect_time()
+        r = None
+        error = None
+
+        try:
+            r = self.conn.request(method, url, headers=dict(self.headers, **headers), **kwargs)
+            return r
+        except requests.exceptions.RequestException as e:
+            r = getattr(e, 'response', None)
+            error = e.__class__.__name__
+            raise
+        finally:
+            if self.request_hooks:
+                self.run_request_hooks(method, url, r, error, time.time() - start, kwargs.get('stream', False))
+
+            # Even a failed request may have changed the resource.
+            if method != 'GET':
+                if self.cache is not None:
+                    self.cache.invalidate(url)
+
+                if self.inflight is not None:
+                    self.inflight.forget()
+
+                self.update_indexes(method, url, kwargs.get('params'), r if error is None else None)
+
+    def run_request_hooks(self, method, url, r, error, total, stream):
+        request_bytes = None
+        response_bytes = None
+        if r is not None:
+            body = r.request.body
+            request_bytes = len(body) if body is not None and not hasattr(body, 'read') else None
+
+            if stream:
+                length = r.headers.get('Content-Length')
+                response_bytes = int(length) if length is not None else None
+            else:
+                response_bytes = len(r.content)
+
+        record = RequestRecord(method, endpoint_template(self.api_url, url), url,
+                               r.status_code if r is not None else None,
+                               self.adapter.take_connect_time(), r.elapsed.total_seconds() if r is not None else None,
+                               total, request_bytes, response_bytes, error)
+
+        for hook in list(self.request_hooks):
+            try:
+                hook(record)
+            except Exception:
+                logging.exception("request hook %r failed" % hook)
+
     def get(self, restype=None, resid=None, path=None, params={}, endpoint=None, url=None):
+        cacheable = url is not None
         if url is None:
             url = build_url(self.api_url, restype, resid, path, endpoint)
 
-        return json.loads(self.conn.get(url, params=params).content)
-
-    def stream_get(self, restype=None, resid=None, path=None, params={}, endpoint=None, url=None, outfile=None):
+        return json.loads(self.get_content(url, params, cacheable=cacheable))
+
+    def get_content(self, url, params={}, cacheable=True):
+        """Returns the raw body of a GET of url, from the cache if enabled
+        and cacheable is set.
+        """
+        key = normalize_url(url, params)
+
+        cache = self.cache if cacheable else None
+        if cache is None:
+            return self.fetch_content(key, url, params)
+
+        content = cache.lookup(key)
+        if content is None:
+            generation = cache.generation
+            content = self.fetch_content(key, url, params)
+            cache.store(key, restype_for_url(self.api_url, url), content, generation)
+
+        return content
+
+    def fetch_content(self, key, url, params):
+        if self.inflight is None:
+            return self.request('GET', url, params=params).content
+
+        return self.inflight.do(key, lambda: self.request('GET', url, params=params).content)
+
+    def iter_get(self, urls, params={}, max_workers=8):
+        """GETs all urls concurrently using at most max_workers threads and
+        yields (url, response) pairs in the order the responses complete.
+        """
+        return iter_completed(lambda url: self.get(url=url, params=params), urls, max_workers)
+
+    def query(self, provider, resource_type, associated_with, chunk_size=100, max_workers=4):
+        """Yields the resource_type resources associated with any of the
+        hrefs in associated_with using the provider's "query" API.
+
+        Long associated_with lists are split into chunks of chunk_size that
+        are queried concurrently. Resources are yielded as chunks complete,
+        each one only once even if several chunks return it.
+        """
+        url = build_url(self.api_url, provider, path="query")
+        list_field = resource_to_listfield.get(resource_type, resource_type + 's')
+        chunks = [associated_with[i:i + chunk_size] for i in range(0, len(associated_with), chunk_size)]
+
+        def run_query(chunk):
+            return self.post(url=url, data={'associatedWith': chunk, 'resourceType': resource_type})
+
+        seen = set()
+        for chunk, resp in iter_completed(run_query, chunks, max_workers):
+            for resource in resp.get(list_field, []):
+                href = resource.get('links', {}).get('self', {}).get('href')
+                if href is not None:
+                    if href in seen:
+                        continue
+
+                    seen.add(href)
+
+                yield resource
+
+    def expand(self, objects, link_name, max_workers=8, attach=None):
+        """Resolves links[link_name] of every object in one batched step.
+
+        The hrefs are de-duplicated and the unique ones fetched concurrently.
+        Returns a dict mapping href to the fetched resource. If attach is
+        given, each object also gets the resource stored under that key
+        (objects sharing a link share the same resource dict). Objects
+        without the link are skipped.
+        """
+        hrefs = set()
+        for obj in objects:
+            link = obj.get('links', {}).get(link_name)
+            if link and link.get('href'):
+                hrefs.add(link['href'])
+
+        resources = dict(self.iter_get(hrefs, max_workers=max_workers))
+
+        if attach is not None:
+            for obj in objects:
+                link = obj.get('links', {}).get(link_name)
+                if link and link.get('href') in resources:
+                    obj[attach] = resources[link['href']]
+
+        return resources
+
+    def stream_get(self, restype=None, resid=None, path=None, params={}, endpoint=None, url=None, outfile=None,
+                   workers=4, timeout=(30, 300), retries=3, progress=None, chunk_size=64*1024):
+        """Downloads the content to outfile and returns outfile.
+
+        outfile is a file name, by default one from the response in a new
+        temporary directory, a writable file-like object (e.g. stdout, a
+        compressor or a socket) or a callable taking each chunk (e.g. the
+        update method of a hash). See RangeDownload for resuming, parallel
+        parts, retries and progress; parallel parts need a file name.
+        """
         if url is None:
             url = build_url(self.api_url, restype, resid, path, endpoint)
 
-        r = self.conn.get(url, params=params)
+        download = RangeDownload(self, url, params=params, workers=workers, timeout=timeout, retries=retries,
+                                 chunk_size=chunk_size, progress=progress)
+        r = download.open()
         logging.info("headers: %s" % r.headers)
 
-        # The response header Content-Disposition contains default file name
-        #   Content-Disposition: attachment; filename=log_1490030341274.zip
-        default_filename = re.findall('filename=(.+)', r.headers['Content-Disposition'])[0]
+        if outfile is not None and not isinstance(outfile, string_types):
+            write = outfile.write if hasattr(outfile, 'write') else outfile
+            for chunk in download.iter_chunks(r):
+                write(chunk)
+
+            return outfile
 
         if not outfile:
-            if not default_filename:
+            if not download.filename:
+                r.close()
                 raise Exception("Couldn't get the file name to save the contents.")
 
-            outfile = os.path.join(tempfile.mkdtemp(), default_filename)
+            outfile = os.path.join(tempfile.mkdtemp(), download.filename)
 
-        with open(outfile, 'wb') as fd:
-            for chunk in r.iter_content(chunk_size=64*1024):
-                fd.write(chunk)
+        return download.save(r, outfile)
 
-        return outfile
+    def stream_chunks(self, restype=None, resid=None, path=None, params={}, endpoint=None, url=None,
+                      timeout=(30, 300), retries=3, progress=None, chunk_size=64*1024):
+        """Returns an iterator over the content, chunk_size bytes at a time.
+        The request is sent right away so errors are raised here.
+        """
+        if url is None:
+            url = build_url(self.api_url, restype, resid, path, endpoint)
+
+        download = RangeDownload(self, url, params=params, timeout=timeout, retries=retries,
+                                 chunk_size=chunk_size, progress=progress)
+        r = download.open()
+        logging.info("headers: %s" % r.headers)
+
+        return download.iter_chunks(r)
 
     def delete(self, restype=None, resid=None, path=None, params={}, endpoint=None, url=None):
         if url is None:
             url = build_url(self.api_url, restype, resid, path, endpoint)
 
-        resp = self.conn.delete(url, params=params)
+        resp = self.request('DELETE', url, params=params)
 
         return json.loads(resp.content) if resp.content else None
 
@@ -166,7 +1472,7 @@ class EcxSession(object):
             url = build_url(self.api_url, restype, resid, path, endpoint)
 
         logging.info(json.dumps(data, indent=4))
-        r = self.conn.post(url, json=data, params=params)
+        r = self.request('POST', url, json=data, params=params)
 
         if r.content:
             #return json.loads(r.content.decode('utf-8'))
@@ -179,7 +1485,7 @@ class EcxSession(object):
             url = build_url(self.api_url, restype, resid, path, endpoint)
 
         logging.info(json.dumps(data, indent=4))
-        r = self.conn.put(url, json=data, params=params)
+        r = self.request('PUT', url, json=data, params=params)
 
         if r.content:
             return json.loads(r.content)
@@ -193,18 +1499,178 @@ class EcxAPI(object):
         self.endpoint = endpoint
         self.list_field = resource_to_listfield.get(restype, self.restype + 's')
 
-    def get(self, resid=None, path=None, params={}, url=None):
+    def get(self, resid=None, path=None, params={}, url=None, filter=None, sort=None):
+        params = build_list_params(params, filter=filter, sort=sort)
         return self.ecx_session.get(restype=self.restype, resid=resid, path=path, params=params, url=url)
 
-    def stream_get(self, resid=None, path=None, params={}, url=None, outfile=None):
+    def stream_get(self, resid=None, path=None, params={}, url=None, outfile=None, **kwargs):
         return self.ecx_session.stream_get(restype=self.restype, resid=resid, path=path,
-                                           params=params, url=url, outfile=outfile)
+                                           params=params, url=url, outfile=outfile, **kwargs)
+
+    def stream_chunks(self, resid=None, path=None, params={}, url=None, **kwargs):
+        return self.ecx_session.stream_chunks(restype=self.restype, resid=resid, path=path,
+                                              params=params, url=url, **kwargs)
 
     def delete(self, resid):
          return self.ecx_session.delete(restype=self.restype, resid=resid)
 
-    def list(self):
-        return self.ecx_session.get(restype=self.restype)[self.list_field]
+    def list(self, filter=None, sort=None):
+        params = build_list_params(filter=filter, sort=sort)
+        return self.ecx_session.get(restype=self.restype, params=params)[self.list_field]
+
+    def get_page(self, page_size, page_start_index=0, filter=None, sort=None, params={}):
+        params = build_list_params(params, page_size, page_start_index, filter, sort)
+        return self.ecx_session.get(restype=self.restype, params=params).get(self.list_field, [])
+
+    def iter_list(self, page_size=100, filter=None, sort=None, params={}, prefetch_depth=0):
+        """Generator version of list() that fetches the resources page by page
+        using "pageSize" and "pageStartIndex" so only one page is held in memory.
+
+        With prefetch_depth > 0, up to that many pages are read ahead on a
+        worker thread while the caller is processing the current page.
+        """
+        def fetch_page(size, start_index):
+            return self.get_page(size, start_index, filter=filter, sort=sort, params=params)
+
+        for page in prefetch(iter_pages(fetch_page, page_size), prefetch_depth):
+            for item in page:
+                yield item
+
+    def changes_since(self, timestamp, snapshot=None, full=False, page_size=100, snapshot_complete=True):
+        """Returns a ChangeSet of the resources added, changed or removed
+        after timestamp (ms since epoch, as in "lastUpdated").
+
+        The server is asked only for resources with lastUpdated > timestamp.
+        If it rejects that filter, or with full, everything is listed. If it
+        ignores the filter, the full listing it returned is used. snapshot
+        is a dict of resource key to hash from a previous ChangeSet and
+        snapshot_complete whether it has all resources. Resources found in
+        the snapshot are changed if their hash differs, others are added if
+        created after timestamp. Removals are only seen by a full listing
+        compared to a complete snapshot, otherwise removed is None. Pass
+        full now and then to find them.
+        """
+        snapshot_complete = snapshot is not None and snapshot_complete
+        snapshot = dict(snapshot or {})
+        resources = None
+        server_filtered = False
+
+        if not full:
+            try:
+                resources = list(self.iter_list(page_size=page_size, filter=F('lastUpdated') > timestamp))
+                server_filtered = True
+            except requests.exceptions.HTTPError as e:
+                logging.info("changes_since: lastUpdated filter not supported: %s" % e)
+
+            if resources is not None and any((res.get('lastUpdated') or 0) <= timestamp for res in resources):
+                logging.info("changes_since: lastUpdated filter ignored by the server")
+                server_filtered = False
+
+        if resources is None:
+            resources = list(self.iter_list(page_size=page_size))
+
+        added = []
+        changed = []
+        newest = timestamp
+        current = {}
+
+        for res in resources:
+            key = resource_key(res)
+            digest = resource_hash(res)
+            current[key] = digest
+            newest = max(newest, res.get('lastUpdated') or 0)
+
+            if key in snapshot:
+                if snapshot[key] != digest:
+                    changed.append(res)
+            elif snapshot_complete or (res.get('creationTime') or 0) > timestamp:
+                added.append(res)
+            elif server_filtered or (res.get('lastUpdated') or 0) > timestamp:
+                changed.append(res)
+
+        if server_filtered:
+            # Deleted resources aren't listed, so they can't be told apart
+            # from unchanged ones.
+            removed = None
+            snapshot.update(current)
+        else:
+            removed = set(snapshot) - set(current) if snapshot_complete else None
+            snapshot = current
+            snapshot_complete = True
+
+        return ChangeSet(added, changed, removed, newest, snapshot, server_filtered, snapshot_complete)
+
+    def find_by_name(self, name, page_size=100):
+        """Returns the first resource named name or None.
+
+        The name match is done by the server so normally only the matching
+        resource is transferred. Results are still compared here in case
+        the server ignores the filter.
+        """
+        for item in self.iter_list(page_size=page_size, filter=F('name') == name):
+            if item.get('name') == name:
+                return item
+
+        return None
+
+    def get_resource_sites(self, resources, chunk_size=100):
+        """Finds the site of many resources (VMs, volumes, ...) of this
+        provider with "query" calls that each name up to chunk_size of them.
+
+        Resources are grouped by their provider link (e.g. links['vsphere'])
+        since those usually share a site. A query only returns the set of
+        sites of all resources it names so a chunk that resolves to more
+        than one site is split in half and queried again. Returns a dict
+        mapping the self href of each resource to its site.
+        """
+        groups = collections.OrderedDict()
+        for res in resources:
+            parent = res['links'].get(self.restype, {}).get('href')
+            groups.setdefault(parent, []).append(res)
+
+        pending = []
+        for group in groups.values():
+            for i in range(0, len(group), chunk_size):
+                pending.append(group[i:i + chunk_size])
+
+        sites = {}
+        while pending:
+            chunk = pending.pop()
+            hrefs = [res['links']['self']['href'] + "?time=0" for res in chunk]
+            found = self.post(path="query", data={'associatedWith': hrefs, 'resourceType': 'site'}).get('sites', [])
+
+            if len(found) > 1 and len(chunk) > 1:
+                half = len(chunk) // 2
+                pending.extend([chunk[:half], chunk[half:]])
+            elif found:
+                for res in chunk:
+                    sites[res['links']['self']['href']] = found[0]
+
+        return sites
+
+    def get_resource_versions(self, resources, sites=None, max_workers=8):
+        """Fetches the versions (backup copies) of many resources
+        concurrently, each filtered by the resource's site. sites is the
+        result of get_resource_sites() and is looked up if not given.
+        Returns a dict mapping the self href of each resource to its list
+        of versions.
+        """
+        if sites is None:
+            sites = self.get_resource_sites(resources)
+
+        urls_by_site = collections.OrderedDict()
+        for res in resources:
+            href = res['links']['self']['href']
+            if href in sites:
+                urls_by_site.setdefault(sites[href]['id'], []).append(href + "/version")
+
+        versions = {}
+        for siteid, urls in urls_by_site.items():
+            params = build_list_params({'time': 0}, filter=F('siteId') == str(siteid))
+            for url, resp in self.ecx_session.iter_get(urls, params=params, max_workers=max_workers):
+                versions[url[:-len("/version")]] = resp['versions']
+
+        return versions
 
     def post(self, resid=None, path=None, data={}, params={}, url=None):
         return self.ecx_session.post(restype=self.restype, resid=resid, path=path, data=data,
@@ -214,6 +1680,128 @@ class EcxAPI(object):
         return self.ecx_session.put(restype=self.restype, resid=resid, path=path, data=data,
                                      params=params, url=url)
 
+class JobRunState(object):
+    """Follows the status of a started job to tell when it is done.
+
+    A started job goes from PENDING to active states such as RUNNING or
+    RESOURCE ACTIVE and is done when it is back to PENDING or IDLE. IDLE
+    right after the start, before any activity was seen, is only taken as
+    done after idle_grace seconds as the start may not show yet.
+    """
+    def __init__(self, idle_grace=5):
+        self.idle_grace = idle_grace
+        self.started = time.time()
+        self.status = None
+        self.active = False
+        self.done = False
+
+    def update(self, status):
+        """Records a polled status and returns whether it changed."""
+        changed = status != self.status
+        self.status = status
+
+        if (self.active and status == "PENDING") or \
+                (status == "IDLE" and (self.active or time.time() - self.started >= self.idle_grace)):
+            self.done = True
+
+        if status not in ("PENDING", "IDLE"):
+            self.active = True
+
+        return changed
+
+class LogCursor(object):
+    """Position in a stream of log entries sorted by logTime: the newest
+    logTime seen and the ids of the entries seen at exactly that time, so
+    re-reading from that logTime on never yields an entry twice.
+    """
+    def __init__(self, log_time=None, ids=()):
+        self.log_time = log_time
+        self.ids = set(ids)
+
+    def advance(self, entries):
+        """Returns the entries not seen yet and moves past them."""
+        new_entries = []
+        for entry in entries:
+            if entry['logTime'] == self.log_time and entry.get('id') in self.ids:
+                continue
+
+            if self.log_time is not None and entry['logTime'] < self.log_time:
+                continue
+
+            if entry['logTime'] != self.log_time:
+                self.log_time = entry['logTime']
+                self.ids = set()
+
+            self.ids.add(entry.get('id'))
+            new_entries.append(entry)
+
+        return new_entries
+
+    def to_dict(self):
+        return {'logTime': self.log_time, 'ids': sorted(self.ids, key=str)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('logTime'), data.get('ids', []))
+
+class LogTail(object):
+    """Incrementally reads the log of a job session.
+
+    Every fetch() asks only for entries at or after the cursor's logTime
+    (sorted by logTime and id) and drops the ones already seen there, so
+    nothing is read twice or missed at page boundaries. With cursor_file,
+    the cursor is saved after every fetch and loaded on creation so a
+    restarted follower resumes where it left off.
+    """
+    def __init__(self, ecx_session, jobsession_id, cursor_file=None, page_size=1000):
+        self.ecx_session = ecx_session
+        self.jobsession_id = jobsession_id
+        self.cursor_file = cursor_file
+        self.page_size = page_size
+        self.cursor = LogCursor()
+
+        if cursor_file and os.path.exists(cursor_file):
+            with open(cursor_file) as f:
+                self.cursor = LogCursor.from_dict(json.load(f))
+
+    def fetch_page(self, page_size, page_start_index):
+        cond = F('jobsessionId') == str(self.jobsession_id)
+        if self.cursor.log_time is not None:
+            cond = cond & (F('logTime') >= self.cursor.log_time)
+
+        params = build_list_params(page_size=page_size, page_start_index=page_start_index,
+                                   filter=cond, sort=F('logTime').asc() + F('id').asc())
+        return self.ecx_session.get(restype='log', path='job', params=params)['logs']
+
+    def fetch(self):
+        """Returns the log entries added since the last fetch."""
+        entries = []
+        for page in iter_pages(self.fetch_page, self.page_size):
+            entries.extend(page)
+
+        entries = self.cursor.advance(entries)
+        if self.cursor_file:
+            self.save()
+
+        return entries
+
+    def save(self):
+        save_json(self.cursor_file, self.cursor.to_dict())
+
+    def follow(self, interval=5, until=None):
+        """Yields new entries every interval seconds. When until() returns
+        True the remaining entries are yielded and the iteration ends.
+        """
+        while True:
+            done = until is not None and until()
+            for entry in self.fetch():
+                yield entry
+
+            if done:
+                return
+
+            time.sleep(interval)
+
 class JobAPI(EcxAPI):
     def __init__(self, ecx_session):
         super(JobAPI, self).__init__(ecx_session, 'job')
@@ -223,7 +1811,7 @@ class JobAPI(EcxAPI):
     def status(self, jobid):
         return self.ecx_session.get(restype=self.restype, resid=jobid, path='status')
 
-    # TODO: Accept a callback that can be called every time job status is polled.
+    # Use watch() to follow the job once it is started.
     # The process of job start is different depending on whether jobs have storage
     # workflows.
     def run(self, jobid, workflowid=None):
@@ -252,17 +1840,353 @@ class JobAPI(EcxAPI):
 
         return self.ecx_session.post(url=start_link['href'], data=reqdata)
 
-    def get_log_entries(self, jobsession_id, page_size=1000, page_start_index=0):
+    def watch(self, jobid, on_status=None, on_log=None, jobsession_id=None, min_interval=1, max_interval=30,
+              backoff=2, jitter=0.1, timeout=None, idle_grace=5):
+        """Polls the job until it is done (see JobRunState) and returns its
+        final status.
+
+        Polling starts every min_interval seconds and backs off by backoff
+        up to max_interval (with +/- jitter) while the status stays the
+        same. on_status(status) is called on every status change and
+        on_log(entries) with new log entries of the job session. An
+        Exception is raised if the job is not done within timeout seconds.
+        """
+        started = time.time()
+        interval = min_interval
+        state = JobRunState(idle_grace=idle_grace)
+        log_tail = None
+
+        while True:
+            status = self.status(jobid)['currentStatus']
+            logging.info("job status: %s" % status)
+
+            if state.update(status):
+                interval = min_interval
+                if on_status is not None:
+                    on_status(status)
+
+            if on_log is not None and (state.active or state.done):
+                if log_tail is None:
+                    if jobsession_id is None:
+                        jobsession_id = self.get(jobid)['lastrun']['sessionId']
+
+                    log_tail = LogTail(self.ecx_session, jobsession_id)
+
+                entries = log_tail.fetch()
+                if entries:
+                    on_log(entries)
+
+            if state.done:
+                return status
+
+            if timeout is not None and time.time() - started >= timeout:
+                raise Exception("Timed out waiting for job: %s" % jobid)
+
+            time.sleep(interval * random.uniform(1 - jitter, 1 + jitter))
+            interval = min(interval * backoff, max_interval)
+
+    def get_log_page(self, jobsession_id, page_size=1000, page_start_index=0):
+        """Returns the whole response for a page of the job session log,
+        including "total" when the server reports it.
+        """
         logging.info("*** get_log_entries: jobsession_id = %s, page_start_index: %s ***" % (jobsession_id, page_start_index))
 
         resp = self.ecx_session.get(restype='log', path='job',
-                                    params={'pageSize': page_size, 'pageStartIndex': page_start_index,
-                                            'sort': '[{"property":"logTime","direction":"ASC"}]',
-                                            'filter': '[{"property":"jobsessionId","value":"%s"}]'%jobsession_id})
+                                    params=build_list_params(page_size=page_size, page_start_index=page_start_index,
+                                                             sort=F('logTime').asc() + F('id').asc(),
+                                                             filter=F('jobsessionId') == str(jobsession_id)))
 
         logging.info("*** get_log_entries:     Received %d entries..." % len(resp['logs']))
 
-        return resp['logs']
+        return resp
+
+    def get_log_entries(self, jobsession_id, page_size=1000, page_start_index=0):
+        return self.get_log_page(jobsession_id, page_size, page_start_index)['logs']
+
+    def iter_session_log(self, jobsession_id, workers=4, page_size=1000):
+        """Yields all log entries of a job session in logTime order while
+        fetching up to workers pages concurrently.
+
+        The first page tells the total number of entries when the server
+        reports it. Otherwise pages are requested workers at a time until
+        one comes back short. Pages are yielded in order as soon as all
+        earlier ones arrived, so at most workers pages are held in memory.
+        """
+        first = self.get_log_page(jobsession_id, page_size, 0)
+        for entry in first['logs']:
+            yield entry
+
+        if len(first['logs']) != page_size:
+            return
+
+        total = first.get('total')
+        num_pages = None if total is None else (int(total) + page_size - 1) // page_size
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        window = collections.deque()
+        next_page = 1
+
+        try:
+            while True:
+                while len(window) < workers and (num_pages is None or next_page < num_pages):
+                    window.append(executor.submit(self.get_log_entries, jobsession_id, page_size, next_page * page_size))
+                    next_page += 1
+
+                if not window:
+                    return
+
+                page = window.popleft().result()
+                for entry in page:
+                    yield entry
+
+                if len(page) != page_size:
+                    # Pages requested after a short one are past the end.
+                    return
+        finally:
+            for future in window:
+                future.cancel()
+
+            executor.shutdown(wait=False)
+
+    def download_session_log(self, jobsession_id, sink, workers=4, page_size=1000):
+        """Fetches the complete log of a job session with parallel paged
+        reads (see iter_session_log()) and passes each entry, in logTime
+        order, to sink. Returns the number of entries.
+        """
+        count = 0
+        for entry in self.iter_session_log(jobsession_id, workers=workers, page_size=page_size):
+            sink(entry)
+            count += 1
+
+        return count
+
+    def iter_log_entries(self, jobsession_id, page_size=1000, page_start_index=0, prefetch_depth=1):
+        """Yields all log entries of a job session, fetching the next page in
+        the background while the caller handles the current one.
+        """
+        def fetch_page(size, start_index):
+            return self.get_log_entries(jobsession_id, page_size=size, page_start_index=start_index)
+
+        for page in prefetch(iter_pages(fetch_page, page_size, page_start_index), prefetch_depth):
+            for entry in page:
+                yield entry
+
+JobEvent = collections.namedtuple('JobEvent', ['kind', 'jobid', 'status', 'entries'])
+
+class JobMonitor(object):
+    """Follows many running jobs with a fixed number of requests per tick.
+
+    Each poll() lists the tracked jobs with one filtered, paged job listing
+    and fetches new log entries of all their sessions with one log query,
+    instead of a status and a log call per job. Events are JobEvent tuples
+    of kind "status" (status changed), "log" (new entries, oldest first)
+    and "done" (final status). They are passed to on_event and also
+    returned by poll() and yielded by events().
+
+    Job ids are kept as strings, like the server returns them. The log of
+    a job is followed once it runs: the "lastrun" session seen before the
+    job became active is the previous run's and is not followed.
+
+    The log query only asks for entries from the oldest logTime any
+    followed session still needs: its cursor, or the start of its run
+    ("lastRunTime") while it has no entries yet. Entries are assumed to be
+    logged within log_lag seconds of their logTime, so a quiet session
+    doesn't hold that bound further back than log_lag before the newest
+    entry seen.
+    """
+    def __init__(self, ecx_session, jobids=(), on_event=None, interval=10, follow_logs=True, idle_grace=5,
+                 page_size=1000, log_lag=60):
+        self.ecx_session = ecx_session
+        self.on_event = on_event
+        self.interval = interval
+        self.follow_logs = follow_logs
+        self.idle_grace = idle_grace
+        self.page_size = page_size
+        self.log_lag = log_lag
+
+        self.jobs = collections.OrderedDict()
+        # Followed session id -> job id, each followed session's cursor and
+        # the logTime before which it has no entries to fetch, if known.
+        self.sessions = {}
+        self.cursors = {}
+        self.floors = {}
+        # Job id -> "lastrun" session id seen when the job was first listed.
+        self.previous_sessions = {}
+
+        # Set when the server turns out not to support "IN" filters.
+        self.list_all_jobs = False
+        self.query_each_session = False
+
+        for jobid in jobids:
+            self.add(jobid)
+
+    def add(self, jobid, jobsession_id=None):
+        jobid = str(jobid)
+        self.jobs[jobid] = JobRunState(idle_grace=self.idle_grace)
+        if jobsession_id is not None:
+            self.follow_session(jobid, jobsession_id)
+
+    def remove(self, jobid):
+        jobid = str(jobid)
+        self.jobs.pop(jobid, None)
+        self.previous_sessions.pop(jobid, None)
+        self.forget_sessions(jobid)
+
+    def forget_sessions(self, jobid):
+        for sessionid, sessionjob in list(self.sessions.items()):
+            if sessionjob == jobid:
+                del self.sessions[sessionid]
+                del self.cursors[sessionid]
+                self.floors.pop(sessionid, None)
+
+    def follow_session(self, jobid, sessionid, start=None):
+        sessionid = str(sessionid)
+        if self.sessions.get(sessionid) == jobid:
+            return
+
+        # A new run replaces the session of the previous one.
+        self.forget_sessions(jobid)
+        self.sessions[sessionid] = jobid
+        self.cursors[sessionid] = LogCursor()
+        self.floors[sessionid] = start
+
+    def pending(self):
+        return [jobid for jobid, state in self.jobs.items() if not state.done]
+
+    def list_jobs(self, jobids):
+        api = EcxAPI(self.ecx_session, 'job')
+        if not self.list_all_jobs:
+            try:
+                return list(api.iter_list(page_size=self.page_size, filter=F('id').in_(jobids)))
+            except requests.exceptions.HTTPError as e:
+                logging.info("JobMonitor: listing jobs by id failed, listing all: %s" % e)
+                self.list_all_jobs = True
+
+        return list(api.iter_list(page_size=self.page_size))
+
+    def log_floor(self, sessionid):
+        """Returns the logTime from which the entries of a session are
+        needed, None for all of them.
+        """
+        log_times = [log_time for log_time in (self.cursors[sessionid].log_time, self.floors.get(sessionid))
+                     if log_time is not None]
+        return max(log_times) if log_times else None
+
+    def query_logs(self, sessionids):
+        cond = F('jobsessionId').in_(sessionids)
+
+        # Sessions have their own cursors, the query starts at the oldest.
+        floors = [self.log_floor(sessionid) for sessionid in sessionids]
+        if None not in floors:
+            cond = cond & (F('logTime') >= min(floors))
+
+        def fetch_page(size, start_index):
+            params = build_list_params(page_size=size, page_start_index=start_index,
+                                       filter=cond, sort=F('logTime').asc() + F('id').asc())
+            return self.ecx_session.get(restype='log', path='job', params=params)['logs']
+
+        return [entry for page in iter_pages(fetch_page, self.page_size) for entry in page]
+
+    def new_log_entries(self, sessionids):
+        if not self.query_each_session:
+            try:
+                entries = self.query_logs(sessionids)
+            except requests.exceptions.HTTPError as e:
+                logging.info("JobMonitor: log query by sessions failed, querying each: %s" % e)
+                self.query_each_session = True
+
+        if self.query_each_session:
+            entries = []
+            for sessionid in sessionids:
+                entries.extend(self.query_logs([sessionid]))
+
+        by_session = collections.OrderedDict((sessionid, []) for sessionid in sessionids)
+        for entry in entries:
+            sessionid = str(entry.get('jobsessionId'))
+            if sessionid in by_session:
+                by_session[sessionid].append(entry)
+
+        # Whatever any session logged before log_lag ahead of the newest
+        # entry is in by now.
+        if entries:
+            horizon = max(entry['logTime'] for entry in entries) - self.log_lag * 1000
+            for sessionid in sessionids:
+                floor = self.floors.get(sessionid)
+                self.floors[sessionid] = horizon if floor is None else max(floor, horizon)
+
+        new_entries = []
+        for sessionid, session_entries in by_session.items():
+            new_entries.extend(self.cursors[sessionid].advance(session_entries))
+
+        new_entries.sort(key=lambda entry: entry['logTime'])
+        return new_entries
+
+    def poll(self):
+        """Refreshes all tracked jobs once and returns the resulting events."""
+        events = []
+        jobids = self.pending()
+        if not jobids:
+            return events
+
+        tracked = set(jobids)
+        for job in self.list_jobs(jobids):
+            jobid = str(job['id'])
+            if jobid not in tracked:
+                continue
+
+            state = self.jobs[jobid]
+            if state.update(job['status']):
+                events.append(JobEvent('status', jobid, job['status'], None))
+
+            sessionid = job.get('lastrun', {}).get('sessionId')
+            if sessionid is not None:
+                sessionid = str(sessionid)
+                previous = self.previous_sessions.setdefault(jobid, sessionid)
+                if state.active or sessionid != previous:
+                    self.follow_session(jobid, sessionid, job.get('lastRunTime'))
+
+        if self.follow_logs:
+            sessionids = [sessionid for sessionid, jobid in self.sessions.items() if jobid in tracked]
+            entries_by_job = collections.OrderedDict()
+            if sessionids:
+                for entry in self.new_log_entries(sessionids):
+                    jobid = self.sessions.get(str(entry.get('jobsessionId')))
+                    if jobid is not None:
+                        entries_by_job.setdefault(jobid, []).append(entry)
+
+            for jobid, entries in entries_by_job.items():
+                events.append(JobEvent('log', jobid, self.jobs[jobid].status, entries))
+
+        for jobid in jobids:
+            state = self.jobs[jobid]
+            if state.done:
+                events.append(JobEvent('done', jobid, state.status, None))
+
+        if self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+
+        return events
+
+    def events(self):
+        """Yields events until all tracked jobs are done."""
+        while True:
+            for event in self.poll():
+                yield event
+
+            if not self.pending():
+                return
+
+            time.sleep(self.interval)
+
+    def run(self):
+        """Polls until all tracked jobs are done and returns their final
+        status by job id.
+        """
+        for event in self.events():
+            pass
+
+        return dict((jobid, state.status) for jobid, state in self.jobs.items())
 
 class UserIdentityAPI(EcxAPI):
     def __init__(self, ecx_session):
@@ -279,6 +2203,30 @@ class VsphereAPI(EcxAPI):
     def __init__(self, ecx_session):
         super(VsphereAPI, self).__init__(ecx_session, 'vsphere')
 
+    def walk(self, link_name, list_field=None, max_workers=8):
+        """Follows links[link_name] of every vCenter in parallel and yields the
+        listed resources as soon as each vCenter's response arrives.
+        """
+        list_field = list_field or link_name
+        hrefs = [vsphere['links'][link_name]['href'] for vsphere in self.list()
+                 if link_name in vsphere.get('links', {})]
+
+        for href, resp in self.ecx_session.iter_get(hrefs, max_workers=max_workers):
+            for resource in resp.get(list_field, []):
+                yield resource
+
+    def walk_vms(self, max_workers=8):
+        return self.walk('vms', max_workers=max_workers)
+
+    def walk_hosts(self, max_workers=8):
+        return self.walk('hosts', max_workers=max_workers)
+
+    def walk_datastores(self, max_workers=8):
+        return self.walk('datastores', max_workers=max_workers)
+
+    def walk_networks(self, max_workers=8):
+        return self.walk('networks', max_workers=max_workers)
+
 class ResProviderAPI(EcxAPI):
     # Credential info is passed in different field names so we need to maintain
     # the mapping.
@@ -324,8 +2272,11 @@ class LogAPI(EcxAPI):
     def __init__(self, ecx_session):
         super(LogAPI, self).__init__(ecx_session, 'log')
 
-    def download_logs(self, outfile=None):
-        return self.stream_get(path="download/diagnostics", outfile=outfile)
+    def download_logs(self, outfile=None, **kwargs):
+        return self.stream_get(path="download/diagnostics", outfile=outfile, **kwargs)
+
+    def iter_logs(self, **kwargs):
+        return self.stream_chunks(path="download/diagnostics", **kwargs)
 
 class OracleAPI(EcxAPI):
     def __init__(self, ecx_session):
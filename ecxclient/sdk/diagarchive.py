@@ -0,0 +1,202 @@
+"""Looks into diagnostics archives without extracting all of them.
+
+A zip archive can be read starting from its central directory at the end,
+so DiagnosticsArchive only reads the directory and the members asked for.
+With open_diagnostics(), the archive isn't even downloaded when the
+appliance supports HTTP Range requests and sends an ETag or Last-Modified:
+reads go through HttpRangeFile, a seekable file whose reads are ranged
+GETs. Otherwise the archive is
+downloaded to a temporary file first, which is removed when the archive
+is closed.
+
+    archive = open_diagnostics(session)
+    for member, lineno, line in archive.grep('ERROR .*snapshot', members=['*.log']):
+        print(member, lineno, line)
+    archive.extract(['*/catalina.out'], '/tmp/triage')
+"""
+
+import fnmatch
+import gzip
+import io
+import logging
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+
+from ecxclient.sdk.client import RangeDownload
+from ecxclient.sdk.client import build_url
+from ecxclient.sdk.client import string_types
+
+class HttpRangeFile(io.RawIOBase):
+    """Read-only, seekable file of a url the server serves with ranges.
+
+    Reads are rounded up to at least block_size. The read-ahead doubles,
+    up to max_readahead, while reads are sequential, so streaming a large
+    member takes few requests while the many small reads of zip headers
+    are served from one block.
+    """
+    def __init__(self, download, size, block_size=256*1024, max_readahead=8*1024*1024):
+        self.download = download
+        self.size = size
+        self.block_size = block_size
+        self.max_readahead = max_readahead
+
+        self.pos = 0
+        self.readahead = block_size
+        self.buffer_start = 0
+        self.buffer = b''
+        self.requests = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+
+        if offset < 0:
+            raise ValueError("negative seek position %d" % offset)
+
+        self.pos = offset
+        return self.pos
+
+    def fetch(self, start):
+        if start == self.buffer_start + len(self.buffer):
+            self.readahead = min(self.readahead * 2, self.max_readahead)
+        else:
+            self.readahead = self.block_size
+
+        end = min(start + self.readahead, self.size)
+        headers = {'Range': 'bytes=%d-%d' % (start, end - 1)}
+        if self.download.validator:
+            headers['If-Range'] = self.download.validator
+
+        r = self.download.get(headers)
+        try:
+            if r.status_code != 206:
+                raise Exception("%s changed while reading it" % self.download.url)
+
+            self.buffer = r.content
+        finally:
+            r.close()
+
+        self.buffer_start = start
+        self.requests += 1
+
+    def readinto(self, b):
+        view = memoryview(b)
+        filled = 0
+        while filled < len(view) and self.pos < self.size:
+            offset = self.pos - self.buffer_start
+            if offset < 0 or offset >= len(self.buffer):
+                self.fetch(self.pos)
+                offset = 0
+
+            n = min(len(view) - filled, len(self.buffer) - offset)
+            view[filled:filled + n] = self.buffer[offset:offset + n]
+            filled += n
+            self.pos += n
+
+        return filled
+
+class DiagnosticsArchive(object):
+    """A diagnostics zip archive, from a file name or a seekable file
+    object. members arguments are lists of glob patterns of member names.
+    tmpdir, if given, is removed with everything in it on close().
+    """
+    def __init__(self, source, name=None, tmpdir=None):
+        self.name = name or (source if isinstance(source, string_types) else None)
+        self.tmpdir = tmpdir
+        try:
+            self.zipfile = zipfile.ZipFile(source)
+        except Exception:
+            self.remove_tmpdir()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.zipfile.close()
+        self.remove_tmpdir()
+
+    def remove_tmpdir(self):
+        if self.tmpdir is not None:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+            self.tmpdir = None
+
+    def members(self, members=None):
+        """Returns the ZipInfo of the members (files only) matching any of
+        the patterns, all files if members is None.
+        """
+        infos = [info for info in self.zipfile.infolist() if not info.filename.endswith('/')]
+        if not members:
+            return infos
+
+        return [info for info in infos if any(fnmatch.fnmatch(info.filename, pattern) for pattern in members)]
+
+    def open(self, member):
+        """Opens a member for reading."""
+        return self.zipfile.open(member)
+
+    def grep(self, pattern, members=None, ignore_case=False):
+        """Yields (member name, line number, line) of the lines of members
+        that pattern is found in. Members, and the .gz files among them, are
+        decompressed as they are read.
+        """
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        for info in self.members(members):
+            with self.open(info) as stream:
+                if info.filename.endswith('.gz'):
+                    stream = gzip.GzipFile(fileobj=stream)
+
+                text = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+                for lineno, line in enumerate(text, 1):
+                    if regex.search(line):
+                        yield info.filename, lineno, line.rstrip('\r\n')
+
+    def extract(self, members=None, dest='.'):
+        """Extracts the matching members under dest and returns their paths."""
+        return [self.zipfile.extract(info, dest) for info in self.members(members)]
+
+def open_diagnostics(ecx_session, url=None, params={}, timeout=(30, 300)):
+    """Opens the diagnostics archive of the appliance, or the archive at
+    url, reading it remotely when the server supports ranges.
+    """
+    if url is None:
+        url = build_url(ecx_session.api_url, 'log', path='download/diagnostics')
+
+    download = RangeDownload(ecx_session, url, params=params, timeout=timeout)
+    r = download.open()
+
+    if r.status_code == 206:
+        download.use_range_response(r)
+
+    # Without a validator, reads of an archive generated again in between
+    # would mix two archives.
+    if r.status_code == 206 and download.validator:
+        r.close()
+        return DiagnosticsArchive(HttpRangeFile(download, download.total), name=download.filename)
+
+    logging.info("open_diagnostics: no range support or validator, downloading %s" % url)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        outfile = download.save(r, os.path.join(tmpdir, download.filename or 'diagnostics.zip'))
+    except Exception:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+
+    return DiagnosticsArchive(outfile, tmpdir=tmpdir)
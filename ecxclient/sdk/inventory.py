@@ -0,0 +1,295 @@
+"""Persistent, incrementally refreshed cache of the ECX inventory.
+
+Listing every VM, datastore, volume or database of a large appliance takes
+minutes. InventoryCache keeps those resources in a local SQLite database
+(by default "inventory.db" next to the ecxcli "config.ini") keyed by href,
+so lookups of a warm cache do not touch the appliance at all.
+
+A kind of resource is refreshed when it is older than max_age. Children of
+a provider whose resources carry "lastUpdated" are refreshed incrementally:
+only resources updated after the newest one already cached are requested.
+Incremental refreshes can't see deletions so a full refresh, which also
+drops resources gone from the appliance, is done every full_refresh_interval.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+from ecxclient.sdk.client import F
+from ecxclient.sdk.client import build_list_params
+from ecxclient.sdk.client import build_url
+from ecxclient.sdk.client import iter_completed
+
+class InventoryKind(object):
+    """Describes how to list one kind of resource: list the providers
+    (parents) first and then follow each provider's child_link. child_path
+    is used, with the provider's fields, when the provider has no such link.
+    """
+    def __init__(self, parent_kind, parent_restype, parent_path, parent_list_field,
+                 child_link, child_list_field=None, child_path=None):
+        self.parent_kind = parent_kind
+        self.parent_restype = parent_restype
+        self.parent_path = parent_path
+        self.parent_list_field = parent_list_field
+        self.child_link = child_link
+        self.child_list_field = child_list_field or child_link
+        self.child_path = child_path
+
+inventory_kinds = {
+    'vm': InventoryKind('vsphere', 'vsphere', None, 'vspheres', 'vms'),
+    'host': InventoryKind('vsphere', 'vsphere', None, 'vspheres', 'hosts'),
+    'datastore': InventoryKind('vsphere', 'vsphere', None, 'vspheres', 'datastores'),
+    'network': InventoryKind('vsphere', 'vsphere', None, 'vspheres', 'networks'),
+    'volume': InventoryKind('ibmsvc', 'ibmsvc', None, 'ibmsvcs', 'volumes'),
+    'oracledatabase': InventoryKind('oracleinstance', 'oracle', 'oraclehome', 'instances', 'databases',
+                                    child_path='oraclehome/%(id)s/database'),
+    'sqldatabase': InventoryKind('sqlinstance', 'application', 'sql/instance', 'instances', 'databases'),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    appliance TEXT NOT NULL,
+    href TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT,
+    parent_href TEXT,
+    last_updated INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (appliance, href)
+);
+CREATE INDEX IF NOT EXISTS resources_kind_name ON resources (appliance, kind, name);
+CREATE INDEX IF NOT EXISTS resources_parent ON resources (appliance, parent_href, kind);
+CREATE TABLE IF NOT EXISTS refreshes (
+    appliance TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    full_refreshed_at REAL NOT NULL,
+    PRIMARY KEY (appliance, kind)
+);
+"""
+
+def default_inventory_path():
+    import click
+    return os.path.join(click.get_app_dir("ecxcli"), 'inventory.db')
+
+def self_href(resource):
+    return resource.get('links', {}).get('self', {}).get('href')
+
+class InventoryCache(object):
+    def __init__(self, ecx_session, path=None, max_age=3600, full_refresh_interval=86400, max_workers=8):
+        self.ecx_session = ecx_session
+        self.appliance = ecx_session.url
+        self.path = path or default_inventory_path()
+        self.max_age = max_age
+        self.full_refresh_interval = full_refresh_interval
+        self.max_workers = max_workers
+
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def last_refresh(self, kind):
+        with self.lock:
+            row = self.db.execute("SELECT refreshed_at, full_refreshed_at FROM refreshes WHERE appliance = ? AND kind = ?",
+                                  (self.appliance, kind)).fetchone()
+
+        return row if row else (None, None)
+
+    def is_stale(self, kind):
+        refreshed_at = self.last_refresh(kind)[0]
+        return refreshed_at is None or (self.max_age is not None and time.time() - refreshed_at >= self.max_age)
+
+    def refresh(self, kind, full=None):
+        """Brings the cached resources of kind up to date with the appliance.
+        With full=None, a full refresh is done only when the last one is
+        older than full_refresh_interval. If a provider can't be listed, the
+        kind isn't marked refreshed: it stays as stale as it was.
+        """
+        if kind not in inventory_kinds:
+            return self.refresh_parents(self.parent_spec(kind))
+
+        spec = inventory_kinds[kind]
+        now = time.time()
+
+        full_refreshed_at = self.last_refresh(kind)[1]
+        if full is None:
+            full = full_refreshed_at is None or now - full_refreshed_at >= self.full_refresh_interval
+
+        parents = self.refresh_parents(spec)
+
+        def list_children(url, watermark):
+            params = {} if watermark is None else build_list_params(filter=F('lastUpdated') > watermark)
+            return self.ecx_session.get(url=url, params=params).get(spec.child_list_field, [])
+
+        def fetch_children(parent):
+            url = self.child_url(spec, parent)
+            watermark = None if full else self.watermark(kind, self_href(parent))
+
+            try:
+                try:
+                    return watermark, list_children(url, watermark)
+                except requests.exceptions.HTTPError as e:
+                    if watermark is None:
+                        raise
+
+                    logging.info("inventory: lastUpdated filter not supported, listing all %s of %s: %s" %
+                                 (kind, self_href(parent), e))
+                    return None, list_children(url, None)
+            except Exception as e:
+                # Keep what we have for providers that can't be reached.
+                logging.warning("inventory: couldn't list %s of %s: %s" % (kind, self_href(parent), e))
+                return watermark, None
+
+        providers = []
+        for parent in parents:
+            if self.child_url(spec, parent) is None:
+                logging.info("inventory: %s has no %s" % (self_href(parent), spec.child_link))
+            else:
+                providers.append(parent)
+
+        failed = False
+        for parent, (watermark, children) in iter_completed(fetch_children, providers, self.max_workers):
+            if children is None:
+                failed = True
+            else:
+                self.store(kind, children, self_href(parent), replace=(watermark is None))
+
+        if not failed:
+            self.mark_refreshed(kind, now, now if full else full_refreshed_at)
+
+    def child_url(self, spec, parent):
+        url = parent.get('links', {}).get(spec.child_link, {}).get('href')
+        if url is None and spec.child_path is not None:
+            url = build_url(self.ecx_session.api_url, spec.parent_restype, path=spec.child_path % parent)
+
+        return url
+
+    def parent_spec(self, parent_kind):
+        for spec in inventory_kinds.values():
+            if spec.parent_kind == parent_kind:
+                return spec
+
+        raise KeyError(parent_kind)
+
+    def refresh_parents(self, spec):
+        now = time.time()
+        parents = self.ecx_session.get(restype=spec.parent_restype, path=spec.parent_path)[spec.parent_list_field]
+        self.store(spec.parent_kind, parents, None, replace=True)
+        self.mark_refreshed(spec.parent_kind, now, now)
+
+        return parents
+
+    def mark_refreshed(self, kind, refreshed_at, full_refreshed_at):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO refreshes (appliance, kind, refreshed_at, full_refreshed_at) "
+                            "VALUES (?, ?, ?, ?)", (self.appliance, kind, refreshed_at, full_refreshed_at))
+
+    def watermark(self, kind, parent_href):
+        """Returns the newest lastUpdated of the cached children of a parent,
+        or None if an incremental refresh isn't possible for them.
+        """
+        with self.lock:
+            count, with_timestamp, newest = self.db.execute(
+                "SELECT COUNT(*), COUNT(last_updated), MAX(last_updated) FROM resources "
+                "WHERE appliance = ? AND kind = ? AND parent_href = ?",
+                (self.appliance, kind, parent_href)).fetchone()
+
+        if count == 0 or with_timestamp != count:
+            return None
+
+        return newest
+
+    def store(self, kind, resources, parent_href, replace):
+        """Upserts resources, skipping the ones whose lastUpdated didn't
+        change. With replace, cached resources of kind under parent_href that
+        are not in resources are deleted.
+        """
+        with self.lock, self.db:
+            if parent_href is None:
+                rows = self.db.execute("SELECT href, last_updated FROM resources WHERE appliance = ? AND kind = ?",
+                                       (self.appliance, kind))
+            else:
+                rows = self.db.execute("SELECT href, last_updated FROM resources "
+                                       "WHERE appliance = ? AND kind = ? AND parent_href = ?",
+                                       (self.appliance, kind, parent_href))
+
+            cached = dict(rows.fetchall())
+            seen = set()
+
+            for resource in resources:
+                href = self_href(resource)
+                if href is None:
+                    continue
+
+                seen.add(href)
+                last_updated = resource.get('lastUpdated')
+                if href in cached and last_updated is not None and cached[href] == last_updated:
+                    continue
+
+                self.db.execute("INSERT OR REPLACE INTO resources "
+                                "(appliance, href, kind, name, parent_href, last_updated, data) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (self.appliance, href, kind, resource.get('name'), parent_href, last_updated,
+                                 json.dumps(resource)))
+
+            if replace:
+                for href in set(cached) - seen:
+                    self.db.execute("DELETE FROM resources WHERE appliance = ? AND (href = ? OR parent_href = ?)",
+                                    (self.appliance, href, href))
+
+    def ensure_fresh(self, kind):
+        if self.is_stale(kind):
+            self.refresh(kind)
+
+    def query(self, kind, where='', args=()):
+        self.ensure_fresh(kind)
+
+        with self.lock:
+            rows = self.db.execute("SELECT data FROM resources WHERE appliance = ? AND kind = ?" + where,
+                                   (self.appliance, kind) + tuple(args)).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+    def list(self, kind, parent=None):
+        """Returns all resources of kind, optionally only the children of
+        parent (a resource or an href).
+        """
+        if parent is None:
+            return self.query(kind)
+
+        parent_href = parent if not isinstance(parent, dict) else self_href(parent)
+        return self.query(kind, " AND parent_href = ?", (parent_href,))
+
+    def find(self, kind, name, case_insensitive=False):
+        if case_insensitive:
+            return self.query(kind, " AND name = ? COLLATE NOCASE", (name,))
+
+        return self.query(kind, " AND name = ?", (name,))
+
+    def find_one(self, kind, name, case_insensitive=False):
+        found = self.find(kind, name, case_insensitive=case_insensitive)
+        return found[0] if found else None
+
+    def get(self, href):
+        with self.lock:
+            row = self.db.execute("SELECT data FROM resources WHERE appliance = ? AND href = ?",
+                                  (self.appliance, href)).fetchone()
+
+        if row is None:
+            return self.ecx_session.get(url=href)
+
+        return json.loads(row[0])
@@ -0,0 +1,191 @@
+"""Streaming exporters for job log entries.
+
+The exporters write entries as they come from an iterator, e.g.
+JobAPI.iter_session_log() or LogTail.follow(), so memory use does not
+depend on the size of the log. Output goes through a large write buffer
+and can be gzip or zstd ("pip install zstandard") compressed.
+
+    with CsvLogExporter.open('/tmp/session.csv.gz') as exporter:
+        exporter.write_all(jobapi.iter_session_log(session_id))
+"""
+
+import csv
+import gzip
+import io
+import json
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    text_type = unicode
+except NameError:
+    # Python 3
+    text_type = str
+
+def compression_for_path(path):
+    if path.endswith('.gz'):
+        return 'gzip'
+
+    if path.endswith('.zst'):
+        return 'zstd'
+
+    return None
+
+def open_output(path, compression='auto', buffer_size=1024*1024):
+    """Opens path for writing as a buffered binary stream. compression is
+    None, "gzip", "zstd" or "auto" to pick one from the file extension.
+    """
+    if compression == 'auto':
+        compression = compression_for_path(path)
+
+    if compression not in (None, 'gzip', 'zstd'):
+        raise Exception("Unknown compression: %s" % compression)
+
+    if compression == 'zstd' and zstandard is None:
+        raise Exception("zstd compression needs the zstandard package.")
+
+    raw = open(path, 'wb')
+
+    if compression == 'gzip':
+        stream = gzip.GzipFile(fileobj=raw, mode='wb')
+    elif compression == 'zstd':
+        stream = zstandard.ZstdCompressor().stream_writer(raw)
+    else:
+        stream = raw
+
+    return io.BufferedWriter(CloseAll(stream, raw), buffer_size=buffer_size)
+
+class CloseAll(io.RawIOBase):
+    """Writable stream that closes the underlying file too when the
+    compressor on top of it is closed.
+    """
+    def __init__(self, stream, raw):
+        self.stream = stream
+        self.raw = raw
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.stream.write(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+            if self.raw is not self.stream:
+                self.raw.close()
+
+        super(CloseAll, self).close()
+
+class EncodingWriter(object):
+    """Writes text to a binary stream as UTF-8. str is text on Python 3
+    and already encoded on Python 2, where csv and json produce it.
+    """
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, data):
+        if isinstance(data, text_type):
+            data = data.encode('utf-8')
+
+        self.out.write(data)
+
+class TimestampFormatter(object):
+    """Formats "logTime" values (ms since epoch) with time.strftime, reusing
+    the string for entries logged within the same second.
+    """
+    def __init__(self, time_format='%Y-%m-%d %H:%M:%S', cache_size=4096):
+        self.time_format = time_format
+        self.cache_size = cache_size
+        self.cache = {}
+
+    def __call__(self, log_time):
+        seconds = int(log_time) // 1000
+        formatted = self.cache.get(seconds)
+        if formatted is None:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+
+            formatted = self.cache[seconds] = time.strftime(self.time_format, time.localtime(seconds))
+
+        return formatted
+
+class LogExporter(object):
+    """Base class of the exporters. An exporter is also a callable taking
+    one entry so it can be used as sink for JobAPI.download_session_log().
+    """
+    def __init__(self, out):
+        self.out = out
+        self.writer = EncodingWriter(out)
+        self.count = 0
+
+    @classmethod
+    def open(cls, path, compression='auto', **kwargs):
+        return cls(open_output(path, compression=compression), **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __call__(self, entry):
+        self.write(entry)
+
+    def write(self, entry):
+        raise NotImplementedError()
+
+    def write_all(self, entries):
+        for entry in entries:
+            self.write(entry)
+
+        return self.count
+
+    def close(self):
+        self.out.close()
+
+class CsvLogExporter(LogExporter):
+    def __init__(self, out, fields=('logTime', 'message'), headers=('TimeStamp', 'Message'),
+                 time_format='%Y-%m-%d %H:%M:%S'):
+        super(CsvLogExporter, self).__init__(out)
+        self.fields = fields
+        self.format_time = TimestampFormatter(time_format)
+        self.csv = csv.writer(self.writer)
+
+        if headers:
+            self.csv.writerow(headers)
+
+    def write(self, entry):
+        row = []
+        for field in self.fields:
+            value = entry.get(field)
+            if field == 'logTime' and value is not None:
+                value = self.format_time(value)
+            elif str is bytes and isinstance(value, text_type):
+                # Python 2 csv only takes bytes.
+                value = value.encode('utf-8')
+
+            row.append(value)
+
+        self.csv.writerow(row)
+        self.count += 1
+
+class JsonLinesLogExporter(LogExporter):
+    def write(self, entry):
+        self.writer.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self.count += 1
+
+exporters = {
+    'csv': CsvLogExporter,
+    'jsonl': JsonLinesLogExporter,
+}
+
+def export_logs(entries, path, format='csv', compression='auto', **kwargs):
+    """Writes entries to path and returns the number of entries written."""
+    with exporters[format].open(path, compression=compression, **kwargs) as exporter:
+        return exporter.write_all(entries)
@@ -0,0 +1,125 @@
+"""Scans job log entries for many named regular expressions at once.
+
+A PatternSet compiles its patterns once and also joins them into a single
+alternation used as a prefilter: most log lines match none of the
+patterns and are rejected by one regex search instead of one per pattern.
+Only lines that pass the prefilter are searched with each pattern.
+
+LogScanner applies a PatternSet to entries as they arrive, e.g. from
+LogTail.follow() or from the "log" events of a JobMonitor, so every entry
+is scanned exactly once:
+
+    scanner = LogScanner({'snapshot': r'snapshot .* failed',
+                          'timeout': r'timed out after (?P<secs>\\d+)'})
+    for match in scanner.follow(LogTail(session, jobsession_id), until=job_done):
+        print(match.pattern, match.groups, match.entry['message'])
+"""
+
+import collections
+import logging
+import re
+
+LogMatch = collections.namedtuple('LogMatch', ['pattern', 'entry', 'groups'])
+
+# Numbered backreferences point to the wrong group once the patterns are
+# joined into one regex.
+backreference_re = re.compile(r'\\[1-9]')
+
+class PatternSet(object):
+    """Named regular expressions. patterns is a mapping or a sequence of
+    (name, pattern) pairs; a pattern is a string or a compiled regex.
+    """
+    def __init__(self, patterns, flags=0):
+        if hasattr(patterns, 'items'):
+            patterns = patterns.items()
+
+        self.patterns = []
+        for name, pattern in patterns:
+            if not hasattr(pattern, 'search'):
+                pattern = re.compile(pattern, flags)
+
+            self.patterns.append((name, pattern))
+
+        self.prefilter = self.build_prefilter(flags)
+
+    def build_prefilter(self, flags):
+        if len(self.patterns) < 2:
+            return None
+
+        for name, pattern in self.patterns:
+            if pattern.flags != re.compile('', flags).flags or backreference_re.search(pattern.pattern):
+                return None
+
+        try:
+            return re.compile('|'.join('(?:%s)' % pattern.pattern for name, pattern in self.patterns), flags)
+        except re.error as e:
+            # e.g. the same group name used in two patterns.
+            logging.info("PatternSet: patterns can't be combined, searching each: %s" % e)
+            return None
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def search(self, text):
+        """Returns (name, match object) of every pattern found in text."""
+        if self.prefilter is not None and self.prefilter.search(text) is None:
+            return []
+
+        found = []
+        for name, pattern in self.patterns:
+            m = pattern.search(text)
+            if m is not None:
+                found.append((name, m))
+
+        return found
+
+class LogScanner(object):
+    """Searches the message of log entries for the patterns of a PatternSet.
+
+    Every hit is a LogMatch of the pattern name, the entry and the groups of
+    the match: a dict for patterns with named groups, a tuple otherwise.
+    Matches are passed to on_match and also yielded by scan().
+    """
+    def __init__(self, patterns, on_match=None, field='message', flags=0):
+        if not isinstance(patterns, PatternSet):
+            patterns = PatternSet(patterns, flags)
+
+        self.patterns = patterns
+        self.on_match = on_match
+        self.field = field
+        self.scanned = 0
+        self.counts = collections.Counter()
+
+    def scan(self, entries):
+        for entry in entries:
+            self.scanned += 1
+            text = entry.get(self.field)
+            if not text:
+                continue
+
+            for name, m in self.patterns.search(text):
+                self.counts[name] += 1
+                match = LogMatch(name, entry, m.groupdict() if m.re.groupindex else m.groups())
+                if self.on_match is not None:
+                    self.on_match(match)
+
+                yield match
+
+    def feed(self, entries):
+        """Scans entries and returns the matches as a list."""
+        return list(self.scan(entries))
+
+    def follow(self, log_tail, interval=5, until=None):
+        """Scans the new entries of a LogTail as they are logged."""
+        return self.scan(log_tail.follow(interval=interval, until=until))
+
+    def scan_job_events(self, events):
+        """Scans the entries of JobMonitor "log" events. Yields (jobid,
+        LogMatch) tuples.
+        """
+        for event in events:
+            if event.kind != 'log':
+                continue
+
+            for match in self.scan(event.entries):
+                yield event.jobid, match
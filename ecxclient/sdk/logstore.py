@@ -0,0 +1,279 @@
+"""Local, searchable store of job session logs.
+
+LogStore copies job session logs into a SQLite database (by default
+"logs.db" next to the ecxcli "config.ini") so they can be searched across
+sessions and jobs without asking the appliance again. Entries are indexed
+by session, job, type and logTime and their messages by a full-text index
+when SQLite has FTS5; without FTS5, text searches fall back to LIKE.
+
+Ingestion is incremental: the LogCursor of every session is stored with
+its entries, so ingesting a session again only requests entries logged
+since, and sessions ingested after they completed are not requested at all.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from ecxclient.sdk.client import EcxAPI
+from ecxclient.sdk.client import F
+from ecxclient.sdk.client import LogCursor
+from ecxclient.sdk.client import LogTail
+from ecxclient.sdk.client import build_list_params
+from ecxclient.sdk.client import iter_completed
+from ecxclient.sdk.client import iter_pages
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_entries (
+    appliance TEXT NOT NULL,
+    jobsession_id TEXT NOT NULL,
+    entry_id TEXT,
+    job_id TEXT,
+    type TEXT,
+    log_time INTEGER,
+    message TEXT,
+    data TEXT NOT NULL,
+    UNIQUE (appliance, jobsession_id, entry_id)
+);
+CREATE INDEX IF NOT EXISTS log_entries_session ON log_entries (appliance, jobsession_id, log_time);
+CREATE INDEX IF NOT EXISTS log_entries_job ON log_entries (appliance, job_id, log_time);
+CREATE INDEX IF NOT EXISTS log_entries_type ON log_entries (appliance, type, log_time);
+CREATE INDEX IF NOT EXISTS log_entries_time ON log_entries (appliance, log_time);
+CREATE TABLE IF NOT EXISTS log_sessions (
+    appliance TEXT NOT NULL,
+    jobsession_id TEXT NOT NULL,
+    job_id TEXT,
+    job_name TEXT,
+    cursor TEXT,
+    entries INTEGER NOT NULL DEFAULT 0,
+    ingested_at REAL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (appliance, jobsession_id)
+);
+"""
+
+# Statuses of job sessions that ended. Sessions in any other status, known
+# or not (e.g. "RESOURCE ACTIVE"), may still log and are ingested again.
+TERMINAL_STATUSES = frozenset(['COMPLETED', 'PARTIAL', 'FAILED', 'CANCELLED', 'ABORTED', 'STOPPED'])
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE log_messages USING fts5(message, content='log_entries', content_rowid='rowid');
+CREATE TRIGGER log_entries_ai AFTER INSERT ON log_entries BEGIN
+    INSERT INTO log_messages (rowid, message) VALUES (new.rowid, new.message);
+END;
+CREATE TRIGGER log_entries_ad AFTER DELETE ON log_entries BEGIN
+    INSERT INTO log_messages (log_messages, rowid, message) VALUES ('delete', old.rowid, old.message);
+END;
+INSERT INTO log_messages (log_messages) VALUES ('rebuild');
+"""
+
+def default_logstore_path():
+    import click
+    return os.path.join(click.get_app_dir("ecxcli"), 'logs.db')
+
+class LogStore(object):
+    def __init__(self, ecx_session, path=None, page_size=1000, max_workers=4):
+        self.ecx_session = ecx_session
+        self.appliance = ecx_session.url
+        self.path = path or default_logstore_path()
+        self.page_size = page_size
+        self.max_workers = max_workers
+
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.fts = self.init_fts()
+
+    def init_fts(self):
+        if self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'log_messages'").fetchone():
+            return True
+
+        try:
+            # Also indexes entries stored while FTS5 wasn't available.
+            self.db.executescript("BEGIN;" + FTS_SCHEMA + "COMMIT;")
+            return True
+        except sqlite3.OperationalError as e:
+            self.db.rollback()
+            logging.info("LogStore: no full-text index, text searches use LIKE: %s" % e)
+            return False
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def session_state(self, jobsession_id):
+        """Returns (LogCursor, complete) of a stored session."""
+        with self.lock:
+            row = self.db.execute("SELECT cursor, complete FROM log_sessions WHERE appliance = ? AND jobsession_id = ?",
+                                  (self.appliance, str(jobsession_id))).fetchone()
+
+        if row is None or row[0] is None:
+            return LogCursor(), False
+
+        return LogCursor.from_dict(json.loads(row[0])), bool(row[1])
+
+    def ingest_session(self, jobsession_id, job_id=None, job_name=None, complete=False):
+        """Stores the entries of a session logged since the last ingest and
+        returns how many were added. Pass complete=True for sessions that
+        ended so they are never requested again.
+        """
+        jobsession_id = str(jobsession_id)
+        cursor, stored_complete = self.session_state(jobsession_id)
+        if stored_complete:
+            return 0
+
+        # Pages are requested from where the last ingest stopped while the
+        # entries of every page are stored, so the tail gets its own cursor.
+        tail = LogTail(self.ecx_session, jobsession_id, page_size=self.page_size)
+        tail.cursor = LogCursor(cursor.log_time, cursor.ids)
+
+        added = 0
+        for page in iter_pages(tail.fetch_page, self.page_size):
+            added += self.store(jobsession_id, job_id, job_name, cursor.advance(page), cursor, False)
+
+        # Marks sessions without new entries as ingested too.
+        self.store(jobsession_id, job_id, job_name, [], cursor, complete)
+
+        return added
+
+    def store(self, jobsession_id, job_id, job_name, entries, cursor, complete):
+        with self.lock, self.db:
+            added = 0
+            for entry in entries:
+                entry_job_id = job_id if job_id is not None else entry.get('jobId')
+                rowcount = self.db.execute(
+                    "INSERT OR IGNORE INTO log_entries "
+                    "(appliance, jobsession_id, entry_id, job_id, type, log_time, message, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.appliance, jobsession_id, entry.get('id'),
+                     None if entry_job_id is None else str(entry_job_id), entry.get('type'),
+                     entry.get('logTime'), entry.get('message'), json.dumps(entry))).rowcount
+                added += rowcount
+
+            self.db.execute(
+                "INSERT OR IGNORE INTO log_sessions (appliance, jobsession_id) VALUES (?, ?)",
+                (self.appliance, jobsession_id))
+            self.db.execute(
+                "UPDATE log_sessions SET job_id = COALESCE(?, job_id), job_name = COALESCE(?, job_name), "
+                "cursor = ?, entries = entries + ?, ingested_at = ?, complete = ? "
+                "WHERE appliance = ? AND jobsession_id = ?",
+                (None if job_id is None else str(job_id), job_name, json.dumps(cursor.to_dict()), added,
+                 time.time(), int(complete), self.appliance, jobsession_id))
+
+        return added
+
+    def ingest_sessions(self, sessions):
+        """Ingests (jobsession_id, job_id, job_name, complete) tuples, a few
+        sessions at a time, and returns the number of entries added.
+        """
+        def ingest(session):
+            return self.ingest_session(*session)
+
+        return sum(added for session, added in iter_completed(ingest, sessions, self.max_workers))
+
+    def job_sessions(self, job):
+        """Returns the sessions of a job as tuples for ingest_sessions()."""
+        fetch_sessions = lambda size, start_index: self.ecx_session.get(
+            restype='jobsession',
+            params=build_list_params(page_size=size, page_start_index=start_index,
+                                     filter=F('jobId') == str(job['id'])))['sessions']
+
+        sessions = []
+        for page in iter_pages(fetch_sessions, self.page_size):
+            for session in page:
+                complete = session.get('status') in TERMINAL_STATUSES
+                sessions.append((session['id'], job['id'], job.get('name'), complete))
+
+        return sessions
+
+    def ingest_job(self, job, all_sessions=False):
+        """Ingests the last run of a job (a job or its id), or all of its
+        sessions the appliance still has.
+        """
+        if not isinstance(job, dict):
+            job = EcxAPI(self.ecx_session, 'job').get(resid=job)
+
+        if all_sessions:
+            return self.ingest_sessions(self.job_sessions(job))
+
+        lastrun = job.get('lastrun')
+        if not lastrun or lastrun.get('sessionId') is None:
+            return 0
+
+        complete = lastrun.get('status') in TERMINAL_STATUSES
+        return self.ingest_session(lastrun['sessionId'], job['id'], job.get('name'), complete)
+
+    def sessions(self, job_id=None):
+        sql = ("SELECT jobsession_id, job_id, job_name, entries, ingested_at, complete FROM log_sessions "
+               "WHERE appliance = ?")
+        args = [self.appliance]
+        if job_id is not None:
+            sql += " AND job_id = ?"
+            args.append(str(job_id))
+
+        with self.lock:
+            rows = self.db.execute(sql + " ORDER BY ingested_at DESC", args).fetchall()
+
+        keys = ('jobsessionId', 'jobId', 'jobName', 'entries', 'ingestedAt', 'complete')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def search(self, text=None, jobsession_id=None, job_id=None, type=None, since=None, until=None,
+               limit=100, newest_first=False, query=False):
+        """Returns stored entries matching all given conditions, ordered by
+        logTime. The words of text must appear in the message in that order
+        (e.g. "vm-123 failed:"). With query, text is an FTS5 query instead
+        (e.g. 'snapshot AND "timed out"'), which raises
+        sqlite3.OperationalError when its syntax is wrong. Without a
+        full-text index, text is searched as a substring. since and until
+        are logTime values (ms since epoch).
+        """
+        where = ["e.appliance = ?"]
+        args = [self.appliance]
+        tables = "log_entries e"
+
+        if text:
+            if query and not self.fts:
+                raise Exception("Full-text queries need SQLite with FTS5.")
+
+            # A phrase of punctuation only has no words to look up.
+            if self.fts and (query or re.search(r'\w', text, re.UNICODE)):
+                tables += " JOIN log_messages m ON m.rowid = e.rowid"
+                where.append("log_messages MATCH ?")
+                if not query:
+                    text = '"%s"' % text.replace('"', '""')
+            else:
+                where.append("e.message LIKE ? ESCAPE '\\'")
+                text = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+            args.append(text)
+
+        for column, value in (('jobsession_id', jobsession_id), ('job_id', job_id), ('type', type)):
+            if value is not None:
+                where.append("e.%s = ?" % column)
+                args.append(str(value))
+
+        if since is not None:
+            where.append("e.log_time >= ?")
+            args.append(since)
+
+        if until is not None:
+            where.append("e.log_time < ?")
+            args.append(until)
+
+        sql = "SELECT e.data FROM %s WHERE %s ORDER BY e.log_time %s" % (
+            tables, " AND ".join(where), "DESC" if newest_first else "ASC")
+        if limit:
+            sql += " LIMIT %d" % limit
+
+        with self.lock:
+            rows = self.db.execute(sql, args).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
@@ -6,6 +6,7 @@ from optparse import OptionParser
 import time
 import csv
 import ecxclient.sdk.client as client
+import ecxclient.sdk.logexport as logexport
 
 logger = logging.getLogger('logger')
 logger.setLevel(logging.INFO)
@@ -28,15 +29,11 @@ def validate_input():
         print "Invalid input, use -h switch for help"
         sys.exit(2)
 
-def get_jobs_list():
-    jobs = client.EcxAPI(session, 'job').list()
-    return jobs
-
-def find_job_in_list(jobslist):
-    for job in jobslist:
-        if(job['name'] == options.jobname):
-            return job
-    logger.info("No job found with name %d" % options.jobname)
+def find_job():
+    job = client.EcxAPI(session, 'job').find_by_name(options.jobname)
+    if job is not None:
+        return job
+    logger.info("No job found with name %s" % options.jobname)
     sys.exit(2)
 
 def get_swf_for_job(job):
@@ -64,20 +61,15 @@ def update_job(jobid):
     return client.EcxAPI(session, 'job').get(resid=jobid)
 
 def output_logs(job):
-    return client.JobAPI(session).get_log_entries(job['lastrun']['sessionId'])
+    return client.JobAPI(session).iter_session_log(job['lastrun']['sessionId'])
 
 def parse_logs(logs):
     logger.info("Writing logs to: %s" % options.destination)
-    logfile = csv.writer(open(options.destination, "wb+"))
-    logfile.writerow(["TimeStamp", "Message"])
-    for line in logs:
-        logfile.writerow([time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(line['logTime']/1000)),
-            line['message']])
+    logexport.export_logs(logs, options.destination, format='csv')
 
 session.login()
 
-jobslist = get_jobs_list()
-job = find_job_in_list(jobslist)
+job = find_job()
 if (options.runornot == 'true'):
     if (options.workflow is not None):
         swf = get_swf_for_job(job)
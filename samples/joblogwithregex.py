@@ -2,8 +2,8 @@
 # If job is not run last session logs will be output
 # Destination field is required for log .csv output
 # Job name is case-sensitive
-# Regex will look for a match in logs for current running job
-# if a match is found it will output the match pattern
+# Regex will look for matches in logs for current running job
+# (--regex can be given more than once), every match is output
 
 import re
 import json
@@ -12,6 +12,8 @@ from optparse import OptionParser
 import time
 import csv
 import ecxclient.sdk.client as client
+import ecxclient.sdk.logexport as logexport
+import ecxclient.sdk.logscan as logscan
 
 logger = logging.getLogger('logger')
 logger.setLevel(logging.INFO)
@@ -24,7 +26,7 @@ parser.add_option("--job", dest="jobname", help="ECX Job Name")
 parser.add_option("--swf", dest="workflow", help="Storage Workflow name for Job")
 parser.add_option("--run", dest="runornot", help="Run job or print log from last run (true|false)")
 parser.add_option("--dest", dest="destination", help="Destination for logfile (ex. /logs/log1.csv) (optional)")
-parser.add_option("--regex", dest="regex", help="Regular Expression for log matching (optional)")
+parser.add_option("--regex", dest="regex", action="append", help="Regular Expression for log matching (optional)")
 (options, args) = parser.parse_args()
 
 session = client.EcxSession(options.host, options.username, options.password)
@@ -35,15 +37,11 @@ def validate_input():
         print "Invalid input, use -h switch for help"
         sys.exit(2)
 
-def get_jobs_list():
-    jobs = client.EcxAPI(session, 'job').list()
-    return jobs
-
-def find_job_in_list(jobslist):
-    for job in jobslist:
-        if(job['name'] == options.jobname):
-            return job
-    logger.info("No job found with name %d" % options.jobname)
+def find_job():
+    job = client.EcxAPI(session, 'job').find_by_name(options.jobname)
+    if job is not None:
+        return job
+    logger.info("No job found with name %s" % options.jobname)
     sys.exit(2)
 
 def get_swf_for_job(job):
@@ -55,7 +53,7 @@ def get_swf_for_job(job):
     sys.exit(2)
 
 def run_job_and_wait_for_completion(job, swf=None):
-    matchfound = False
+    tail = None
     if (swf is not None):
         run = client.JobAPI(session).run(job['id'], swf['id'])
     else:
@@ -66,37 +64,32 @@ def run_job_and_wait_for_completion(job, swf=None):
     while (job['lastrun']['status'] == "RUNNING"):
         time.sleep(5)
         job = update_job(job['id'])
-        if (options.regex is not None and matchfound is not True):
-            matchfound = match_regex_in_logs(job)
+        if (options.regex is not None):
+            if (tail is None):
+                tail = client.LogTail(session, job['lastrun']['sessionId'])
+            match_regex_in_logs(tail)
     logger.info("Job finished.")
     
 def update_job(jobid):
     return client.EcxAPI(session, 'job').get(resid=jobid)
 
 def output_logs(job):
-    return client.JobAPI(session).get_log_entries(job['lastrun']['sessionId'])
+    return client.JobAPI(session).iter_session_log(job['lastrun']['sessionId'])
 
 def parse_logs(logs):
     logger.info("Writing logs to: %s" % options.destination)
-    logfile = csv.writer(open(options.destination, "wb+"))
-    logfile.writerow(["TimeStamp", "Message"])
-    for line in logs:
-        logfile.writerow([time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(line['logTime']/1000)),
-            line['message']])
-
-def match_regex_in_logs(job):
-    logs = client.JobAPI(session).get_log_entries(job['lastrun']['sessionId'])
-    p = re.compile(options.regex)
-    for line in logs:
-        m = p.match(line['message'])
-        if m:
-            print m.group()
-            return True
+    logexport.export_logs(logs, options.destination, format='csv')
+
+def match_regex_in_logs(tail):
+    for match in scanner.scan(tail.fetch()):
+        print match.pattern, match.entry['message']
+
+if (options.regex is not None):
+    scanner = logscan.LogScanner([(regex, regex) for regex in options.regex])
 
 session.login()
 
-jobslist = get_jobs_list()
-job = find_job_in_list(jobslist)
+job = find_job()
 if (options.runornot.upper() == "TRUE"):
     if (options.workflow is not None):
         swf = get_swf_for_job(job)
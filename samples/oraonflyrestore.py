@@ -12,6 +12,7 @@ from optparse import OptionParser
 import logging
 
 import ecxclient.sdk.client as client
+from ecxclient.sdk.inventory import InventoryCache
 
 logger = logging.getLogger('logger')
 logger.setLevel(logging.INFO)
@@ -38,10 +39,10 @@ def validate_input():
         sys.exit(2)
 
 def get_instances_info():
-    return client.OracleAPI(session).get_instances()
+    return inventory.list('oracleinstance')
     
 def get_database_info(instance):
-    return client.OracleAPI(session).get_databases_in_instance(instance['id'])
+    return inventory.list('oracledatabase', parent=instance)
 
 def find_instance_in_list(instances):
     for instance in instances:
@@ -182,11 +183,12 @@ def update_policy_options(policy):
 validate_input()
 session = client.EcxSession(options.host, options.username, options.password)
 session.login()
+inventory = InventoryCache(session)
 
-instances = get_instances_info()['instances']
+instances = get_instances_info()
 instance = find_instance_in_list(instances)
 databases = get_database_info(instance)
-database = find_database_in_instance(databases['databases'])
+database = find_database_in_instance(databases)
 siteinfo = get_site_info(database)
 policy = build_restore_policy(database, instance, siteinfo)
 policy = update_policy_options(policy)
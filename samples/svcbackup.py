@@ -67,13 +67,14 @@ def build_source_info_for_vols(vollist):
     source = []
     volsource = {}
     volsourcemd = {}
+    svcs = session.expand(vollist, 'ibmsvc')
     for vol in vollist:
         volsource['href'] = vol['links']['self']['href']
         volsource['resourceType'] = "volume"
         volsource['id'] = vol['id']
         volsource['include'] = True
         volsourcemd['id'] = vol['id']
-        volsourcemd['path'] = build_path_for_vol(vol)
+        volsourcemd['path'] = build_path_for_vol(vol, svcs)
         volsourcemd['name'] = vol['name']
         volsourcemd['resourceType'] = "volume"
         volsource['metadata'] = volsourcemd
@@ -81,9 +82,9 @@ def build_source_info_for_vols(vollist):
     return source
     
 
-def build_path_for_vol(vol):
+def build_path_for_vol(vol, svcs):
     sitepath = vol['siteName'] + ":" + vol['siteId']
-    svc = client.EcxAPI(session, 'ibmsvc').get(url=vol['links']['ibmsvc']['href'])
+    svc = svcs[vol['links']['ibmsvc']['href']]
     svcpath = svc['name'] + ":" + svc['id']
     path = sitepath + "/" + svcpath
     return path
@@ -18,6 +18,7 @@ import datetime
 from optparse import OptionParser
 import logging
 import ecxclient.sdk.client as client
+from ecxclient.sdk.inventory import InventoryCache
 
 logger = logging.getLogger('logger')
 logging.basicConfig()
@@ -63,16 +64,8 @@ def get_policy_for_job(job):
 
 def get_info_for_vols():
     logger.info("Getting information for volumes...")
-    svcs = client.EcxAPI(session, 'ibmsvc').list()
-    allvols = []
     selectedvols = []
-    for svc in svcs:
-        try:
-            svcvols = client.EcxAPI(session, 'ibmsvc').get(url=svc['links']['volumes']['href'])['volumes']
-            allvols.extend(svcvols)
-        except:
-            pass
-    for vol in allvols:
+    for vol in inventory.list('volume'):
         if (vol['name'] in options.vols):
             selectedvols.append(copy.deepcopy(vol))
     if(len(selectedvols) < 1):
@@ -250,6 +243,7 @@ def update_policy_and_run_restore():
 
 session = client.EcxSession(options.host, options.username, options.password)
 session.login()
+inventory = InventoryCache(session)
 update_policy_and_run_restore()
 
 session.delete('endeavour/session/')
@@ -46,13 +46,8 @@ def get_policy_for_job(job):
     return policy
 
 def get_info_for_vms():
-    vspheres = client.EcxAPI(session, 'vsphere').list()
-    allvms = []
     selectedvms = []
-    for vsphere in vspheres:
-        vspherevms = client.EcxAPI(session, 'vsphere').get(url=vsphere['links']['vms']['href'])['vms']
-        allvms.extend(vspherevms)
-    for vm in allvms:
+    for vm in client.VsphereAPI(session).walk_vms():
         if (vm['name'] in options.vms):
             selectedvms.append(copy.deepcopy(vm))
     return selectedvms
@@ -61,13 +56,15 @@ def build_source_info_for_vms(vmlist):
     source = []
     vmsource = {}
     vmsourcemd = {}
+    vspheres = session.expand(vmlist, 'vsphere')
+    dcs = session.expand(vmlist, 'datacenter')
     for vm in vmlist:
         vmsource['href'] = vm['links']['self']['href']
         vmsource['resourceType'] = "vm"
         vmsource['id'] = vm['id']
         vmsource['include'] = True
         vmsourcemd['id'] = vm['id']
-        vmsourcemd['path'] = build_path_for_vm(vm)
+        vmsourcemd['path'] = build_path_for_vm(vm, vspheres, dcs)
         vmsourcemd['name'] = vm['name']
         vmsourcemd['resourceType'] = "vm"
         vmsource['metadata'] = vmsourcemd
@@ -75,9 +72,9 @@ def build_source_info_for_vms(vmlist):
     return source
     
 
-def build_path_for_vm(vm):
-    vsphere = client.EcxAPI(session, 'vsphere').get(url=vm['links']['vsphere']['href'])
-    dc = client.EcxAPI(session, 'vsphere').get(url=vm['links']['datacenter']['href'])
+def build_path_for_vm(vm, vspheres, dcs):
+    vsphere = vspheres[vm['links']['vsphere']['href']]
+    dc = dcs[vm['links']['datacenter']['href']]
     sitepath = vsphere['siteName'] + ":" + vsphere['siteId']
     vcpath = vsphere['name'] + ":" + vsphere['id']
     dcpath = dc['name'] + ":" + dc['id']
@@ -20,6 +20,7 @@ import datetime
 from optparse import OptionParser
 import logging
 import ecxclient.sdk.client as client
+from ecxclient.sdk.inventory import InventoryCache
 
 logger = logging.getLogger('logger')
 logging.basicConfig()
@@ -66,16 +67,8 @@ def get_policy_for_job(job):
 
 def get_info_for_vms():
     logger.info("Getting information for VMs...")
-    vspheres = client.EcxAPI(session, 'vsphere').list()
-    allvms = []
     selectedvms = []
-    for vsphere in vspheres:
-        try:
-            vspherevms = client.EcxAPI(session, 'vsphere').get(url=vsphere['links']['vms']['href'])['vms']
-            allvms.extend(vspherevms)
-        except client.requests.exceptions.HTTPError as err:
-            pass
-    for vm in allvms:
+    for vm in inventory.list('vm'):
         if (vm['name'] in options.vms):
             selectedvms.append(copy.deepcopy(vm))
     if(len(selectedvms) < 1):
@@ -88,6 +81,8 @@ def build_source_info_for_vms(vmlist):
     source = []
     vmsource = {}
     vmsourcemd = {}
+    vsphereapi = client.EcxAPI(session, 'vsphere')
+    versions = vsphereapi.get_resource_versions(vmlist, vsphereapi.get_resource_sites(vmlist))
     for vm in vmlist:
         vmsource['href'] = vm['links']['self']['href']+"?time=0"
         vmsource['resourceType'] = "vm"
@@ -97,18 +92,12 @@ def build_source_info_for_vms(vmlist):
         vmsourcemd['path'] = build_path_for_vm(vm)
         vmsourcemd['name'] = vm['name']
         vmsource['metadata'] = vmsourcemd
-        vmsource['version'] = build_version_for_vm(vm)
+        vmsource['version'] = build_version_for_vm(vm, versions)
         source.append(copy.deepcopy(vmsource))
     return source
 
-def build_version_for_vm(vm):
-    vmurl = vm['links']['self']['href']+"?time=0"
-    vmurlarray = [vmurl]
-    assdata = {'associatedWith': vmurlarray,"resourceType": "site"}
-    association = client.EcxAPI(session, 'vsphere').post(path="query", data=assdata)['sites'][0]
-    versionurl = vm['links']['self']['href']+"/version"
-    versionparams = {'time': 0, 'filter': '[{"property":"siteId","op":"=","value":"%s"}]'%association['id']}
-    versions = client.EcxAPI(session, 'vsphere').get(url=versionurl, params=versionparams)['versions']
+def build_version_for_vm(vm, versions):
+    versions = versions.get(vm['links']['self']['href'], [])
     version = {}
     metadata = {}
     # no copy filters supplied use latest
@@ -166,8 +155,7 @@ def build_alt_dest(policy, vmlist):
     # need to call query api at this point to get proper href format for mapping def
     for vm in vmlist:
         vmurls.append(copy.deepcopy(vm['links']['self']['href']+"/version/latest"))
-    qd = {'associatedWith': vmurls,"resourceType": "vm"}
-    vmqlist = client.EcxAPI(session, 'vsphere').post(path="query", data=qd)['vms']
+    vmqlist = list(session.query('vsphere', 'vm', vmurls))
     destination = {}
     destination['target'] = build_alt_dest_target()
     destination['mapvirtualnetwork'] = build_alt_dest_vlan(destination, vmqlist)
@@ -242,8 +230,7 @@ def build_alt_dest_vlan(destination, vmqlist):
     vmurls = []
     for vm in vmqlist:
         vmurls.append(copy.deepcopy(vm['links']['self']['href']))
-    querydata = {'associatedWith': vmurls,"resourceType": "network"}
-    sourcenetworks = client.EcxAPI(session, 'vsphere').post(path="query", data=querydata)['networks']
+    sourcenetworks = session.query('vsphere', 'network', vmurls)
     for snw in sourcenetworks:
         snwkey = snw['links']['self']['href']
         mapvirtualnetwork[snwkey] = {}
@@ -281,8 +268,7 @@ def build_alt_dest_ds(destination, vmqlist):
     vmurls = []
     for vm in vmqlist:
         vmurls.append(copy.deepcopy(vm['links']['self']['href']))
-    querydata = {'associatedWith': vmurls,"resourceType": "datastore"}
-    sourcedatastores = client.EcxAPI(session, 'vsphere').post(path="query", data=querydata)['datastores']
+    sourcedatastores = session.query('vsphere', 'datastore', vmurls)
     for sds in sourcedatastores:
         sdskey = sds['links']['self']['href']
         mapRRPdatastore[sdskey] = targetds['links']['self']['href']
@@ -346,6 +332,7 @@ def update_policy_and_run_restore():
 
 session = client.EcxSession(options.host, options.username, options.password)
 session.login()
+inventory = InventoryCache(session)
 update_policy_and_run_restore()
 
 session.delete('endeavour/session/')
@@ -28,10 +28,9 @@ def prettyprint(indata):
     print json.dumps(indata, sort_keys=True,indent=4, separators=(',', ': '))
 
 def get_restore_job(jobparams):
-    jobs = client.EcxAPI(session, 'job').list()
-    for job in jobs:
-        if(job['name'].upper() == jobparams['template'].upper()):
-            return job
+    job = session.index('job').get(jobparams['template'])
+    if job is not None:
+        return job
     logger.info("No template job found with name %s" % jobparams['template'].upper())
     session.delete('endeavour/session/')
     sys.exit(2)
@@ -41,12 +40,7 @@ def get_policy_for_job(job):
     return policy
 
 def get_all_vms():
-    vspheres = client.EcxAPI(session, 'vsphere').list()
-    allvms = []
-    for vsphere in vspheres:
-        vspherevms = client.EcxAPI(session, 'vsphere').get(url=vsphere['links']['vms']['href'])['vms']
-        allvms.extend(vspherevms)
-    return allvms
+    return list(client.VsphereAPI(session).walk_vms())
 
 def get_info_for_vms(allvms, jobparams):
     vmparams = jobparams['vms'].split("|")
@@ -60,6 +54,8 @@ def build_source_info_for_vms(vmlist, jobparams):
     source = []
     vmsource = {}
     vmsourcemd = {}
+    vsphereapi = client.EcxAPI(session, 'vsphere')
+    versions = vsphereapi.get_resource_versions(vmlist, vsphereapi.get_resource_sites(vmlist))
     for vm in vmlist:
         vmsource['href'] = vm['links']['self']['href']+"?time=0"
         vmsource['resourceType'] = "vm"
@@ -69,18 +65,12 @@ def build_source_info_for_vms(vmlist, jobparams):
         vmsourcemd['path'] = build_path_for_vm(vm)
         vmsourcemd['name'] = vm['name']
         vmsource['metadata'] = vmsourcemd
-        vmsource['version'] = build_version_for_vm(vm, jobparams)
+        vmsource['version'] = build_version_for_vm(vm, versions, jobparams)
         source.append(copy.deepcopy(vmsource))
     return source
 
-def build_version_for_vm(vm, jobparams):
-    vmurl = vm['links']['self']['href']+"?time=0"
-    vmurlarray = [vmurl]
-    assdata = {'associatedWith': vmurlarray,"resourceType": "site"}
-    association = client.EcxAPI(session, 'vsphere').post(path="query", data=assdata)['sites'][0]
-    versionurl = vm['links']['self']['href']+"/version"
-    versionparams = {'time': 0, 'filter': '[{"property":"siteId","op":"=","value":"%s"}]'%association['id']}
-    versions = client.EcxAPI(session, 'vsphere').get(url=versionurl, params=versionparams)['versions']
+def build_version_for_vm(vm, versions, jobparams):
+    versions = versions.get(vm['links']['self']['href'], [])
     version = {}
     metadata = {}
     # no copy filters supplied use latest
@@ -136,8 +126,7 @@ def build_alt_dest(policy, vmlist, jobparams):
     # need to call query api at this point to get proper href format for mapping def
     for vm in vmlist:
         vmurls.append(copy.deepcopy(vm['links']['self']['href']+"/version/latest"))
-    qd = {'associatedWith': vmurls,"resourceType": "vm"}
-    vmqlist = client.EcxAPI(session, 'vsphere').post(path="query", data=qd)['vms']
+    vmqlist = list(session.query('vsphere', 'vm', vmurls))
     destination = {}
     destination['target'] = build_alt_dest_target(jobparams)
     destination['mapvirtualnetwork'] = build_alt_dest_vlan(destination, vmqlist, jobparams)
@@ -196,8 +185,7 @@ def build_alt_dest_vlan(destination, vmqlist, jobparams):
     vmurls = []
     for vm in vmqlist:
         vmurls.append(copy.deepcopy(vm['links']['self']['href']))
-    querydata = {'associatedWith': vmurls,"resourceType": "network"}
-    sourcenetworks = client.EcxAPI(session, 'vsphere').post(path="query", data=querydata)['networks']
+    sourcenetworks = session.query('vsphere', 'network', vmurls)
     for snw in sourcenetworks:
         snwkey = snw['links']['self']['href']
         mapvirtualnetwork[snwkey] = {}
@@ -234,8 +222,7 @@ def build_alt_dest_ds(destination, vmqlist, jobparams):
     vmurls = []
     for vm in vmqlist:
         vmurls.append(copy.deepcopy(vm['links']['self']['href']))
-    querydata = {'associatedWith': vmurls,"resourceType": "datastore"}
-    sourcedatastores = client.EcxAPI(session, 'vsphere').post(path="query", data=querydata)['datastores']
+    sourcedatastores = session.query('vsphere', 'datastore', vmurls)
     for sds in sourcedatastores:
         sdskey = sds['links']['self']['href']
         mapRRPdatastore[sdskey] = targetds['links']['self']['href']
@@ -70,7 +70,7 @@ setup(
     # your project is installed. For an analysis of "install_requires" vs pip's
     # requirements files see:
     # https://packaging.python.org/en/latest/requirements.html
-    install_requires=['requests', 'click', 'tabulate'],
+    install_requires=['requests', 'click', 'tabulate', 'futures; python_version < "3"'],
 
     # List additional groups of dependencies here (e.g. development
     # dependencies). You can install these using the following syntax,
@@ -79,6 +79,8 @@ setup(
     extras_require={
         'dev': ['check-manifest'],
         'test': ['coverage'],
+        'async': ['aiohttp'],
+        'zstd': ['zstandard'],
     },
 
     # To provide executable scripts, use entry points in preference to the
@@ -0,0 +1,295 @@
+"""A local HTTP server standing in for an ECX appliance.
+
+EcxServer serves, under /api:
+
+  POST   /endeavour/session       a session id, for the user and password
+                                  in credentials
+  GET    /<collection>            the resources of a collection (e.g.
+                                  "endeavour/job"), with filter, sort,
+                                  pageSize and pageStartIndex, and with
+                                  "total" if totals is set
+  POST   /<collection>            creates a resource and returns it
+  GET    /<collection>/<id>       a resource
+  PUT    /<collection>/<id>       updates a resource and returns it
+  DELETE /<collection>/<id>       deletes a resource
+  POST   /<collection>/<id>?action=
+                                  nothing, like starting a job
+  GET    /blob                    the bytes of content, with Range and
+                                  If-Range support unless ranges is False,
+                                  and etag as ETag unless it is None
+
+Other endpoints, such as the "query" APIs of providers, are served by the
+functions in routes, keyed by (method, path) and called with the query and
+the JSON body of the request; they return the JSON response.
+
+Filters are evaluated unless ignore_filters is set; with reject_filters,
+filtered listings fail with 400. Every request is recorded in requests as
+(method, path, query, headers), and every listing in listed as
+(collection, number of resources returned).
+"""
+
+import base64
+import json
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qsl
+from urllib.parse import urlsplit
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method):
+        parts = urlsplit(self.path)
+        path = parts.path[len('/api'):].strip('/')
+        query = dict(parse_qsl(parts.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+
+        server = self.server
+        with server.lock:
+            server.requests.append((method, path, query, dict(self.headers)))
+
+        if server.delay:
+            time.sleep(server.delay)
+
+        if path == 'blob' and method == 'GET':
+            return self.send_blob()
+
+        route = server.routes.get((method, path))
+        if route is not None:
+            return self.send_json(route(query, body))
+
+        if path == 'endeavour/session' and method == 'POST':
+            credentials = base64.b64encode(('%s:%s' % server.credentials).encode('utf-8')).decode('ascii')
+            if self.headers.get('Authorization') != 'Basic ' + credentials:
+                return self.send_json({'error': 'unauthorized'}, 401)
+
+            return self.send_json({'sessionid': 'test-session'})
+
+        with server.lock:
+            collection, resid = server.resolve(path)
+            if collection is None:
+                return self.send_json({'error': 'not found'}, 404)
+
+            resources = server.resources.setdefault(collection, [])
+            found = [res for res in resources if res['id'] == resid]
+
+            if resid is None and method == 'GET':
+                if 'filter' in query and server.reject_filters:
+                    return self.send_json({'error': 'unsupported filter'}, 400)
+
+                listed = list(resources)
+                if 'filter' in query and not server.ignore_filters:
+                    conds = json.loads(query['filter'])
+                    listed = [res for res in listed if matches(res, conds)]
+
+                for order in reversed(json.loads(query.get('sort', '[]'))):
+                    listed.sort(key=lambda res: sort_key(res.get(order['property'])),
+                                reverse=order['direction'] == 'DESC')
+
+                start = int(query.get('pageStartIndex', 0))
+                size = int(query.get('pageSize', len(listed)))
+                page = listed[start:start + size]
+                server.listed.append((collection, len(page)))
+                resp = {server.list_field(collection): page}
+                if server.totals:
+                    resp['total'] = len(listed)
+
+                return self.send_json(resp)
+
+            if resid is None and method == 'POST':
+                server.last_id += 1
+                res = dict(body or {}, id=str(server.last_id))
+                resources.append(res)
+                return self.send_json(res)
+
+            if not found:
+                return self.send_json({'error': 'not found'}, 404)
+
+            res = found[0]
+            if method == 'GET':
+                return self.send_json(res)
+
+            if method == 'POST' and 'action' in query:
+                return self.send_json({})
+
+            if method == 'PUT':
+                res.update(body or {})
+                return self.send_json(res)
+
+            if method == 'DELETE':
+                resources.remove(res)
+                return self.send_body(b'', 204)
+
+        self.send_json({'error': 'bad request'}, 400)
+
+    def send_json(self, obj, status=200):
+        self.send_body(json.dumps(obj).encode('utf-8'), status, {'Content-Type': 'application/json'})
+
+    def send_body(self, body, status=200, headers={}):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_blob(self):
+        server = self.server
+        content = server.content
+        headers = {'Content-Disposition': 'attachment; filename=blob.bin'}
+        if server.etag is not None:
+            headers['ETag'] = server.etag
+
+        start, end = 0, len(content) - 1
+        status = 200
+        m = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if m and server.ranges and self.headers.get('If-Range', server.etag) == server.etag:
+            start = int(m.group(1))
+            end = min(int(m.group(2)), end) if m.group(2) else end
+            if start > end:
+                return self.send_body(b'', 416, {'Content-Range': 'bytes */%d' % len(content)})
+
+            status = 206
+            headers['Content-Range'] = 'bytes %d-%d/%d' % (start, end, len(content))
+
+        with server.lock:
+            fail = server.fail_from is not None and status == 206 and start >= server.fail_from
+            drop = server.drop_after
+            server.drop_after = None
+
+        if fail:
+            return self.send_json({'error': 'unavailable'}, 503)
+
+        body = content[start:end + 1]
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if drop is not None:
+            # Promises the whole body but sends only part of it.
+            self.wfile.write(body[:drop])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        self.wfile.write(body)
+
+COMPARISONS = {
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+}
+
+def matches(res, conds):
+    for cond in conds:
+        value = res.get(cond['property'])
+        if cond['op'] == 'IN':
+            ok = str(value) in [str(v) for v in cond['value']]
+        elif cond['op'] in ('=', '!='):
+            ok = (str(value) == str(cond['value'])) == (cond['op'] == '=')
+        else:
+            ok = value is not None and COMPARISONS[cond['op']](value, cond['value'])
+
+        if not ok:
+            return False
+
+    return True
+
+def sort_key(value):
+    return (value is not None, value if value is not None else 0)
+
+class EcxServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        ThreadingHTTPServer.__init__(self, ('127.0.0.1', 0), Handler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.resources = {}
+        self.list_fields = {'endeavour/log/job': 'logs', 'endeavour/jobsession': 'sessions'}
+        self.listed = []
+        self.routes = {}
+        self.last_id = 0
+        self.delay = 0
+        self.credentials = ('admin', 'secret')
+        self.ignore_filters = False
+        self.reject_filters = False
+        self.totals = False
+
+        self.content = b''
+        self.etag = '"v1"'
+        self.ranges = True
+        self.fail_from = None
+        self.drop_after = None
+
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.05,))
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        self.server_close()
+
+    def resolve(self, path):
+        """Returns (collection, resource id or None) of path."""
+        if path in self.resources or '/' not in path:
+            return path, None
+
+        collection, resid = path.rsplit('/', 1)
+        if collection in self.resources:
+            return collection, resid
+
+        return None, None
+
+    def list_field(self, collection):
+        return self.list_fields.get(collection, collection.rsplit('/', 1)[-1] + 's')
+
+    def add(self, collection, **fields):
+        with self.lock:
+            self.last_id += 1
+            res = dict(fields)
+            res.setdefault('id', str(self.last_id))
+            self.resources.setdefault(collection, []).append(res)
+            return res
+
+    def sent(self, method=None, path=None):
+        """Returns the recorded requests, those of method and path if given."""
+        with self.lock:
+            return [req for req in self.requests
+                    if (method is None or req[0] == method) and (path is None or req[1] == path)]
+
+    def ranges_sent(self):
+        return [req[3]['Range'] for req in self.sent('GET', 'blob') if 'Range' in req[3]]
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from ecxclient.sdk.client import F
+
+from tests.server import EcxServer
+
+try:
+    from ecxclient.sdk.asyncclient import AsyncEcxAPI
+    from ecxclient.sdk.asyncclient import AsyncEcxSession
+except ImportError:
+    # aiohttp isn't installed.
+    AsyncEcxSession = None
+
+@unittest.skipIf(AsyncEcxSession is None, "needs aiohttp")
+class AsyncEcxSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        for name in ('alpha', 'beta', 'gamma'):
+            self.server.add('widget', name=name)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def run_session(self, coro_fn):
+        async def run():
+            async with AsyncEcxSession(self.server.url, username='admin', password='secret') as session:
+                return await coro_fn(session)
+
+        return asyncio.run(run())
+
+    def test_login(self):
+        sessionid = self.run_session(lambda session: asyncio.sleep(0, session.sessionid))
+
+        self.assertEqual(sessionid, 'test-session')
+        method, path, query, headers = self.server.sent('POST', 'endeavour/session')[0]
+        self.assertEqual(headers['Authorization'], 'Basic YWRtaW46c2VjcmV0')
+
+    def test_failed_login_closes_connections(self):
+        session = AsyncEcxSession(self.server.url, username='admin', password='wrong')
+
+        async def run():
+            async with session:
+                pass
+
+        with self.assertRaises(Exception) as cm:
+            asyncio.run(run())
+
+        self.assertEqual(cm.exception.status, 401)
+        self.assertIsNone(session.conn)
+
+    def test_no_credentials(self):
+        session = AsyncEcxSession(self.server.url)
+
+        with self.assertRaises(Exception):
+            asyncio.run(session.open())
+
+        self.assertIsNone(session.conn)
+
+    def test_get_and_list(self):
+        async def calls(session):
+            api = AsyncEcxAPI(session, 'widget')
+            return await api.get(resid='1'), await api.list()
+
+        widget, widgets = self.run_session(calls)
+
+        self.assertEqual(widget['name'], 'alpha')
+        self.assertEqual([w['name'] for w in widgets], ['alpha', 'beta', 'gamma'])
+        self.assertTrue(all(req[3]['X-Endeavour-Sessionid'] == 'test-session' for req in self.server.sent('GET')))
+
+    def test_filter_and_sort(self):
+        async def calls(session):
+            api = AsyncEcxAPI(session, 'widget')
+            await api.list(filter=F('name') == 'beta', sort=F('name').desc())
+            await api.get(filter=F('name') == 'gamma')
+
+        self.run_session(calls)
+
+        list_query, get_query = [req[2] for req in self.server.sent('GET', 'widget')]
+        self.assertEqual(list_query['filter'], '[{"property": "name", "op": "=", "value": "beta"}]')
+        self.assertIn('"direction": "DESC"', list_query['sort'])
+        self.assertIn('"gamma"', get_query['filter'])
+
+    def test_iter_list_pages(self):
+        async def calls(session):
+            return [item async for item in AsyncEcxAPI(session, 'widget').iter_list(page_size=2)]
+
+        widgets = self.run_session(calls)
+
+        self.assertEqual([w['name'] for w in widgets], ['alpha', 'beta', 'gamma'])
+        self.assertEqual([req[2]['pageStartIndex'] for req in self.server.sent('GET', 'widget')], ['0', '2'])
+
+    def test_writes(self):
+        async def calls(session):
+            api = AsyncEcxAPI(session, 'widget')
+            created = await api.post(data={'name': 'delta'})
+            updated = await api.put(resid=created['id'], data={'name': 'epsilon'})
+            await api.post(resid=created['id'], params={'action': 'start'})
+            await api.delete(created['id'])
+            return created, updated, await api.list()
+
+        created, updated, widgets = self.run_session(calls)
+
+        self.assertEqual(created['name'], 'delta')
+        self.assertEqual(updated, dict(created, name='epsilon'))
+        self.assertEqual(len(widgets), 3)
+        self.assertEqual(self.server.sent('POST', 'widget/' + created['id'])[0][2], {'action': 'start'})
+
+    def test_concurrent_gets(self):
+        self.server.delay = 0.2
+
+        async def calls(session):
+            api = AsyncEcxAPI(session, 'widget')
+            return await asyncio.gather(*[api.get(resid=str(i)) for i in (1, 2, 3)])
+
+        widgets = self.run_session(calls)
+
+        self.assertEqual([w['name'] for w in widgets], ['alpha', 'beta', 'gamma'])
+
+    def test_stream_get(self):
+        self.server.content = b'x' * 200000
+        tmpdir = tempfile.mkdtemp()
+        try:
+            outfile = self.run_session(lambda session: session.stream_get(
+                url=self.server.url + '/api/blob', outfile=os.path.join(tmpdir, 'blob.bin')))
+
+            with open(outfile, 'rb') as f:
+                self.assertEqual(f.read(), self.server.content)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_http_error(self):
+        async def calls(session):
+            await AsyncEcxAPI(session, 'widget').get(resid='404')
+
+        with self.assertRaises(Exception) as cm:
+            self.run_session(calls)
+
+        self.assertEqual(cm.exception.status, 404)
+
+if __name__ == '__main__':
+    unittest.main()
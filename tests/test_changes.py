@@ -0,0 +1,103 @@
+import unittest
+
+from ecxclient.sdk.client import EcxAPI
+from ecxclient.sdk.client import EcxSession
+
+from tests.server import EcxServer
+
+class ChangesSinceTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.api = EcxAPI(self.session, 'widget')
+
+        self.widgets = {}
+        for name, updated in (('a', 100), ('b', 100), ('c', 300)):
+            self.widgets[name] = self.server.add('widget', name=name, creationTime=100, lastUpdated=updated)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def names(self, resources):
+        return sorted(res['name'] for res in resources)
+
+    def next_changes(self, changes, **kwargs):
+        return self.api.changes_since(changes.timestamp, changes.snapshot,
+                                      snapshot_complete=changes.snapshot_complete, **kwargs)
+
+    def test_server_filtered(self):
+        changes = self.api.changes_since(200)
+
+        self.assertTrue(changes.server_filtered)
+        self.assertEqual(self.names(changes.changed), ['c'])
+        self.assertEqual(changes.added, [])
+        self.assertIsNone(changes.removed)
+        self.assertEqual(changes.timestamp, 300)
+        self.assertFalse(changes.snapshot_complete)
+
+    def test_change_after_partial_snapshot_is_not_an_addition(self):
+        changes = self.api.changes_since(200)
+
+        self.widgets['b'].update(name='b2', lastUpdated=400)
+        self.server.add('widget', name='d', creationTime=450, lastUpdated=450)
+        changes = self.next_changes(changes)
+
+        self.assertEqual(self.names(changes.changed), ['b2'])
+        self.assertEqual(self.names(changes.added), ['d'])
+        self.assertFalse(changes.snapshot_complete)
+
+    def test_full_listing(self):
+        changes = self.api.changes_since(200, full=True)
+
+        self.assertFalse(changes.server_filtered)
+        self.assertEqual(self.names(changes.changed), ['c'])
+        self.assertIsNone(changes.removed)
+        self.assertEqual(len(changes.snapshot), 3)
+        self.assertTrue(changes.snapshot_complete)
+
+        self.server.resources['widget'].remove(self.widgets['a'])
+        self.widgets['b'].update(lastUpdated=400)
+        self.server.add('widget', name='d', creationTime=50, lastUpdated=450)
+
+        # Compared to a complete snapshot, d is new whatever its creationTime.
+        changes = self.next_changes(changes, full=True)
+
+        self.assertEqual(self.names(changes.changed), ['b'])
+        self.assertEqual(self.names(changes.added), ['d'])
+        self.assertEqual(changes.removed, set([self.widgets['a']['id']]))
+
+    def test_filtered_after_complete_snapshot(self):
+        changes = self.api.changes_since(200, full=True)
+        self.server.add('widget', name='d', creationTime=50, lastUpdated=450)
+
+        changes = self.next_changes(changes)
+
+        self.assertTrue(changes.server_filtered)
+        self.assertEqual(self.names(changes.added), ['d'])
+        self.assertTrue(changes.snapshot_complete)
+        self.assertEqual(len(changes.snapshot), 4)
+
+    def test_ignored_filter_lists_once(self):
+        for i in range(3):
+            self.server.add('widget', name='old%d' % i, creationTime=50, lastUpdated=50)
+
+        self.server.ignore_filters = True
+        changes = self.api.changes_since(200, page_size=2)
+
+        self.assertFalse(changes.server_filtered)
+        self.assertEqual(self.names(changes.changed), ['c'])
+        self.assertTrue(changes.snapshot_complete)
+        # 6 widgets in pages of 2, and the empty page that ends the listing.
+        self.assertEqual([n for collection, n in self.server.listed], [2, 2, 2, 0])
+
+    def test_rejected_filter(self):
+        self.server.reject_filters = True
+        changes = self.api.changes_since(200)
+
+        self.assertFalse(changes.server_filtered)
+        self.assertEqual(self.names(changes.changed), ['c'])
+        self.assertEqual(len(self.server.listed), 1)
+
+if __name__ == '__main__':
+    unittest.main()
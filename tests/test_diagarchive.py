@@ -0,0 +1,99 @@
+import gzip
+import io
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.diagarchive import DiagnosticsArchive
+from ecxclient.sdk.diagarchive import HttpRangeFile
+from ecxclient.sdk.diagarchive import open_diagnostics
+
+from tests.server import EcxServer
+
+def make_archive():
+    noise = random.Random(0)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('logs/catalina.out', 'started\nERROR snapshot of vm-1 failed\ndone\n')
+        z.writestr('logs/old.log.gz', gzip.compress(b'ok\nERROR snapshot of vm-2 failed\n'))
+        # Large and incompressible, so reading the others must skip it.
+        z.writestr('dump/heap.bin', bytes(bytearray(noise.getrandbits(8) for i in range(2000000))))
+
+    return buf.getvalue()
+
+ARCHIVE = make_archive()
+
+class DiagnosticsArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.server.content = ARCHIVE
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.url = self.server.url + '/api/blob'
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.tmpdir)
+
+    def grep(self, archive):
+        return [(member, lineno) for member, lineno, line in archive.grep('ERROR snapshot', members=['logs/*'])]
+
+    def test_remote_reads(self):
+        with open_diagnostics(self.session, url=self.url) as archive:
+            self.assertIsInstance(archive.zipfile.fp, HttpRangeFile)
+            self.assertEqual([info.filename for info in archive.members(['logs/*'])],
+                             ['logs/catalina.out', 'logs/old.log.gz'])
+            self.assertEqual(self.grep(archive), [('logs/catalina.out', 2), ('logs/old.log.gz', 2)])
+
+            paths = archive.extract(['*/catalina.out'], self.tmpdir)
+            self.assertEqual(paths, [os.path.join(self.tmpdir, 'logs', 'catalina.out')])
+
+        # The directory and the small members, not the whole archive.
+        self.assertLess(sum(int(r.split('-')[1]) - int(r[6:].split('-')[0]) + 1
+                            for r in self.server.ranges_sent()), len(ARCHIVE) // 4)
+
+    def test_without_range_support(self):
+        self.server.ranges = False
+        archive = open_diagnostics(self.session, url=self.url)
+        tmpdir = archive.tmpdir
+
+        self.assertEqual(self.grep(archive), [('logs/catalina.out', 2), ('logs/old.log.gz', 2)])
+        self.assertTrue(os.path.exists(os.path.join(tmpdir, 'blob.bin')))
+
+        archive.close()
+        self.assertFalse(os.path.exists(tmpdir))
+
+    def test_without_validator(self):
+        self.server.etag = None
+        with open_diagnostics(self.session, url=self.url) as archive:
+            self.assertIsNotNone(archive.tmpdir)
+            self.assertEqual(len(self.grep(archive)), 2)
+
+        self.assertEqual(self.server.ranges_sent(), ['bytes=0-0'])
+
+    def test_archive_changed_while_reading(self):
+        archive = open_diagnostics(self.session, url=self.url)
+        self.server.etag = '"v2"'
+
+        with self.assertRaises(Exception) as cm:
+            archive.extract(['dump/*'], self.tmpdir)
+
+        self.assertIn('changed while reading', str(cm.exception))
+        archive.close()
+
+    def test_local_file(self):
+        path = os.path.join(self.tmpdir, 'diag.zip')
+        with open(path, 'wb') as f:
+            f.write(ARCHIVE)
+
+        with DiagnosticsArchive(path) as archive:
+            self.assertEqual(archive.name, path)
+            self.assertEqual(len(archive.members()), 3)
+
+if __name__ == '__main__':
+    unittest.main()
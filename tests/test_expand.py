@@ -0,0 +1,50 @@
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+
+from tests.server import EcxServer
+
+class ExpandTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+
+        self.policies = [self.server.add('policy', name=name) for name in ('gold', 'silver')]
+        self.jobs = [{'name': 'job%d' % i, 'links': {'policy': {'href': self.href(self.policies[i % 2])}}}
+                     for i in range(5)]
+        self.jobs.append({'name': 'nopolicy', 'links': {}})
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def href(self, res):
+        return self.server.url + '/api/policy/' + res['id']
+
+    def test_unique_hrefs_fetched_once(self):
+        resources = self.session.expand(self.jobs, 'policy')
+
+        self.assertEqual(dict((href, res['name']) for href, res in resources.items()),
+                         {self.href(self.policies[0]): 'gold', self.href(self.policies[1]): 'silver'})
+        self.assertEqual(sorted(req[1] for req in self.server.sent('GET')),
+                         ['policy/' + self.policies[0]['id'], 'policy/' + self.policies[1]['id']])
+
+    def test_attach(self):
+        self.session.expand(self.jobs, 'policy', attach='policy')
+
+        self.assertEqual([job.get('policy', {}).get('name') for job in self.jobs],
+                         ['gold', 'silver', 'gold', 'silver', 'gold', None])
+        self.assertIs(self.jobs[0]['policy'], self.jobs[2]['policy'])
+
+    def test_no_links(self):
+        self.assertEqual(self.session.expand([{'links': {}}, {}], 'policy'), {})
+        self.assertEqual(self.server.sent(), [])
+
+    def test_failed_fetch(self):
+        self.jobs[0]['links']['policy']['href'] += '0'
+
+        with self.assertRaises(Exception):
+            self.session.expand(self.jobs, 'policy')
+
+if __name__ == '__main__':
+    unittest.main()
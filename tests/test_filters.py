@@ -0,0 +1,78 @@
+import json
+import unittest
+
+from ecxclient.sdk.client import EcxAPI
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import F
+from ecxclient.sdk.client import build_list_params
+from ecxclient.sdk.client import encode_list_param
+
+from tests.server import EcxServer
+
+class FilterTest(unittest.TestCase):
+    def test_conditions(self):
+        self.assertEqual(F('name') == 'x', [{'property': 'name', 'op': '=', 'value': 'x'}])
+        self.assertEqual([cond['op'] for f in (F('a') != 1, F('a') > 1, F('a') >= 1, F('a') < 1, F('a') <= 1)
+                          for cond in f], ['!=', '>', '>=', '<', '<='])
+        self.assertEqual(F('id').in_(('1', '2')), [{'property': 'id', 'op': 'IN', 'value': ['1', '2']}])
+
+    def test_combined(self):
+        f = (F('name') == 'x') & (F('logTime') > 5) & (F('type') != 'DEBUG')
+        self.assertEqual([cond['property'] for cond in f], ['name', 'logTime', 'type'])
+
+        s = F('logTime').asc() + F('id').desc()
+        self.assertEqual(s, [{'property': 'logTime', 'direction': 'ASC'}, {'property': 'id', 'direction': 'DESC'}])
+
+    def test_encoding(self):
+        self.assertEqual(encode_list_param(F('name') == 'x'), '[{"property": "name", "op": "=", "value": "x"}]')
+        self.assertEqual(encode_list_param('[{"property": "name"}]'), '[{"property": "name"}]')
+        self.assertEqual(json.loads(encode_list_param([F('a') == 1, {'property': 'b', 'value': 2}])),
+                         [{'property': 'a', 'op': '=', 'value': 1}, {'property': 'b', 'value': 2}])
+        self.assertIsNone(encode_list_param(None))
+
+    def test_list_params(self):
+        params = build_list_params({'time': 0}, 10, 20, F('a') == 1, F('a').asc())
+
+        self.assertEqual(sorted(params), ['filter', 'pageSize', 'pageStartIndex', 'sort', 'time'])
+        self.assertEqual(build_list_params(), {})
+
+    def test_not_hashable(self):
+        with self.assertRaises(TypeError):
+            hash(F('name'))
+
+class ServerFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.api = EcxAPI(self.session, 'job')
+
+        for name, priority in (('backup', 2), ('restore', 1), ('Backup', 3)):
+            self.server.add('endeavour/job', name=name, priority=priority)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def test_list(self):
+        jobs = self.api.list(filter=F('priority') >= 2, sort=F('priority').desc())
+
+        self.assertEqual([job['name'] for job in jobs], ['Backup', 'backup'])
+        query = self.server.sent('GET', 'endeavour/job')[0][2]
+        self.assertEqual(json.loads(query['filter']), [{'property': 'priority', 'op': '>=', 'value': 2}])
+
+    def test_get(self):
+        self.assertEqual(len(self.api.get(filter=F('name') == 'restore')['jobs']), 1)
+
+    def test_find_by_name(self):
+        self.assertEqual(self.api.find_by_name('backup')['priority'], 2)
+        self.assertIsNone(self.api.find_by_name('archive'))
+        self.assertEqual(self.server.listed, [('endeavour/job', 1), ('endeavour/job', 0)])
+
+    def test_find_by_name_with_filter_ignored(self):
+        self.server.ignore_filters = True
+
+        self.assertEqual(self.api.find_by_name('Backup')['priority'], 3)
+        self.assertIsNone(self.api.find_by_name('archive'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.inventory import InventoryCache
+
+from tests.server import EcxServer
+
+class InventoryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = InventoryCache(self.session, path=os.path.join(self.tmpdir, 'inventory.db'), max_age=0)
+
+        self.vms = {}
+        self.add_vsphere('1', [('vm1', 100), ('vm2', 100)])
+
+    def tearDown(self):
+        self.cache.close()
+        self.session.close()
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.tmpdir)
+
+    def href(self, path):
+        return self.server.url + '/api/' + path
+
+    def add_vsphere(self, vsphereid, vms, vms_link=True):
+        collection = 'vsphere/%s/vms' % vsphereid
+        links = {'self': {'href': self.href('vsphere/' + vsphereid)}}
+        if vms_link:
+            links['vms'] = {'href': self.href(collection)}
+
+        self.server.add('vsphere', id=vsphereid, name='vcenter' + vsphereid, links=links)
+        self.server.list_fields[collection] = 'vms'
+        self.server.resources.setdefault(collection, [])
+        for name, updated in vms:
+            self.add_vm(vsphereid, name, updated)
+
+    def add_vm(self, vsphereid, name, updated):
+        collection = 'vsphere/%s/vms' % vsphereid
+        self.vms[name] = self.server.add(collection, id=name, name=name, lastUpdated=updated,
+                                         links={'self': {'href': self.href(collection + '/' + name)}})
+
+    def names(self, kind='vm'):
+        return sorted(res['name'] for res in self.cache.list(kind))
+
+    def vm_listings(self):
+        return [req[2] for req in self.server.sent('GET') if req[1].endswith('/vms')]
+
+    def test_incremental_refresh(self):
+        self.assertEqual(self.names(), ['vm1', 'vm2'])
+
+        self.vms['vm1'].update(name='vm1-renamed', lastUpdated=200)
+        self.add_vm('1', 'vm3', 300)
+
+        self.assertEqual(self.names(), ['vm1-renamed', 'vm2', 'vm3'])
+        first, second = self.vm_listings()
+        self.assertNotIn('filter', first)
+        self.assertEqual(second['filter'], '[{"property": "lastUpdated", "op": ">", "value": 100}]')
+
+    def test_rejected_filter_lists_all(self):
+        self.assertEqual(self.names(), ['vm1', 'vm2'])
+
+        self.server.reject_filters = True
+        self.vms['vm1'].update(name='vm1-renamed', lastUpdated=200)
+        self.server.resources['vsphere/1/vms'].remove(self.vms['vm2'])
+
+        # Listed in full, so the removal is seen too.
+        self.assertEqual(self.names(), ['vm1-renamed'])
+
+    def test_failed_provider_is_retried(self):
+        self.cache.max_age = 3600
+        self.add_vsphere('2', [('vm3', 100)])
+        vms = self.server.resources.pop('vsphere/2/vms')
+
+        self.assertEqual(self.names(), ['vm1', 'vm2'])
+        self.assertTrue(self.cache.is_stale('vm'))
+
+        self.server.resources['vsphere/2/vms'] = vms
+        self.assertEqual(self.names(), ['vm1', 'vm2', 'vm3'])
+        self.assertFalse(self.cache.is_stale('vm'))
+
+    def test_provider_without_link_is_skipped(self):
+        self.add_vsphere('2', [('vm3', 100)], vms_link=False)
+
+        self.assertEqual(self.names(), ['vm1', 'vm2'])
+        self.assertEqual(self.names('vsphere'), ['vcenter1', 'vcenter2'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+
+from ecxclient.sdk.client import EcxAPI
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import iter_pages
+
+from tests.server import EcxServer
+
+class IterListTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.api = EcxAPI(self.session, 'widget')
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def add_widgets(self, count):
+        for i in range(count):
+            self.server.add('widget', name='w%d' % i)
+
+    def page_starts(self):
+        return [int(req[2]['pageStartIndex']) for req in self.server.sent('GET', 'widget')]
+
+    def test_pages(self):
+        self.add_widgets(5)
+
+        names = [widget['name'] for widget in self.api.iter_list(page_size=2)]
+
+        self.assertEqual(names, ['w0', 'w1', 'w2', 'w3', 'w4'])
+        self.assertEqual(self.page_starts(), [0, 2, 4])
+        self.assertTrue(all(req[2]['pageSize'] == '2' for req in self.server.sent('GET', 'widget')))
+
+    def test_last_page_full(self):
+        self.add_widgets(4)
+
+        self.assertEqual(len(list(self.api.iter_list(page_size=2))), 4)
+        self.assertEqual(self.page_starts(), [0, 2, 4])
+
+    def test_empty(self):
+        self.server.resources['widget'] = []
+
+        self.assertEqual(list(self.api.iter_list()), [])
+        self.assertEqual(self.page_starts(), [0])
+
+    def test_lazy(self):
+        self.add_widgets(5)
+
+        widgets = self.api.iter_list(page_size=2)
+        next(widgets)
+        next(widgets)
+
+        self.assertEqual(self.page_starts(), [0])
+        widgets.close()
+
+    def test_filter_sort_and_params(self):
+        for name, size in (('a', 3), ('b', 1), ('c', 2), ('d', 5)):
+            self.server.add('widget', name=name, size=size)
+
+        widgets = self.api.iter_list(page_size=2, filter='[{"property": "size", "op": "<", "value": 5}]',
+                                     sort=[{'property': 'size', 'direction': 'ASC'}], params={'from': 'hlo'})
+
+        self.assertEqual([w['name'] for w in widgets], ['b', 'c', 'a'])
+        query = self.server.sent('GET', 'widget')[0][2]
+        self.assertEqual(query['sort'], '[{"property": "size", "direction": "ASC"}]')
+        self.assertEqual(query['from'], 'hlo')
+
+class IterPagesTest(unittest.TestCase):
+    def test_paging_ignored(self):
+        calls = []
+
+        def fetch_page(size, start_index):
+            calls.append((size, start_index))
+            return list(range(5))
+
+        self.assertEqual(list(iter_pages(fetch_page, 2)), [[0, 1, 2, 3, 4]])
+        self.assertEqual(calls, [(2, 0)])
+
+    def test_start_index(self):
+        calls = []
+
+        def fetch_page(size, start_index):
+            calls.append(start_index)
+            return ['x'] * size if start_index < 20 else []
+
+        self.assertEqual(len(list(iter_pages(fetch_page, 5, page_start_index=10))), 2)
+        self.assertEqual(calls, [10, 15, 20])
+
+if __name__ == '__main__':
+    unittest.main()
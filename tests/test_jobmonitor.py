@@ -0,0 +1,114 @@
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import JobMonitor
+
+from tests.server import EcxServer
+
+START = 1600000000000
+
+class JobMonitorTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.next_time = START
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def add_job(self, jobid, status, sessionid, **fields):
+        return self.server.add('endeavour/job', id=jobid, status=status, lastrun={'sessionId': sessionid}, **fields)
+
+    def log(self, sessionid, count=1):
+        for i in range(count):
+            self.server.add('endeavour/log/job', jobsessionId=sessionid, logTime=self.next_time,
+                            message='entry at %d' % self.next_time)
+            # One entry a second.
+            self.next_time += 1000
+
+    def logs_listed(self):
+        """Returns the number of log entries returned since the last call."""
+        count = sum(n for collection, n in self.server.listed if collection == 'endeavour/log/job')
+        del self.server.listed[:]
+        return count
+
+    def log_events(self, events):
+        return [(event.jobid, len(event.entries)) for event in events if event.kind == 'log']
+
+    def test_follows_logs_of_running_job(self):
+        self.add_job('1', 'RUNNING', 's1')
+        self.log('s1', 3)
+        monitor = JobMonitor(self.session, [1])
+
+        self.assertEqual(self.log_events(monitor.poll()), [('1', 3)])
+        self.log('s1', 2)
+        self.assertEqual(self.log_events(monitor.poll()), [('1', 2)])
+        self.assertEqual(self.log_events(monitor.poll()), [])
+
+    def test_previous_run_is_not_followed(self):
+        job = self.add_job('1', 'IDLE', 's0')
+        self.log('s0', 3)
+        monitor = JobMonitor(self.session, ['1'], idle_grace=60)
+
+        self.assertEqual(self.log_events(monitor.poll()), [])
+
+        job.update(status='RUNNING', lastrun={'sessionId': 's1'})
+        self.log('s1', 2)
+        self.assertEqual(self.log_events(monitor.poll()), [('1', 2)])
+
+        job.update(status='IDLE')
+        events = monitor.poll()
+        self.assertEqual([event.kind for event in events], ['status', 'done'])
+        self.assertEqual(monitor.run(), {'1': 'IDLE'})
+
+    def test_quiet_job_keeps_log_query_bounded(self):
+        self.add_job('1', 'RUNNING', 's1')
+        self.log('s1', 5000)
+        monitor = JobMonitor(self.session, ['1'])
+
+        monitor.poll()
+        self.assertEqual(self.logs_listed(), 5000)
+
+        # The query starts at the last entry seen, which is listed again.
+        self.log('s1')
+        monitor.poll()
+        self.assertEqual(self.logs_listed(), 2)
+
+        # A new run without entries, started after what s1 logged so far.
+        self.add_job('2', 'RUNNING', 's2', lastRunTime=self.next_time)
+        monitor.add('2')
+        listed = []
+        for i in range(80):
+            self.log('s1')
+            self.assertEqual(self.log_events(monitor.poll()), [('1', 1)])
+            listed.append(self.logs_listed())
+
+        # s2 holds the query back to its start, at most log_lag behind
+        # the newest entry.
+        self.assertLessEqual(max(listed), 62)
+
+        self.log('s2')
+        self.assertEqual(self.log_events(monitor.poll()), [('2', 1)])
+
+    def test_quiet_job_without_run_time(self):
+        self.add_job('1', 'RUNNING', 's1')
+        self.log('s1', 5000)
+        monitor = JobMonitor(self.session, ['1'], log_lag=60)
+        monitor.poll()
+        self.logs_listed()
+
+        self.add_job('2', 'RUNNING', 's2')
+        monitor.add('2')
+
+        # Without a start time, s2 needs its whole log once.
+        monitor.poll()
+        self.assertEqual(self.logs_listed(), 5000)
+
+        for i in range(3):
+            self.log('s1')
+            self.assertEqual(self.log_events(monitor.poll()), [('1', 1)])
+            self.assertEqual(self.logs_listed(), 62)
+
+if __name__ == '__main__':
+    unittest.main()
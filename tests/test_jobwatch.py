@@ -0,0 +1,87 @@
+import unittest
+
+from unittest import mock
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import JobAPI
+
+from tests.server import EcxServer
+
+class JobWatchTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.api = JobAPI(self.session)
+
+        self.server.add('endeavour/job', id='1', name='backup', lastrun={'sessionId': 's1'})
+        self.server.routes[('GET', 'endeavour/job/1/status')] = self.status
+        self.statuses = []
+        self.polls = 0
+        self.log_time = 0
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def status(self, query, body):
+        status = self.statuses[min(self.polls, len(self.statuses) - 1)]
+        if callable(status):
+            status = status()
+
+        self.polls += 1
+        return {'currentStatus': status}
+
+    def log(self, *messages):
+        for message in messages:
+            self.log_time += 1
+            self.server.add('endeavour/log/job', jobsessionId='s1', logTime=self.log_time, message=message)
+
+    def watch(self, **kwargs):
+        sleeps = []
+        with mock.patch('ecxclient.sdk.client.time.sleep', sleeps.append):
+            status = self.api.watch('1', jitter=0, **kwargs)
+
+        return status, sleeps
+
+    def test_status_changes_and_backoff(self):
+        self.statuses = ['PENDING', 'RUNNING', 'RUNNING', 'RUNNING', 'RUNNING', 'RESOURCE ACTIVE', 'PENDING']
+        changes = []
+
+        status, sleeps = self.watch(on_status=changes.append, min_interval=1, max_interval=4)
+
+        self.assertEqual(status, 'PENDING')
+        self.assertEqual(changes, ['PENDING', 'RUNNING', 'RESOURCE ACTIVE', 'PENDING'])
+        self.assertEqual(sleeps, [1, 1, 2, 4, 4, 1])
+
+    def test_idle_right_after_start(self):
+        self.statuses = ['IDLE', 'RUNNING', 'IDLE']
+
+        status, sleeps = self.watch(idle_grace=60)
+
+        self.assertEqual(status, 'IDLE')
+        self.assertEqual(self.polls, 3)
+
+    def test_logs(self):
+        def running():
+            self.log('step %d' % self.polls)
+            return 'RUNNING'
+
+        self.log('started')
+        self.statuses = [running, running, 'IDLE']
+        entries = []
+
+        self.watch(on_log=lambda new: entries.append([entry['message'] for entry in new]))
+
+        self.assertEqual(entries, [['started', 'step 0'], ['step 1']])
+        self.assertEqual(len(self.server.sent('GET', 'endeavour/job/1')), 1)
+
+    def test_timeout(self):
+        self.statuses = ['RUNNING']
+
+        with self.assertRaises(Exception) as cm:
+            self.api.watch('1', min_interval=0.01, timeout=0.2)
+
+        self.assertIn('Timed out', str(cm.exception))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ecxclient.sdk.logexport import CsvLogExporter
+from ecxclient.sdk.logexport import JsonLinesLogExporter
+from ecxclient.sdk.logexport import TimestampFormatter
+from ecxclient.sdk.logexport import export_logs
+from ecxclient.sdk.logexport import zstandard
+
+ENTRIES = [{'logTime': 1600000000000 + i * 500, 'message': 'entry %d, "quoted" é' % i, 'type': 'INFO'}
+           for i in range(5)]
+
+class LogExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def read_csv(self, data):
+        return list(csv.reader(io.StringIO(data.decode('utf-8'))))
+
+    def test_csv(self):
+        self.assertEqual(export_logs(iter(ENTRIES), self.path('log.csv')), 5)
+
+        with open(self.path('log.csv'), 'rb') as f:
+            rows = self.read_csv(f.read())
+
+        self.assertEqual(rows[0], ['TimeStamp', 'Message'])
+        self.assertEqual(rows[1], [time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(1600000000)),
+                                   'entry 0, "quoted" é'])
+        self.assertEqual(len(rows), 6)
+
+    def test_csv_fields(self):
+        with CsvLogExporter.open(self.path('log.csv'), fields=('type', 'message', 'missing'), headers=None,
+                                 time_format='%H') as exporter:
+            exporter(ENTRIES[0])
+
+        with open(self.path('log.csv'), 'rb') as f:
+            self.assertEqual(self.read_csv(f.read()), [['INFO', 'entry 0, "quoted" é', '']])
+
+    def test_jsonl_gzip(self):
+        self.assertEqual(export_logs(ENTRIES, self.path('log.jsonl.gz'), format='jsonl'), 5)
+
+        with gzip.open(self.path('log.jsonl.gz'), 'rb') as f:
+            lines = f.read().decode('utf-8').splitlines()
+
+        self.assertEqual([json.loads(line) for line in lines], ENTRIES)
+
+    def test_explicit_compression(self):
+        with JsonLinesLogExporter.open(self.path('log.out'), compression='gzip') as exporter:
+            self.assertEqual(exporter.write_all(ENTRIES[:2]), 2)
+
+        with gzip.open(self.path('log.out'), 'rb') as f:
+            self.assertEqual(len(f.read().splitlines()), 2)
+
+        with self.assertRaises(Exception):
+            export_logs(ENTRIES, self.path('log.out'), compression='lz4')
+
+    @unittest.skipIf(zstandard is None, "needs zstandard")
+    def test_zstd(self):
+        export_logs(ENTRIES, self.path('log.jsonl.zst'), format='jsonl')
+
+        with open(self.path('log.jsonl.zst'), 'rb') as f:
+            data = zstandard.ZstdDecompressor().stream_reader(f).read()
+
+        self.assertEqual(len(data.splitlines()), 5)
+
+class TimestampFormatterTest(unittest.TestCase):
+    def test_cached_per_second(self):
+        format_time = TimestampFormatter('%S', cache_size=2)
+
+        self.assertEqual(format_time(1600000000999), time.strftime('%S', time.localtime(1600000000)))
+        self.assertIs(format_time(1600000000000), format_time(1600000000500))
+
+        format_time(1600000001000)
+        format_time(1600000002000)
+        self.assertLessEqual(len(format_time.cache), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import collections
+import re
+import unittest
+
+from ecxclient.sdk.client import JobEvent
+from ecxclient.sdk.logscan import LogScanner
+from ecxclient.sdk.logscan import PatternSet
+
+PATTERNS = collections.OrderedDict([
+    ('snapshot', r'snapshot of (\S+) failed'),
+    ('timeout', r'timed out after (?P<secs>\d+)'),
+    ('error', r'ERROR'),
+])
+
+class PatternSetTest(unittest.TestCase):
+    def names(self, patterns, text):
+        return [name for name, m in patterns.search(text)]
+
+    def test_search(self):
+        patterns = PatternSet(PATTERNS)
+
+        self.assertIsNotNone(patterns.prefilter)
+        self.assertEqual(len(patterns), 3)
+        self.assertEqual(self.names(patterns, 'ERROR snapshot of vm-1 failed'), ['snapshot', 'error'])
+        self.assertEqual(self.names(patterns, 'all good'), [])
+
+    def test_pairs_and_compiled(self):
+        patterns = PatternSet([('error', re.compile('error', re.IGNORECASE)), ('warn', 'WARN')])
+
+        # Flags differ, so each pattern is searched on its own.
+        self.assertIsNone(patterns.prefilter)
+        self.assertEqual(self.names(patterns, 'Error and WARN'), ['error', 'warn'])
+        self.assertEqual(self.names(patterns, 'warn'), [])
+
+    def test_flags(self):
+        patterns = PatternSet({'error': 'error', 'warn': 'warn'}, re.IGNORECASE)
+
+        self.assertIsNotNone(patterns.prefilter)
+        self.assertEqual(sorted(self.names(patterns, 'ERROR, WARN')), ['error', 'warn'])
+
+    def test_not_combinable(self):
+        backreference = PatternSet([('repeated', r'(\w+) \1'), ('error', 'ERROR')])
+        same_group = PatternSet([('a', r'(?P<vm>vm-\d+) failed'), ('b', r'(?P<vm>vm-\d+) ok')])
+
+        self.assertIsNone(backreference.prefilter)
+        self.assertEqual(self.names(backreference, 'ERROR again again'), ['repeated', 'error'])
+        self.assertIsNone(same_group.prefilter)
+        self.assertEqual(self.names(same_group, 'vm-1 ok'), ['b'])
+
+class LogScannerTest(unittest.TestCase):
+    def entries(self, *messages):
+        return [{'id': i, 'message': message} for i, message in enumerate(messages)]
+
+    def test_scan(self):
+        seen = []
+        scanner = LogScanner(PATTERNS, on_match=seen.append)
+
+        matches = scanner.feed(self.entries('snapshot of vm-1 failed', 'ok', None, 'timed out after 30 s'))
+
+        self.assertEqual([(m.pattern, m.groups, m.entry['id']) for m in matches],
+                         [('snapshot', ('vm-1',), 0), ('timeout', {'secs': '30'}, 3)])
+        self.assertEqual(seen, matches)
+        self.assertEqual(scanner.scanned, 4)
+        self.assertEqual(scanner.counts, {'snapshot': 1, 'timeout': 1})
+
+    def test_field(self):
+        scanner = LogScanner(PatternSet({'error': 'ERROR'}), field='type')
+
+        self.assertEqual(len(scanner.feed([{'type': 'ERROR', 'message': 'x'}, {'message': 'ERROR'}])), 1)
+
+    def test_job_events(self):
+        scanner = LogScanner(PATTERNS)
+        events = [JobEvent('status', '1', 'RUNNING', None),
+                  JobEvent('log', '1', 'RUNNING', self.entries('ERROR')),
+                  JobEvent('log', '2', 'RUNNING', self.entries('fine', 'ERROR here'))]
+
+        self.assertEqual([(jobid, match.entry['id']) for jobid, match in scanner.scan_job_events(events)],
+                         [('1', 0), ('2', 1)])
+        self.assertEqual(scanner.scanned, 3)
+
+if __name__ == '__main__':
+    unittest.main()
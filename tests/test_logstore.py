@@ -0,0 +1,91 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.logstore import LogStore
+
+from tests.server import EcxServer
+
+START = 1600000000000
+
+class LogStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = LogStore(self.session, path=os.path.join(self.tmpdir, 'logs.db'), page_size=2)
+        self.next_time = START
+
+    def tearDown(self):
+        self.store.close()
+        self.session.close()
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.tmpdir)
+
+    def log(self, sessionid, *messages, **fields):
+        for message in messages:
+            self.server.add('endeavour/log/job', jobsessionId=sessionid, logTime=self.next_time,
+                            message=message, type=fields.get('type', 'INFO'))
+            self.next_time += 1000
+
+    def log_queries(self):
+        queries = [req[2] for req in self.server.sent('GET', 'endeavour/log/job')]
+        del self.server.requests[:]
+        return queries
+
+    def test_active_session_is_ingested_again(self):
+        job = self.server.add('endeavour/job', id='1', name='backup',
+                              lastrun={'sessionId': 's1', 'status': 'RESOURCE ACTIVE'})
+        self.log('s1', 'one', 'two', 'three')
+
+        self.assertEqual(self.store.ingest_job('1'), 3)
+        self.log('s1', 'four')
+        self.assertEqual(self.store.ingest_job('1'), 1)
+        self.assertIn('"op": ">="', self.log_queries()[-1]['filter'])
+
+        job['lastrun']['status'] = 'COMPLETED'
+        self.assertEqual(self.store.ingest_job('1'), 0)
+        self.assertEqual(self.store.sessions(), [dict(self.store.sessions()[0], entries=4, complete=1)])
+
+        self.log_queries()
+        self.log('s1', 'late')
+        self.assertEqual(self.store.ingest_job('1'), 0)
+        self.assertEqual(self.log_queries(), [])
+
+    def test_all_sessions(self):
+        self.server.add('endeavour/job', id='1', name='backup')
+        for sessionid, status in (('s1', 'COMPLETED'), ('s2', 'FAILED'), ('s3', 'RUNNING'), ('s4', 'HELD')):
+            self.server.add('endeavour/jobsession', id=sessionid, jobId='1', status=status)
+            self.log(sessionid, 'entry of %s' % sessionid)
+
+        self.assertEqual(self.store.ingest_job('1', all_sessions=True), 4)
+
+        complete = dict((s['jobsessionId'], s['complete']) for s in self.store.sessions(job_id=1))
+        self.assertEqual(complete, {'s1': 1, 's2': 1, 's3': 0, 's4': 0})
+
+    def test_search(self):
+        self.server.add('endeavour/jobsession', id='s1', jobId='1', status='COMPLETED')
+        self.log('s1', 'snapshot of vm-123 failed: timed out', 'connected to 10.0.0.1', 'vm-1234 ok')
+        self.log('s1', 'disk 50% full', type='WARN')
+        self.store.ingest_session('s1', job_id='1', complete=True)
+
+        def search(text, **kwargs):
+            return [entry['message'] for entry in self.store.search(text, **kwargs)]
+
+        self.assertEqual(search('vm-123 failed:'), ['snapshot of vm-123 failed: timed out'])
+        self.assertEqual(search('10.0.0.1'), ['connected to 10.0.0.1'])
+        self.assertEqual(search('50%'), ['disk 50% full'])
+        self.assertEqual(search(None, type='WARN'), ['disk 50% full'])
+        self.assertEqual(search(None, job_id=1, since=START + 1000, limit=2),
+                         ['connected to 10.0.0.1', 'vm-1234 ok'])
+
+        if self.store.fts:
+            self.assertEqual(search('snapshot AND "timed out"', query=True), ['snapshot of vm-123 failed: timed out'])
+            with self.assertRaises(sqlite3.OperationalError):
+                search('failed:', query=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import LogCursor
+from ecxclient.sdk.client import LogTail
+
+from tests.server import EcxServer
+
+class LogCursorTest(unittest.TestCase):
+    def test_advance(self):
+        cursor = LogCursor()
+
+        self.assertEqual(cursor.advance([{'id': 1, 'logTime': 5}, {'id': 2, 'logTime': 5}]),
+                         [{'id': 1, 'logTime': 5}, {'id': 2, 'logTime': 5}])
+        self.assertEqual(cursor.advance([{'id': 1, 'logTime': 5}, {'id': 3, 'logTime': 5},
+                                         {'id': 0, 'logTime': 4}, {'id': 4, 'logTime': 6}]),
+                         [{'id': 3, 'logTime': 5}, {'id': 4, 'logTime': 6}])
+        self.assertEqual((cursor.log_time, cursor.ids), (6, set([4])))
+
+    def test_dict(self):
+        cursor = LogCursor.from_dict(LogCursor(7, ['b', 'a']).to_dict())
+
+        self.assertEqual((cursor.log_time, cursor.ids), (7, set(['a', 'b'])))
+        self.assertIsNone(LogCursor.from_dict({}).log_time)
+
+class LogTailTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.tmpdir = tempfile.mkdtemp()
+        self.cursor_file = os.path.join(self.tmpdir, 'cursor.json')
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.tmpdir)
+
+    def log(self, log_time, *messages):
+        for message in messages:
+            self.server.add('endeavour/log/job', jobsessionId='s1', logTime=log_time, message=message)
+
+    def messages(self, entries):
+        return [entry['message'] for entry in entries]
+
+    def test_incremental(self):
+        self.server.add('endeavour/log/job', jobsessionId='s2', logTime=1, message='other session')
+        self.log(1, 'a')
+        self.log(2, 'b', 'c', 'd')
+        tail = LogTail(self.session, 's1', page_size=2)
+
+        self.assertEqual(self.messages(tail.fetch()), ['a', 'b', 'c', 'd'])
+
+        self.log(2, 'e')
+        self.log(3, 'f')
+        self.assertEqual(self.messages(tail.fetch()), ['e', 'f'])
+        self.assertEqual(tail.fetch(), [])
+
+        query = self.server.sent('GET', 'endeavour/log/job')[-1][2]
+        self.assertEqual(json.loads(query['filter'])[1], {'property': 'logTime', 'op': '>=', 'value': 3})
+
+    def test_resume(self):
+        self.log(1, 'a', 'b')
+        self.assertEqual(self.messages(LogTail(self.session, 's1', cursor_file=self.cursor_file).fetch()), ['a', 'b'])
+
+        self.log(1, 'c')
+        self.log(2, 'd')
+        tail = LogTail(self.session, 's1', cursor_file=self.cursor_file)
+        self.assertEqual(tail.cursor.log_time, 1)
+        self.assertEqual(self.messages(tail.fetch()), ['c', 'd'])
+
+        with open(self.cursor_file) as f:
+            self.assertEqual(json.load(f)['logTime'], 2)
+
+    def test_follow(self):
+        self.log(1, 'a')
+        polls = []
+
+        def until():
+            polls.append(None)
+            self.log(len(polls) + 1, 'poll %d' % len(polls))
+            return len(polls) == 3
+
+        entries = LogTail(self.session, 's1').follow(interval=0, until=until)
+
+        self.assertEqual(self.messages(entries), ['a', 'poll 1', 'poll 2', 'poll 3'])
+
+if __name__ == '__main__':
+    unittest.main()
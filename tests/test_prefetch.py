@@ -0,0 +1,98 @@
+import threading
+import time
+import unittest
+
+from ecxclient.sdk.client import EcxAPI
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import JobAPI
+from ecxclient.sdk.client import prefetch
+
+from tests.server import EcxServer
+
+class PrefetchTest(unittest.TestCase):
+    def counting(self, count, produced):
+        for i in range(count):
+            produced.append(i)
+            yield i
+
+    def wait_for(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_order(self):
+        self.assertEqual(list(prefetch(iter(range(100)), depth=3)), list(range(100)))
+
+    def test_reads_ahead_up_to_depth(self):
+        produced = []
+        items = prefetch(self.counting(10, produced), depth=2)
+
+        self.assertEqual(next(items), 0)
+        # One item handed out, two queued and one more held by the worker
+        # until there is room.
+        self.wait_for(lambda: len(produced) >= 4)
+        time.sleep(0.2)
+        self.assertEqual(len(produced), 4)
+        items.close()
+
+    def test_error(self):
+        def failing():
+            yield 1
+            raise ValueError('page 2')
+
+        items = prefetch(failing())
+        self.assertEqual(next(items), 1)
+        with self.assertRaises(ValueError):
+            next(items)
+
+    def test_early_close_stops_worker(self):
+        items = prefetch(self.counting(1000, []), depth=1)
+        next(items)
+        items.close()
+
+        self.wait_for(lambda: not [t for t in threading.enumerate() if t.name == 'ecx-prefetch'])
+        self.assertEqual([t for t in threading.enumerate() if t.name == 'ecx-prefetch'], [])
+
+    def test_no_depth(self):
+        produced = []
+        items = prefetch(self.counting(10, produced), depth=0)
+
+        self.assertEqual(next(items), 0)
+        self.assertEqual(produced, [0])
+
+class PagedPrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def test_iter_list(self):
+        for i in range(5):
+            self.server.add('widget', name='w%d' % i)
+
+        widgets = list(EcxAPI(self.session, 'widget').iter_list(page_size=2, prefetch_depth=1))
+
+        self.assertEqual([w['name'] for w in widgets], ['w0', 'w1', 'w2', 'w3', 'w4'])
+        self.assertEqual(len(self.server.sent('GET', 'widget')), 3)
+
+    def test_next_page_fetched_while_caller_is_busy(self):
+        for i in range(6):
+            self.server.add('endeavour/log/job', jobsessionId='s1', logTime=i, message='m%d' % i)
+        self.server.delay = 0.2
+
+        started = time.time()
+        messages = []
+        for entry in JobAPI(self.session).iter_log_entries('s1', page_size=2):
+            time.sleep(0.2)
+            messages.append(entry['message'])
+
+        self.assertEqual(messages, ['m0', 'm1', 'm2', 'm3', 'm4', 'm5'])
+        # 2 seconds one after the other: 4 requests of 0.2 and 6 entries of
+        # 0.2 seconds. Pages after the first are fetched in the background.
+        self.assertLess(time.time() - started, 1.7)
+
+if __name__ == '__main__':
+    unittest.main()
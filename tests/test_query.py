@@ -0,0 +1,60 @@
+import time
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+
+from tests.server import EcxServer
+
+class QueryTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.server.routes[('POST', 'vsphere/query')] = self.query
+
+        self.chunks = []
+        self.vms = ['%s/api/vsphere/1/vm/%d' % (self.server.url, i) for i in range(10)]
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def query(self, query, body):
+        # Every VM is on one of two datastores; VMs without a datastore
+        # report one without an href.
+        self.chunks.append(body['associatedWith'])
+        datastores = []
+        for href in body['associatedWith']:
+            vm = int(href.rsplit('/', 1)[1])
+            if vm == 9:
+                datastores.append({'name': 'unmanaged'})
+            else:
+                datastores.append({'name': 'ds%d' % (vm % 2),
+                                   'links': {'self': {'href': self.server.url + '/api/datastore/%d' % (vm % 2)}}})
+
+        return {'datastores': datastores, 'resourceType': body['resourceType']}
+
+    def test_deduplicated(self):
+        datastores = list(self.session.query('vsphere', 'datastore', self.vms, chunk_size=3))
+
+        self.assertEqual(sorted(ds['name'] for ds in datastores), ['ds0', 'ds1', 'unmanaged'])
+        self.assertEqual(sorted(len(chunk) for chunk in self.chunks), [1, 3, 3, 3])
+
+    def test_resources_without_href_are_kept(self):
+        datastores = list(self.session.query('vsphere', 'datastore', self.vms[9:] * 2, chunk_size=1))
+
+        self.assertEqual([ds['name'] for ds in datastores], ['unmanaged', 'unmanaged'])
+
+    def test_empty(self):
+        self.assertEqual(list(self.session.query('vsphere', 'datastore', [])), [])
+        self.assertEqual(self.server.sent(), [])
+
+    def test_chunks_run_concurrently(self):
+        self.server.delay = 0.3
+
+        started = time.time()
+        self.assertEqual(len(list(self.session.query('vsphere', 'datastore', self.vms, chunk_size=3))), 3)
+
+        self.assertLess(time.time() - started, 0.9)
+
+if __name__ == '__main__':
+    unittest.main()
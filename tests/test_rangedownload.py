@@ -0,0 +1,155 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import RangeDownload
+
+from tests.server import EcxServer
+
+CONTENT = bytes(bytearray(i % 251 for i in range(100000)))
+
+class RangeDownloadTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.server.content = CONTENT
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.url = self.server.url + '/api/blob'
+        self.tmpdir = tempfile.mkdtemp()
+        self.outfile = os.path.join(self.tmpdir, 'blob.bin')
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.tmpdir)
+
+    def download(self, **kwargs):
+        kwargs.setdefault('workers', 4)
+        kwargs.setdefault('min_part_size', 10000)
+        kwargs.setdefault('chunk_size', 4096)
+        return RangeDownload(self.session, self.url, **kwargs)
+
+    def read_outfile(self):
+        with open(self.outfile, 'rb') as f:
+            return f.read()
+
+    def test_parallel_parts(self):
+        download = self.download()
+        download.save(download.open(), self.outfile)
+
+        self.assertEqual(self.read_outfile(), CONTENT)
+        self.assertEqual(sorted(self.server.ranges_sent()), ['bytes=0-0', 'bytes=0-24999', 'bytes=25000-49999',
+                                                             'bytes=50000-74999', 'bytes=75000-99999'])
+        self.assertFalse(os.path.exists(self.outfile + '.part'))
+        self.assertFalse(os.path.exists(self.outfile + '.part.json'))
+
+    def test_resume_from_state(self):
+        # The parts from the middle on fail, the first ones are kept.
+        self.server.fail_from = 50000
+        download = self.download(retries=0)
+        with self.assertRaises(Exception):
+            download.save(download.open(), self.outfile)
+
+        with open(self.outfile + '.part.json') as f:
+            state = json.load(f)
+
+        self.assertEqual([part['done'] for part in state['parts']], [25000, 25000, 0, 0])
+
+        self.server.fail_from = None
+        del self.server.requests[:]
+        download = self.download()
+        download.save(download.open(), self.outfile)
+
+        self.assertEqual(self.read_outfile(), CONTENT)
+        self.assertEqual(sorted(self.server.ranges_sent()), ['bytes=0-0', 'bytes=50000-74999', 'bytes=75000-99999'])
+
+    def test_resume_after_content_changed(self):
+        self.server.fail_from = 50000
+        download = self.download(retries=0)
+        with self.assertRaises(Exception):
+            download.save(download.open(), self.outfile)
+
+        # Same size, other ETag: the saved parts are from the old content.
+        self.server.fail_from = None
+        self.server.content = CONTENT[::-1]
+        self.server.etag = '"v2"'
+        download = self.download()
+        download.save(download.open(), self.outfile)
+
+        self.assertEqual(self.read_outfile(), CONTENT[::-1])
+
+    def test_if_range_mismatch(self):
+        download = self.download()
+        r = download.open()
+        self.server.etag = '"v2"'
+
+        with self.assertRaises(Exception) as cm:
+            download.save(r, self.outfile)
+
+        self.assertIn('changed during the download', str(cm.exception))
+        self.assertFalse(os.path.exists(self.outfile))
+        self.assertTrue(all(req[3].get('If-Range') == '"v1"' for req in self.server.sent('GET', 'blob')[1:]))
+
+    def test_no_range_support(self):
+        self.server.ranges = False
+        download = self.download()
+        r = download.open()
+        self.assertEqual(r.status_code, 200)
+
+        download.save(r, self.outfile)
+
+        self.assertEqual(self.read_outfile(), CONTENT)
+        self.assertEqual(len(self.server.sent('GET', 'blob')), 1)
+        self.assertFalse(os.path.exists(self.outfile + '.part.json'))
+
+    def test_no_validator_reads_in_one_request(self):
+        self.server.etag = None
+        with open(self.outfile + '.part', 'wb') as f:
+            f.write(b'x' * len(CONTENT))
+
+        with open(self.outfile + '.part.json', 'w') as f:
+            json.dump({'url': self.url, 'total': len(CONTENT), 'validator': None,
+                       'parts': [{'start': 0, 'end': len(CONTENT), 'done': len(CONTENT) // 2}]}, f)
+
+        download = self.download()
+        download.save(download.open(), self.outfile)
+
+        # Neither split into parts nor resumed from the saved state.
+        self.assertEqual(self.read_outfile(), CONTENT)
+        self.assertEqual(self.server.ranges_sent(), ['bytes=0-0'])
+        self.assertEqual(len(self.server.sent('GET', 'blob')), 2)
+        self.assertFalse(os.path.exists(self.outfile + '.part.json'))
+
+    def test_no_validator_broken_connection_fails(self):
+        self.server.etag = None
+        download = self.download()
+        r = download.open()
+        self.server.drop_after = 30000
+
+        with self.assertRaises(Exception):
+            b''.join(download.iter_chunks(r))
+
+        self.assertEqual(self.server.ranges_sent(), ['bytes=0-0'])
+
+    def test_iter_chunks_resumes_broken_connection(self):
+        download = self.download()
+        r = download.open()
+        self.server.drop_after = 30000
+
+        self.assertEqual(b''.join(download.iter_chunks(r)), CONTENT)
+
+        # Resumed from the last whole chunk received.
+        ranges = self.server.ranges_sent()
+        self.assertEqual(ranges[:2], ['bytes=0-0', 'bytes=0-'])
+        self.assertEqual(ranges[2:], ['bytes=%d-' % (30000 // 4096 * 4096)])
+
+    def test_stream_get_to_callable(self):
+        chunks = []
+        self.session.stream_get(url=self.url, outfile=chunks.append, chunk_size=4096)
+
+        self.assertEqual(b''.join(chunks), CONTENT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import endpoint_template
+from ecxclient.sdk.client import percentile
+
+from tests.server import EcxServer
+
+class RequestHooksTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.server.add('endeavour/job', id='1001', name='backup')
+        self.server.content = b'x' * 5000
+        self.session = EcxSession(self.server.url, sessionid='test-session', coalesce=False)
+        self.records = []
+        self.session.add_request_hook(self.records.append)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def test_records(self):
+        self.session.get(restype='job', resid='1001')
+        self.session.post(restype='job', data={'name': 'restore'})
+        self.session.stream_get(url=self.server.url + '/api/blob', outfile=lambda chunk: None)
+
+        get, post, first_range, blob = self.records
+        self.assertEqual((get.method, get.endpoint, get.status, get.error), ('GET', 'endeavour/job/{id}', 200, None))
+        self.assertEqual(get.url, self.server.url + '/api/endeavour/job/1001')
+        self.assertEqual(get.request_bytes, None)
+        self.assertEqual(get.response_bytes, len(b'{"id": "1001", "name": "backup"}'))
+        self.assertGreater(get.connect, 0)
+        self.assertGreaterEqual(get.total, get.ttfb)
+
+        self.assertEqual((post.method, post.endpoint), ('POST', 'endeavour/job'))
+        self.assertEqual(post.request_bytes, len(b'{"name": "restore"}'))
+        self.assertEqual(post.connect, 0)
+
+        self.assertEqual((first_range.status, first_range.response_bytes), (206, 1))
+        self.assertEqual((blob.status, blob.response_bytes), (206, 5000))
+
+    def test_errors(self):
+        with self.assertRaises(Exception):
+            self.session.get(restype='job', resid='1002')
+
+        self.session.url = self.session.api_url = 'http://127.0.0.1:1'
+        with self.assertRaises(Exception):
+            self.session.get(restype='job', resid='1001')
+
+        not_found, refused = self.records
+        self.assertEqual((not_found.status, not_found.error), (404, 'HTTPError'))
+        self.assertEqual((refused.status, refused.error, refused.response_bytes), (None, 'ConnectionError', None))
+
+    def test_failing_hook(self):
+        def hook(record):
+            raise ValueError()
+
+        self.session.add_request_hook(hook)
+        self.assertEqual(self.session.get(restype='job', resid='1001')['name'], 'backup')
+        self.assertEqual(len(self.records), 1)
+
+        self.session.remove_request_hook(hook)
+        self.session.remove_request_hook(self.records.append)
+        self.session.get(restype='job', resid='1001')
+        self.assertEqual(len(self.records), 1)
+
+    def test_metrics(self):
+        self.session.enable_metrics()
+        for resid in ('1001', '1001', '1002'):
+            try:
+                self.session.get(restype='job', resid=resid)
+            except Exception:
+                pass
+        self.session.get(restype='job')
+
+        summary = dict((row['endpoint'], row) for row in self.session.metrics_summary(percentiles=(50,)))
+        self.assertEqual(sorted(summary), ['endeavour/job', 'endeavour/job/{id}'])
+        row = summary['endeavour/job/{id}']
+        self.assertEqual((row['count'], row['errors'], row['statuses']), (3, 1, {200: 2, 404: 1}))
+        self.assertEqual(row['connects'], 1)
+        self.assertIsNotNone(row['p50'])
+
+        self.session.disable_metrics()
+        self.assertIsNone(self.session.metrics_summary())
+        self.assertEqual(len(self.records), 4)
+
+class HelpersTest(unittest.TestCase):
+    def test_endpoint_template(self):
+        api_url = 'https://ecx/api'
+
+        self.assertEqual(endpoint_template(api_url, api_url + '/endeavour/job/1001/status'),
+                         'endeavour/job/{id}/status')
+        self.assertEqual(endpoint_template(api_url, api_url + '/vsphere/1/vm/50123456-7890-abcd-ef01-234567890abc'),
+                         'vsphere/{id}/vm/{id}')
+        self.assertEqual(endpoint_template(api_url, 'https://other/x/1'), '/x/{id}')
+
+    def test_percentile(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile(list(range(1, 101)), 50), 51)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 100)
+        self.assertEqual(percentile([7], 90), 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from ecxclient.sdk.client import EcxAPI
+from ecxclient.sdk.client import EcxSession
+
+from tests.server import EcxServer
+
+class ResourceIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        for name in ('alpha', 'beta'):
+            self.server.add('widget', name=name)
+
+        self.index = self.session.index('widget')
+        self.assertEqual(len(self.index), 2)
+        del self.server.requests[:]
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def listings(self):
+        return len(self.server.sent('GET', 'widget'))
+
+    def test_lookup_is_case_insensitive(self):
+        self.assertEqual(self.index['ALPHA']['name'], 'alpha')
+        self.assertNotIn('gamma', self.index)
+
+    def test_post_adds_without_relisting(self):
+        for name in ('gamma', 'delta'):
+            EcxAPI(self.session, 'widget').post(data={'name': name})
+
+        self.assertEqual(self.index['gamma']['name'], 'gamma')
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.listings(), 0)
+
+    def test_put_replaces(self):
+        beta = self.index['beta']
+        EcxAPI(self.session, 'widget').put(resid=beta['id'], data={'name': 'gamma'})
+
+        self.assertNotIn('beta', self.index)
+        self.assertEqual(self.index['gamma']['id'], beta['id'])
+        self.assertEqual(self.listings(), 0)
+
+    def test_delete_removes(self):
+        self.session.delete(restype='widget', resid=self.index['alpha']['id'])
+
+        self.assertNotIn('alpha', self.index)
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual(self.listings(), 0)
+
+    def test_action_keeps_index(self):
+        self.session.post(restype='widget', resid=self.index['alpha']['id'], params={'action': 'start'})
+
+        self.assertIn('alpha', self.index)
+        self.assertEqual(self.listings(), 0)
+
+    def test_failed_write_rebuilds(self):
+        with self.assertRaises(Exception):
+            self.session.put(restype='widget', resid='404', data={'name': 'gamma'})
+
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.listings(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import unittest
+
+from ecxclient.sdk.client import EcxAPI
+from ecxclient.sdk.client import EcxSession
+
+from tests.server import EcxServer
+
+SITES = {'A': {'id': '1000', 'name': 'A'}, 'B': {'id': '2000', 'name': 'B'}, 'C': {'id': '3000', 'name': 'C'}}
+
+class ResourceSitesTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.api = EcxAPI(self.session, 'vsphere')
+
+        self.site_of = {}
+        self.vms = []
+        for vsphereid, sites in (('1', 'AAA'), ('2', 'BC'), ('3', '-')):
+            for i, site in enumerate(sites):
+                self.add_vm(vsphereid, 'vm%s-%d' % (vsphereid, i), SITES.get(site))
+
+        self.server.routes[('POST', 'vsphere/query')] = self.query
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def add_vm(self, vsphereid, name, site):
+        path = 'vsphere/%s/vm/%s' % (vsphereid, name)
+        href = self.server.url + '/api/' + path
+        self.vms.append({'name': name, 'links': {'self': {'href': href},
+                                                 'vsphere': {'href': self.server.url + '/api/vsphere/' + vsphereid}}})
+        self.site_of[href] = site
+
+        def versions(query, body):
+            siteid = json.loads(query['filter'])[0]['value']
+            return {'versions': [{'name': '%s@%s' % (name, siteid), 'time': query['time']}]}
+
+        self.server.routes[('GET', path + '/version')] = versions
+
+    def query(self, query, body):
+        self.assertEqual(body['resourceType'], 'site')
+        sites = []
+        for href in body['associatedWith']:
+            self.assertTrue(href.endswith('?time=0'))
+            site = self.site_of[href[:-len('?time=0')]]
+            if site is not None and site not in sites:
+                sites.append(site)
+
+        return {'sites': sites}
+
+    def queries(self):
+        return [req for req in self.server.sent('POST', 'vsphere/query')]
+
+    def site_names(self, sites):
+        return dict((href.rsplit('/', 1)[1], site['name']) for href, site in sites.items())
+
+    def test_sites(self):
+        sites = self.api.get_resource_sites(self.vms)
+
+        self.assertEqual(self.site_names(sites),
+                         {'vm1-0': 'A', 'vm1-1': 'A', 'vm1-2': 'A', 'vm2-0': 'B', 'vm2-1': 'C'})
+        # One query per vCenter, and the one of vCenter 2 split in two.
+        self.assertEqual(len(self.queries()), 5)
+
+    def test_chunks(self):
+        sites = self.api.get_resource_sites(self.vms[:3], chunk_size=2)
+
+        self.assertEqual(self.site_names(sites), {'vm1-0': 'A', 'vm1-1': 'A', 'vm1-2': 'A'})
+        self.assertEqual(len(self.queries()), 2)
+
+    def test_versions(self):
+        versions = self.api.get_resource_versions(self.vms)
+
+        names = dict((href.rsplit('/', 1)[1], [v['name'] for v in vms]) for href, vms in versions.items())
+        self.assertEqual(names, {'vm1-0': ['vm1-0@1000'], 'vm1-1': ['vm1-1@1000'], 'vm1-2': ['vm1-2@1000'],
+                                 'vm2-0': ['vm2-0@2000'], 'vm2-1': ['vm2-1@3000']})
+        self.assertEqual(set(v[0]['time'] for v in versions.values()), set(['0']))
+
+    def test_versions_with_sites(self):
+        sites = self.api.get_resource_sites(self.vms)
+        del self.server.requests[:]
+
+        self.assertEqual(len(self.api.get_resource_versions(self.vms, sites)), 5)
+        self.assertEqual(self.queries(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import time
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import ResponseCache
+from ecxclient.sdk.client import normalize_url
+
+from tests.server import EcxServer
+
+class ResponseCacheTest(unittest.TestCase):
+    def key(self, url, params={}):
+        return normalize_url('http://ecx/api/' + url, params)
+
+    def test_invalidate_url_parents_and_children(self):
+        cache = ResponseCache()
+        for url in ('widget', 'widget/1', 'widget/1/status', 'widget/2', 'gadget'):
+            cache.store(self.key(url), 'widget', url, cache.generation)
+
+        cache.invalidate('http://ecx/api/widget/1')
+
+        self.assertIsNone(cache.lookup(self.key('widget')))
+        self.assertIsNone(cache.lookup(self.key('widget/1')))
+        self.assertIsNone(cache.lookup(self.key('widget/1/status')))
+        self.assertEqual(cache.lookup(self.key('widget/2')), 'widget/2')
+        self.assertEqual(cache.lookup(self.key('gadget')), 'gadget')
+
+    def test_invalidate_drops_all_params(self):
+        cache = ResponseCache()
+        cache.store(self.key('widget', {'pageSize': 10}), 'widget', 'page', cache.generation)
+
+        cache.invalidate('http://ecx/api/widget')
+
+        self.assertIsNone(cache.lookup(self.key('widget', {'pageSize': 10})))
+
+    def test_store_after_invalidate_is_dropped(self):
+        cache = ResponseCache()
+        generation = cache.generation
+        cache.invalidate('http://ecx/api/widget/1')
+        cache.store(self.key('widget/1'), 'widget', 'stale', generation)
+
+        self.assertIsNone(cache.lookup(self.key('widget/1')))
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=0.05, ttl_by_restype={'gadget': 0})
+        cache.store(self.key('widget'), 'widget', 'widgets', cache.generation)
+        cache.store(self.key('gadget'), 'gadget', 'gadgets', cache.generation)
+
+        self.assertEqual(cache.lookup(self.key('widget')), 'widgets')
+        self.assertIsNone(cache.lookup(self.key('gadget')))
+        time.sleep(0.1)
+        self.assertIsNone(cache.lookup(self.key('widget')))
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(maxsize=2)
+        for url in ('widget/1', 'widget/2'):
+            cache.store(self.key(url), 'widget', url, cache.generation)
+
+        cache.lookup(self.key('widget/1'))
+        cache.store(self.key('widget/3'), 'widget', 'widget/3', cache.generation)
+
+        self.assertEqual(cache.lookup(self.key('widget/1')), 'widget/1')
+        self.assertIsNone(cache.lookup(self.key('widget/2')))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+class SessionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def test_get_url_is_cached_until_a_write(self):
+        widget = self.server.add('widget', name='one')
+        url = self.server.url + '/api/widget/' + widget['id']
+        self.session.enable_cache()
+
+        self.assertEqual(self.session.get(url=url)['name'], 'one')
+        self.assertEqual(self.session.get(url=url)['name'], 'one')
+        self.assertEqual(len(self.server.sent('GET')), 1)
+
+        self.session.put(url=url, data={'name': 'two'})
+
+        self.assertEqual(self.session.get(url=url)['name'], 'two')
+        self.assertEqual(len(self.server.sent('GET')), 2)
+        self.assertEqual(self.session.cache_stats()['hits'], 1)
+
+    def test_write_to_an_item_invalidates_its_collection(self):
+        widget = self.server.add('widget', name='one')
+        url = self.server.url + '/api/widget'
+        self.session.enable_cache()
+
+        self.assertEqual(len(self.session.get(url=url)['widgets']), 1)
+        self.session.delete(restype='widget', resid=widget['id'])
+
+        self.assertEqual(self.session.get(url=url)['widgets'], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import time
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import JobAPI
+
+from tests.server import EcxServer
+
+class SessionLogTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.api = JobAPI(self.session)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def log(self, count):
+        # Added out of order, the log is sorted by the server.
+        for i in reversed(range(count)):
+            self.server.add('endeavour/log/job', jobsessionId='s1', logTime=i, message='m%d' % i)
+        self.server.add('endeavour/log/job', jobsessionId='s2', logTime=0, message='other session')
+
+    def page_starts(self):
+        return sorted(int(req[2]['pageStartIndex']) for req in self.server.sent('GET', 'endeavour/log/job'))
+
+    def assert_read_ahead(self, needed, workers):
+        # Without a total, pages are requested ahead without knowing where
+        # the log ends: up to workers - 1 of them past the short one.
+        starts = self.page_starts()
+        self.assertEqual(starts[:len(needed)], needed)
+        self.assertLessEqual(len(starts), len(needed) + workers - 1)
+
+    def messages(self, **kwargs):
+        return [entry['message'] for entry in self.api.iter_session_log('s1', **kwargs)]
+
+    def test_without_total(self):
+        self.log(7)
+
+        self.assertEqual(self.messages(workers=3, page_size=2), ['m%d' % i for i in range(7)])
+        self.assert_read_ahead([0, 2, 4, 6], workers=3)
+
+    def test_without_total_past_the_end(self):
+        self.log(6)
+
+        self.assertEqual(self.messages(workers=3, page_size=2), ['m%d' % i for i in range(6)])
+        self.assert_read_ahead([0, 2, 4, 6], workers=3)
+
+    def test_with_total(self):
+        self.server.totals = True
+        self.log(6)
+
+        self.assertEqual(self.messages(workers=8, page_size=2), ['m%d' % i for i in range(6)])
+        self.assertEqual(self.page_starts(), [0, 2, 4])
+
+    def test_single_page(self):
+        self.log(3)
+
+        self.assertEqual(self.messages(page_size=5), ['m0', 'm1', 'm2'])
+        self.assertEqual(self.page_starts(), [0])
+
+    def test_pages_fetched_concurrently(self):
+        self.server.totals = True
+        self.server.delay = 0.2
+        self.log(10)
+
+        started = time.time()
+        entries = []
+        self.assertEqual(self.api.download_session_log('s1', entries.append, workers=4, page_size=2), 10)
+
+        self.assertEqual([entry['logTime'] for entry in entries], list(range(10)))
+        # The first page, then the other four at once.
+        self.assertLess(time.time() - started, 0.8)
+
+if __name__ == '__main__':
+    unittest.main()
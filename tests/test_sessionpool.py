@@ -0,0 +1,75 @@
+import threading
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import iter_completed
+
+from tests.server import EcxServer
+
+class SessionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        for i in range(16):
+            self.server.add('widget', name='w%d' % i)
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def session(self, **kwargs):
+        session = EcxSession(self.server.url, sessionid='test-session', **kwargs)
+        self.addCleanup(session.close)
+        return session
+
+    def get_all(self, session, workers):
+        def get(resid):
+            return session.get(restype='widget', resid=resid)['name']
+
+        return sorted(name for resid, name in iter_completed(get, [str(i) for i in range(1, 17)], workers))
+
+    def test_login(self):
+        session = EcxSession(self.server.url, username='admin', password='secret')
+        self.addCleanup(session.close)
+
+        self.assertEqual(session.sessionid, 'test-session')
+        self.assertRaises(Exception, EcxSession, self.server.url)
+
+    def test_sequential_requests_reuse_connection(self):
+        session = self.session()
+        for i in range(5):
+            session.get(restype='widget', resid='1')
+
+        self.assertEqual(session.connection_stats(),
+                         {'requests': 5, 'new_connections': 1, 'reused_connections': 4})
+
+    def test_threads_share_pool(self):
+        session = self.session(pool_maxsize=4, pool_block=True)
+        self.server.delay = 0.05
+
+        self.assertEqual(self.get_all(session, 8), sorted('w%d' % i for i in range(16)))
+        self.assertEqual(self.get_all(session, 8), sorted('w%d' % i for i in range(16)))
+
+        stats = session.connection_stats()
+        self.assertEqual(stats['requests'], 32)
+        self.assertLessEqual(stats['new_connections'], 4)
+
+    def test_requests_session_per_thread(self):
+        session = self.session()
+        conns = []
+
+        def run():
+            conns.append(session.conn)
+            conns.append(session.conn)
+
+        threads = [threading.Thread(target=run) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIs(conns[0], conns[1])
+        self.assertIs(conns[2], conns[3])
+        self.assertIsNot(conns[0], conns[2])
+        self.assertIs(conns[0].get_adapter(self.server.url), conns[2].get_adapter(self.server.url))
+
+if __name__ == '__main__':
+    unittest.main()
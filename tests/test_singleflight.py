@@ -0,0 +1,99 @@
+import threading
+import time
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import SingleFlight
+
+from tests.server import EcxServer
+
+class SingleFlightTest(unittest.TestCase):
+    def run_concurrently(self, count, target):
+        threads = [threading.Thread(target=target) for i in range(count)]
+        for thread in threads:
+            thread.start()
+
+        return threads
+
+    def test_concurrent_calls_share_one_result(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return object()
+
+        threads = self.run_concurrently(5, lambda: results.append(flight.do('key', fn)))
+        while flight.stats()['shared'] < 4:
+            time.sleep(0.01)
+
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flight.stats(), {'in_flight': 0, 'shared': 4})
+
+    def test_concurrent_calls_share_the_error(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        errors = []
+
+        def fn():
+            release.wait(5)
+            raise ValueError('failed')
+
+        def call():
+            try:
+                flight.do('key', fn)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = self.run_concurrently(3, call)
+        while flight.stats()['shared'] < 2:
+            time.sleep(0.01)
+
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all(error is errors[0] for error in errors))
+
+    def test_later_calls_run_again(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+
+class SessionCoalesceTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def test_concurrent_gets_are_coalesced(self):
+        widget = self.server.add('widget', name='one')
+        self.server.delay = 0.2
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(self.session.get('widget', widget['id'])))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [widget] * 4)
+        self.assertEqual(len(self.server.sent('GET')), 1)
+
+if __name__ == '__main__':
+    unittest.main()
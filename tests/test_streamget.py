@@ -0,0 +1,84 @@
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import unittest
+
+from ecxclient.sdk.client import EcxAPI
+from ecxclient.sdk.client import EcxSession
+
+from tests.server import EcxServer
+
+CONTENT = bytes(bytearray(i % 251 for i in range(100000)))
+
+class StreamGetTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.server.content = CONTENT
+        self.server.add('widget', id='1', name='w1')
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.url = self.server.url + '/api/blob'
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def test_file_object(self):
+        out = io.BytesIO()
+
+        self.assertIs(self.session.stream_get(url=self.url, outfile=out), out)
+        self.assertEqual(out.getvalue(), CONTENT)
+
+    def test_compressor(self):
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb') as out:
+            self.session.stream_get(url=self.url, outfile=out)
+
+        self.assertEqual(gzip.decompress(buf.getvalue()), CONTENT)
+
+    def test_hash(self):
+        md5 = hashlib.md5()
+        progress = []
+        self.session.stream_get(url=self.url, outfile=md5.update, chunk_size=30000,
+                                progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(md5.hexdigest(), hashlib.md5(CONTENT).hexdigest())
+        self.assertEqual(progress[-1], (len(CONTENT), len(CONTENT)))
+        self.assertEqual(len(progress), 4)
+
+    def test_default_file_name(self):
+        outfile = self.session.stream_get(url=self.url)
+        self.addCleanup(shutil.rmtree, os.path.dirname(outfile))
+
+        self.assertEqual(os.path.basename(outfile), 'blob.bin')
+        with open(outfile, 'rb') as f:
+            self.assertEqual(f.read(), CONTENT)
+
+    def test_no_file_name(self):
+        with self.assertRaises(Exception) as cm:
+            self.session.stream_get(restype='widget', resid='1')
+
+        self.assertIn("file name", str(cm.exception))
+
+    def test_stream_chunks(self):
+        chunks = list(self.session.stream_chunks(url=self.url, chunk_size=30000))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [30000, 30000, 30000, 10000])
+        self.assertEqual(b''.join(chunks), CONTENT)
+
+    def test_stream_chunks_raises_right_away(self):
+        with self.assertRaises(Exception):
+            self.session.stream_chunks(restype='widget', resid='2')
+
+    def test_api(self):
+        api = EcxAPI(self.session, 'widget')
+        out = io.BytesIO()
+
+        api.stream_get(url=self.url, outfile=out)
+        self.assertEqual(out.getvalue(), CONTENT)
+        self.assertEqual(b''.join(api.stream_chunks(url=self.url)), CONTENT)
+        self.assertEqual(b''.join(api.stream_chunks(resid='1')), b'{"id": "1", "name": "w1"}')
+
+if __name__ == '__main__':
+    unittest.main()
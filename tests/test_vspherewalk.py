@@ -0,0 +1,60 @@
+import time
+import unittest
+
+from ecxclient.sdk.client import EcxSession
+from ecxclient.sdk.client import VsphereAPI
+
+from tests.server import EcxServer
+
+class VsphereWalkTest(unittest.TestCase):
+    def setUp(self):
+        self.server = EcxServer().__enter__()
+        self.session = EcxSession(self.server.url, sessionid='test-session')
+        self.api = VsphereAPI(self.session)
+
+        for vsphereid in ('1', '2', '3'):
+            links = {}
+            for kind in ('vms', 'hosts'):
+                collection = 'vsphere/%s/%s' % (vsphereid, kind)
+                links[kind] = {'href': self.server.url + '/api/' + collection}
+                self.server.list_fields[collection] = kind
+                self.server.resources[collection] = []
+
+            self.server.add('vsphere', id=vsphereid, name='vcenter' + vsphereid, links=links)
+            for i in range(2):
+                self.server.add('vsphere/%s/vms' % vsphereid, name='vm%s-%d' % (vsphereid, i))
+            self.server.add('vsphere/%s/hosts' % vsphereid, name='esx' + vsphereid)
+
+        self.server.add('vsphere', id='4', name='vcenter4', links={})
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__(None, None, None)
+
+    def test_walk_vms(self):
+        names = sorted(vm['name'] for vm in self.api.walk_vms())
+
+        self.assertEqual(names, ['vm1-0', 'vm1-1', 'vm2-0', 'vm2-1', 'vm3-0', 'vm3-1'])
+        self.assertEqual(sorted(req[1] for req in self.server.sent('GET') if req[1] != 'vsphere'),
+                         ['vsphere/1/vms', 'vsphere/2/vms', 'vsphere/3/vms'])
+
+    def test_walk_hosts(self):
+        self.assertEqual(sorted(host['name'] for host in self.api.walk_hosts()), ['esx1', 'esx2', 'esx3'])
+
+    def test_concurrent(self):
+        self.server.delay = 0.3
+
+        started = time.time()
+        self.assertEqual(len(list(self.api.walk_vms())), 6)
+
+        # The vCenter listing, then the three vCenters at once.
+        self.assertLess(time.time() - started, 0.9)
+
+    def test_sequential(self):
+        self.server.delay = 0.1
+
+        self.assertEqual(len(list(self.api.walk_vms(max_workers=1))), 6)
+        self.assertEqual(len(self.server.sent('GET')), 4)
+
+if __name__ == '__main__':
+    unittest.main()